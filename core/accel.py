@@ -0,0 +1,226 @@
+import hashlib
+import json
+import os
+import platform
+import subprocess
+import time
+
+# QMP 握手后立即退出: 加速器在监视器可用之前完成初始化，能走到这里就说明可用
+PROBE_QMP_INPUT = '{"execute": "qmp_capabilities"}\n{"execute": "quit"}\n'
+
+
+class AcceleratorProbe:
+    """加速器探测插件
+
+    variants 按优先级列出 (-accel 参数, -cpu 型号)；applicable 判断当前宿主机是否可能支持，
+    precheck 做不需要启动 QEMU 的快速检查 (如 /dev/kvm 权限)。
+    """
+    name = ""
+    priority = 0
+    variants = []
+
+    def applicable(self, system):
+        return True
+
+    def precheck(self):
+        return True, ""
+
+
+class KVMProbe(AcceleratorProbe):
+    name = "kvm"
+    priority = 30
+    variants = [("kvm", "host"), ("kvm", "max")]
+
+    def applicable(self, system):
+        return system == "Linux"
+
+    def precheck(self):
+        if not os.path.exists("/dev/kvm"):
+            return False, "/dev/kvm 不存在"
+        if not os.access("/dev/kvm", os.R_OK | os.W_OK):
+            return False, "没有 /dev/kvm 的读写权限 (需要加入 kvm 用户组)"
+        return True, ""
+
+
+class HVFProbe(AcceleratorProbe):
+    name = "hvf"
+    priority = 30
+    variants = [("hvf", "host")]
+
+    def applicable(self, system):
+        return system == "Darwin"
+
+
+class WHPXProbe(AcceleratorProbe):
+    name = "whpx"
+    priority = 20
+    # WHPX 的内核中断控制器存在兼容性问题，使用 QEMU 模拟的 irqchip；
+    # max 在 WHPX 下可能导致客户机卡死，而探测时客户机并不运行 (-S)，无法发现，因此 qemu64 优先
+    variants = [("whpx,kernel-irqchip=off", "qemu64"), ("whpx,kernel-irqchip=off", "max")]
+
+    def applicable(self, system):
+        return system == "Windows"
+
+
+class TCGProbe(AcceleratorProbe):
+    name = "tcg"
+    priority = 0
+    variants = [("tcg", "max"), ("tcg", "qemu64")]
+
+
+PROBES = [KVMProbe, HVFProbe, WHPXProbe, TCGProbe]
+
+
+def register_probe(probe_cls):
+    """注册额外的加速器探测插件"""
+    PROBES.append(probe_cls)
+    return probe_cls
+
+
+class AcceleratorProber:
+    """探测并缓存最佳的加速器与 CPU 型号
+
+    结果以 QEMU 程序哈希 + 宿主机系统版本为键保存在 cache_path 中，环境不变时后续启动
+    不再运行 QEMU 探测。启动失败的组合通过 mark_failed 记录，下次选择时跳过。
+    """
+
+    def __init__(self, qemu_path, qemu_dir, cache_path, is_windows=False, log=None, timeout=10):
+        self.qemu_path = qemu_path
+        self.qemu_dir = qemu_dir
+        self.cache_path = cache_path
+        self.is_windows = is_windows
+        self.log = log or (lambda msg, level: None)
+        self.timeout = timeout
+        self._cache = None
+
+    # --- 缓存 ---
+
+    def _load_cache(self):
+        if self._cache is None:
+            try:
+                with open(self.cache_path, "r", encoding="utf-8") as f:
+                    self._cache = json.load(f)
+            except (OSError, ValueError):
+                self._cache = {}
+            self._cache.setdefault("binaries", {})
+            self._cache.setdefault("results", {})
+        return self._cache
+
+    def _save_cache(self):
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            with open(self.cache_path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(self._cache, f, indent=4, ensure_ascii=False)
+            os.replace(self.cache_path + ".tmp", self.cache_path)
+        except OSError:
+            pass
+
+    def _binary_hash(self):
+        """QEMU 程序的 sha256；按路径、大小与修改时间记忆，避免每次启动都读取整个文件"""
+        cache = self._load_cache()
+        st = os.stat(self.qemu_path)
+        stamp = f"{st.st_size}:{int(st.st_mtime)}"
+        memo = cache["binaries"].get(self.qemu_path)
+        if memo and memo.get("stamp") == stamp:
+            return memo["sha256"]
+        digest = hashlib.sha256()
+        with open(self.qemu_path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        cache["binaries"][self.qemu_path] = {"stamp": stamp, "sha256": digest.hexdigest()}
+        return digest.hexdigest()
+
+    def cache_key(self):
+        host = "|".join([platform.system(), platform.release(), platform.version(), platform.machine()])
+        return hashlib.sha256(f"{self._binary_hash()}|{host}".encode()).hexdigest()[:32]
+
+    # --- 探测 ---
+
+    def probe_variant(self, accel, cpu):
+        """实际启动 QEMU 验证组合是否可用，返回 (是否可用, 错误信息)"""
+        cmd = [self.qemu_path, "-accel", accel, "-cpu", cpu, "-machine", "q35", "-m", "64",
+               "-display", "none", "-nodefaults", "-S", "-qmp", "stdio"]
+        run_kwargs = {"capture_output": True, "text": True, "timeout": self.timeout, "input": PROBE_QMP_INPUT,
+                      "cwd": self.qemu_dir if os.path.isdir(self.qemu_dir) else None}
+        if self.is_windows:
+            run_kwargs["creationflags"] = subprocess.CREATE_NO_WINDOW
+        try:
+            result = subprocess.run(cmd, **run_kwargs)
+        except subprocess.TimeoutExpired:
+            return False, "探测超时"
+        except OSError as e:
+            return False, str(e)
+        if result.returncode == 0 and '"return"' in result.stdout:
+            return True, ""
+        return False, (result.stderr or result.stdout).strip()[:200]
+
+    def probe(self, skip=()):
+        """按优先级探测全部插件，返回第一个可用的组合"""
+        system = platform.system()
+        probes = sorted((cls() for cls in PROBES), key=lambda p: -p.priority)
+        for probe in probes:
+            if not probe.applicable(system):
+                continue
+            ok, reason = probe.precheck()
+            if not ok:
+                self.log(f"{probe.name.upper()} 不可用: {reason}", "debug")
+                continue
+            for accel, cpu in probe.variants:
+                if [accel, cpu] in skip:
+                    continue
+                started = time.time()
+                ok, reason = self.probe_variant(accel, cpu)
+                if ok:
+                    self.log(f"加速器探测: {accel} -cpu {cpu} 可用 ({time.time() - started:.1f}s)", "info")
+                    return {"name": probe.name, "accel": accel, "cpu": cpu}
+                self.log(f"加速器探测: {accel} -cpu {cpu} 不可用: {reason}", "debug")
+        return {"name": "tcg", "accel": "tcg", "cpu": "qemu64"}
+
+    def select(self):
+        """返回 {'name', 'accel', 'cpu'}；缓存命中时不启动 QEMU"""
+        cache = self._load_cache()
+        try:
+            key = self.cache_key()
+        except OSError:
+            return self.probe()
+        entry = cache["results"].get(key)
+        if entry and entry.get("best"):
+            return entry["best"]
+
+        failed = entry.get("failed", []) if entry else []
+        best = self.probe(skip=failed)
+        entry = cache["results"].setdefault(key, {})
+        entry.update({"best": best, "failed": failed, "probed_at": time.time(), "host": platform.platform()})
+        self._save_cache()
+        return best
+
+    def mark_failed(self, accel, cpu):
+        """实际启动失败的组合: 从缓存中移除并加入黑名单，下次 select 重新探测"""
+        cache = self._load_cache()
+        try:
+            key = self.cache_key()
+        except OSError:
+            return
+        entry = cache["results"].setdefault(key, {"failed": []})
+        entry.setdefault("failed", [])
+        if [accel, cpu] not in entry["failed"]:
+            entry["failed"].append([accel, cpu])
+        entry["best"] = None
+        self._save_cache()
+
+    def preferred_cpu_profile(self):
+        """基准测试为本机保存的最优 CPU 配置，如 {'name': 'max', 'accel': 'tcg', 'tcg_tb_size': 512}"""
+        try:
+            key = self.cache_key()
+        except OSError:
+            return None
+        return self._load_cache()["results"].get(key, {}).get("cpu_profile")
+
+    def save_cpu_profile(self, profile):
+        try:
+            key = self.cache_key()
+        except OSError:
+            return
+        cache = self._load_cache()
+        cache["results"].setdefault(key, {"failed": []})["cpu_profile"] = profile
+        self._save_cache()
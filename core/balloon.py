@@ -0,0 +1,124 @@
+import collections
+import threading
+import time
+
+MB = 1024 * 1024
+BALLOON_PATH = "/machine/peripheral/balloon0"
+
+STEP_MB = 1024  # 单次收缩的最大幅度
+MIN_CHANGE_MB = 256  # 小于该幅度的调整忽略，避免来回抖动
+SHRINK_SLACK_MB = 2048  # 虚拟机空闲内存超出需求这么多时才收缩
+
+
+def plan_target(actual_mb, guest_total_mb, guest_available_mb, host_total_mb, host_available_mb,
+                floor_mb, ceiling_mb):
+    """根据宿主机与虚拟机内存状况计算气球目标，返回 (目标 MB, 原因)，无需调整时返回 (None, None)
+
+    虚拟机内存不足时优先扩容；宿主机紧张时收缩到虚拟机实际需求；宿主机宽裕而虚拟机长期空闲时
+    逐步收缩。结果始终限制在 [floor_mb, ceiling_mb] 内。
+
+    气球以 deflate-on-oom 方式创建时虚拟机的 MemTotal 不随气球变化，被气球占用的页会计入
+    total - available；因此以气球当前大小 (actual_mb) 与 MemTotal 中较小者作为虚拟机实际可用的总内存。
+    """
+    total_mb = min(guest_total_mb, actual_mb)
+    used = max(0, total_mb - guest_available_mb)
+    desired = used + max(1024, used // 4)
+    guest_pressure = guest_available_mb < max(512, total_mb * 0.15)
+    host_pressure = host_available_mb < max(1024, host_total_mb * 0.15)
+    host_relaxed = host_available_mb > host_total_mb * 0.3
+
+    if guest_pressure:
+        target, reason = max(desired, actual_mb + STEP_MB), "虚拟机内存不足"
+    elif host_pressure and desired < actual_mb:
+        target, reason = desired, "宿主机内存紧张"
+    elif host_relaxed and actual_mb - desired > SHRINK_SLACK_MB:
+        target, reason = max(desired, actual_mb - STEP_MB), "虚拟机内存空闲"
+    elif host_relaxed and actual_mb < desired:
+        target, reason = desired, "宿主机内存充足"
+    else:
+        return None, None
+
+    target = int(min(ceiling_mb, max(floor_mb, target)))
+    if abs(target - actual_mb) < MIN_CHANGE_MB:
+        return None, None
+    return target, reason
+
+
+class BalloonController:
+    """通过 virtio-balloon 动态调整虚拟机内存
+
+    QEMU 以上限 (ceiling) 启动，Docker 就绪后每隔 interval 秒读取虚拟机内存统计 (guest-stats)
+    与宿主机可用内存，由 plan_target 决定气球大小。虚拟机释放的空闲页通过 free page reporting
+    直接归还宿主机，不需要膨胀气球。
+    """
+
+    def __init__(self, vm, floor_mb, ceiling_mb, interval=10.0, stats_interval=5):
+        self.vm = vm
+        self.floor_mb = min(floor_mb, ceiling_mb)
+        self.ceiling_mb = ceiling_mb
+        self.interval = interval
+        self.stats_interval = stats_interval
+        self.decisions = collections.deque(maxlen=50)  # (时间, 原大小, 目标, 原因)
+        self._last = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="balloon", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def status(self):
+        """最近一次采样的内存状况，供资源监控页显示"""
+        return dict(self._last, floor_mb=self.floor_mb, ceiling_mb=self.ceiling_mb,
+                    decisions=list(self.decisions))
+
+    def _run(self):
+        # 开启虚拟机内存统计上报
+        if self.vm.qmp_execute("qom-set", {"path": BALLOON_PATH, "property": "guest-stats-polling-interval",
+                                           "value": self.stats_interval}) is None:
+            self.vm.log_received.emit("内存气球不可用，保持固定内存", "warn")
+            return
+        while not self._stop.wait(self.interval) and self.vm.is_running:
+            try:
+                self._tick()
+            except (KeyError, TypeError, ValueError):
+                continue
+
+    def _tick(self):
+        balloon = self.vm.qmp_execute("query-balloon", timeout=5)
+        stats = self.vm.qmp_execute("qom-get", {"path": BALLOON_PATH, "property": "guest-stats"}, timeout=5)
+        if not balloon or not stats or stats.get("last-update", 0) == 0:
+            return
+
+        guest = stats["stats"]
+        actual_mb = balloon["actual"] // MB
+        guest_total_mb = guest.get("stat-total-memory", balloon["actual"]) // MB
+        available = guest.get("stat-available-memory", -1)
+        if available < 0:
+            # 旧内核不上报 available，以空闲 + 页缓存近似
+            available = guest.get("stat-free-memory", 0) + max(0, guest.get("stat-disk-caches", 0))
+        guest_available_mb = available // MB
+        import psutil
+        host = psutil.virtual_memory()
+        host_total_mb, host_available_mb = host.total // MB, host.available // MB
+
+        self._last = {"time": time.time(), "actual_mb": actual_mb, "guest_total_mb": guest_total_mb,
+                      "guest_available_mb": guest_available_mb, "host_available_mb": host_available_mb}
+
+        target, reason = plan_target(actual_mb, guest_total_mb, guest_available_mb, host_total_mb,
+                                     host_available_mb, self.floor_mb, self.ceiling_mb)
+        if target is None:
+            return
+        if self.vm.qmp_execute("balloon", {"value": target * MB}, timeout=5) is None:
+            return
+        self.decisions.append((time.time(), actual_mb, target, reason))
+        self._last["target_mb"] = target
+        self.vm.log_received.emit(
+            f"内存气球: {actual_mb}MB -> {target}MB ({reason}，虚拟机可用 {guest_available_mb}MB，"
+            f"宿主机可用 {host_available_mb}MB)", "info")
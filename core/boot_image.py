@@ -0,0 +1,231 @@
+import hashlib
+import os
+import shutil
+import struct
+
+# 启动方式: cdrom 经 BIOS 与 isolinux 引导；kernel 直接加载内核 (ISO 只作为数据盘)；
+# microvm 在直接加载的基础上使用 microvm 机型，只有 virtio-mmio 设备
+BOOT_MODES = ("cdrom", "kernel", "microvm")
+
+# ISO 内的内核、initramfs 与引导配置 (由 iso_build/gen_iso.sh 生成)
+KERNEL_PATH = "boot/vmlinuz"
+INITRD_PATH = "boot/initramfs"
+ISOLINUX_CFG = "boot/isolinux/isolinux.cfg"
+# 无法解析 isolinux.cfg 时使用的内核参数 (与 gen_iso.sh 的默认启动项一致)
+DEFAULT_APPEND = "console=ttyS0,115200 rdinit=/init"
+
+# microvm 不支持的设备参数 (无 PCI 总线、无显卡)
+_MICROVM_DROP = {("-vga", "std"), ("-device", "pvpanic")}
+
+SECTOR = 2048
+
+
+class IsoImage:
+    """只读解析 ISO9660 (含 Rock Ridge 文件名)，只实现查找与提取单个文件所需的部分"""
+
+    def __init__(self, path):
+        self.path = path
+        self._f = open(path, "rb")
+        self._f.seek(16 * SECTOR)
+        self.descriptor = self._f.read(SECTOR)
+        if self.descriptor[0] != 1 or self.descriptor[1:6] != b"CD001":
+            self.close()
+            raise ValueError(f"不是 ISO9660 镜像: {path}")
+        self._root = self._parse_record(self.descriptor[156:190])
+
+    def close(self):
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @staticmethod
+    def _parse_record(record):
+        name_len = record[32]
+        name = record[33:33 + name_len]
+        # 系统使用区紧跟文件名 (文件名长度为偶数时有一个填充字节)，Rock Ridge 的 NM 条目记录原始文件名
+        susp = record[33 + name_len + (1 - name_len % 2):]
+        rr_name = b""
+        pos = 0
+        while pos + 4 <= len(susp):
+            sig, length = susp[pos:pos + 2], susp[pos + 2]
+            if length < 4:
+                break
+            if sig == b"NM":
+                rr_name += susp[pos + 5:pos + length]
+            pos += length
+        if rr_name:
+            name = rr_name.decode("utf-8", "replace")
+        else:
+            name = name.decode("ascii", "replace").split(";")[0].rstrip(".").lower()
+        return {
+            "name": name,
+            "extent": struct.unpack_from("<I", record, 2)[0],
+            "size": struct.unpack_from("<I", record, 10)[0],
+            "is_dir": bool(record[25] & 2),
+        }
+
+    def _list(self, directory):
+        self._f.seek(directory["extent"] * SECTOR)
+        data = self._f.read(directory["size"])
+        entries = []
+        pos = 0
+        while pos < len(data):
+            length = data[pos]
+            if length == 0:
+                # 目录记录不跨扇区，剩余部分为填充
+                pos = (pos // SECTOR + 1) * SECTOR
+                continue
+            record = data[pos:pos + length]
+            if record[32] == 1 and record[33] in (0, 1):
+                pos += length  # "." 与 ".."
+                continue
+            entries.append(self._parse_record(record))
+            pos += length
+        return entries
+
+    def find(self, path):
+        """按路径查找文件记录 (如 'boot/vmlinuz')，不存在时返回 None"""
+        entry = self._root
+        for part in path.strip("/").split("/"):
+            if not entry["is_dir"]:
+                return None
+            entry = next((e for e in self._list(entry) if e["name"] == part), None)
+            if entry is None:
+                return None
+        return entry
+
+    def read(self, entry):
+        self._f.seek(entry["extent"] * SECTOR)
+        return self._f.read(entry["size"])
+
+    def extract(self, entry, dest, chunk_size=1 << 20):
+        self._f.seek(entry["extent"] * SECTOR)
+        remaining = entry["size"]
+        with open(dest, "wb") as out:
+            while remaining > 0:
+                chunk = self._f.read(min(chunk_size, remaining))
+                if not chunk:
+                    raise ValueError("ISO 文件被截断")
+                out.write(chunk)
+                remaining -= len(chunk)
+
+
+def parse_isolinux_append(cfg_text):
+    """取 isolinux.cfg 默认启动项的 APPEND 参数 (去掉 initrd=，由 -initrd 提供)"""
+    default, labels, current = None, {}, None
+    for raw in cfg_text.splitlines():
+        line = raw.strip()
+        key, _, value = line.partition(" ")
+        key = key.upper()
+        if key == "DEFAULT":
+            default = value.strip()
+        elif key == "LABEL":
+            current = value.strip()
+        elif key == "APPEND" and current:
+            labels[current] = value.strip()
+    append = labels.get(default) if default else None
+    if append is None:
+        return None
+    return " ".join(arg for arg in append.split() if not arg.startswith("initrd="))
+
+
+class KernelCache:
+    """从 ISO 中提取内核与 initramfs 并缓存，供 -kernel/-initrd 直接启动
+
+    缓存以 ISO 摘要为键: 对文件大小、主卷描述符 (含构建时间) 与内核、initramfs 的位置和大小
+    计算哈希，不需要读取整个数 GB 的镜像；ISO 重新构建后摘要随之变化。只保留最近使用的几个版本。
+    """
+
+    def __init__(self, cache_dir, keep=2):
+        self.cache_dir = cache_dir
+        self.keep = keep
+
+    @staticmethod
+    def iso_digest(iso, kernel, initrd):
+        h = hashlib.sha256()
+        h.update(str(os.path.getsize(iso.path)).encode())
+        h.update(iso.descriptor)
+        for entry in (kernel, initrd):
+            h.update(f"|{entry['extent']}:{entry['size']}".encode())
+        return h.hexdigest()[:16]
+
+    def get(self, iso_path):
+        """返回 (启动文件 {'kernel', 'initrd', 'append'}, 是否新提取)；ISO 中没有内核时抛出 ValueError"""
+        with IsoImage(iso_path) as iso:
+            kernel = iso.find(KERNEL_PATH)
+            initrd = iso.find(INITRD_PATH)
+            if kernel is None or initrd is None:
+                raise ValueError(f"ISO 中没有 {KERNEL_PATH} 或 {INITRD_PATH}")
+            entry_dir = os.path.join(self.cache_dir, self.iso_digest(iso, kernel, initrd))
+            files = {"kernel": os.path.join(entry_dir, "vmlinuz"), "initrd": os.path.join(entry_dir, "initramfs")}
+            append_path = os.path.join(entry_dir, "cmdline")
+
+            extracted = False
+            if not os.path.exists(append_path):
+                # 先提取到临时目录再改名，中途失败不会留下不完整的缓存
+                tmp_dir = entry_dir + ".tmp"
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+                os.makedirs(tmp_dir)
+                iso.extract(kernel, os.path.join(tmp_dir, "vmlinuz"))
+                iso.extract(initrd, os.path.join(tmp_dir, "initramfs"))
+                cfg = iso.find(ISOLINUX_CFG)
+                append = parse_isolinux_append(iso.read(cfg).decode("utf-8", "replace")) if cfg else None
+                with open(os.path.join(tmp_dir, "cmdline"), "w", encoding="utf-8") as f:
+                    f.write(append or DEFAULT_APPEND)
+                shutil.rmtree(entry_dir, ignore_errors=True)
+                os.replace(tmp_dir, entry_dir)
+                extracted = True
+
+        with open(append_path, "r", encoding="utf-8") as f:
+            files["append"] = f.read().strip()
+        os.utime(entry_dir)
+        self._prune(keep_dir=entry_dir)
+        return files, extracted
+
+    def _prune(self, keep_dir):
+        try:
+            entries = [os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir)]
+        except OSError:
+            return
+        entries = sorted((p for p in entries if os.path.isdir(p) and p != keep_dir),
+                         key=os.path.getmtime, reverse=True)
+        for path in entries[self.keep - 1:]:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def to_microvm(cmd):
+    """把 PC 机型的设备参数改写为 microvm 可用的形式
+
+    virtio-*-pci 改为对应的 virtio-mmio 设备 (virtio-*-device)，if=virtio 的磁盘改为显式的
+    virtio-blk-device，去掉显卡与 pvpanic 等依赖 PCI 的设备。
+    """
+    result = []
+    drives = 0
+    i = 0
+    while i < len(cmd):
+        arg = cmd[i]
+        value = cmd[i + 1] if i + 1 < len(cmd) else None
+        if (arg, value) in _MICROVM_DROP:
+            i += 2
+            continue
+        if arg == "-device" and value:
+            driver, sep, props = value.partition(",")
+            if driver.endswith("-pci"):
+                value = driver[:-len("-pci")] + "-device" + sep + props
+            result.extend([arg, value])
+            i += 2
+            continue
+        if arg == "-drive" and value and ",if=virtio" in value:
+            drives += 1
+            drive_id = f"mmiodrive{drives}"
+            result.extend(["-drive", value.replace(",if=virtio", f",if=none,id={drive_id}"),
+                           "-device", f"virtio-blk-device,drive={drive_id}"])
+            i += 2
+            continue
+        result.append(arg)
+        i += 1
+    return result
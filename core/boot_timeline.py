@@ -0,0 +1,152 @@
+import json
+import os
+import time
+
+# 启动阶段 (按发生顺序)，每个阶段从上一个已到达的标记持续到自身的标记
+BOOT_PHASES = [
+    ("qemu_spawn", "QEMU 进程启动"),
+    ("firmware", "固件与 isolinux"),
+    ("kernel", "内核启动"),
+    ("init", "系统服务初始化"),
+    ("certs", "证书生成"),
+    ("docker", "Docker 守护进程启动"),
+    ("image_load", "镜像加载"),
+    ("share", "共享目录与证书同步"),
+    ("port_open", "Docker 端口开放"),
+    ("tls_ping", "TLS 握手"),
+    ("compose_up", "启动容器"),
+    ("webui", "Web 界面响应"),
+]
+
+PHASE_LABELS = dict(BOOT_PHASES)
+PHASE_ORDER = [name for name, _ in BOOT_PHASES]
+
+# 串口输出中的标记 -> 该标记结束的阶段 (由内核与 setup.start 输出)
+SERIAL_MARKERS = [
+    ("Linux version", "firmware"),
+    ("Run /init", "kernel"),
+    ("V-OS PHASE init", "init"),
+    ("V-OS PHASE certs", "certs"),
+    ("V-OS PHASE docker", "docker"),
+    ("V-OS PHASE images", "image_load"),
+    ("V-OS CERTS READY", "share"),
+    ("V-OS READY", "compose_up"),
+]
+
+
+class BootTimeline:
+    """记录单次启动各阶段的到达时间"""
+
+    def __init__(self, profile):
+        self.profile = profile
+        self.start = time.time()
+        self.marks = {}
+
+    def mark(self, phase, timestamp=None):
+        """记录阶段结束时间，重复标记以第一次为准；返回是否为新标记"""
+        if phase in self.marks or phase not in PHASE_LABELS:
+            return False
+        self.marks[phase] = (timestamp or time.time()) - self.start
+        return True
+
+    def mark_from_serial(self, line):
+        for marker, phase in SERIAL_MARKERS:
+            if marker in line:
+                return phase if self.mark(phase) else None
+        return None
+
+    def durations(self):
+        """各阶段耗时 (秒)，未到达的阶段不出现在结果中"""
+        result = {}
+        previous = 0.0
+        for phase in PHASE_ORDER:
+            if phase in self.marks:
+                offset = self.marks[phase]
+                result[phase] = max(0.0, offset - previous)
+                previous = max(previous, offset)
+        return result
+
+    def current_phase(self):
+        """第一个尚未到达的阶段"""
+        reached = [PHASE_ORDER.index(p) for p in self.marks]
+        last = max(reached) if reached else -1
+        if last + 1 < len(PHASE_ORDER):
+            return PHASE_ORDER[last + 1]
+        return None
+
+    def summary(self):
+        return " | ".join(f"{PHASE_LABELS[p]} {d:.1f}s" for p, d in self.durations().items())
+
+    def to_dict(self, success):
+        return {
+            "profile": self.profile,
+            "start": self.start,
+            "success": success,
+            "total": max(self.marks.values()) if self.marks else 0.0,
+            "marks": self.marks,
+            "durations": self.durations(),
+        }
+
+
+class BootHistory:
+    """本地保存的启动历史 (JSON Lines)，用于估算进度与剩余时间"""
+
+    def __init__(self, path, max_entries=100):
+        self.path = path
+        self.max_entries = max_entries
+
+    def load(self):
+        entries = []
+        if not os.path.exists(self.path):
+            return entries
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        continue
+        except OSError:
+            pass
+        return entries
+
+    def append(self, entry):
+        entries = self.load()[-(self.max_entries - 1):] + [entry]
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for e in entries:
+                    f.write(json.dumps(e, ensure_ascii=False) + "\n")
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass
+
+    def expected_offsets(self, profile, recent=10):
+        """同一配置下最近几次成功启动各阶段结束时间的中位数"""
+        samples = {}
+        entries = [e for e in self.load() if e.get("success") and e.get("profile") == profile]
+        for entry in entries[-recent:]:
+            for phase, offset in entry.get("marks", {}).items():
+                samples.setdefault(phase, []).append(offset)
+        return {phase: sorted(v)[len(v) // 2] for phase, v in samples.items()}
+
+    def estimate(self, timeline):
+        """返回 (当前阶段, 进度 0~1, 预计剩余秒数)，没有历史时进度与剩余时间为 None"""
+        phase = timeline.current_phase()
+        elapsed = time.time() - timeline.start
+        expected = self.expected_offsets(timeline.profile)
+        if phase is None:
+            return None, 1.0, 0.0
+        if not expected:
+            return phase, None, None
+
+        total = max(expected.values())
+        # 当前阶段的预计结束时间；超时时保持在剩余 1 秒，避免进度倒退
+        upcoming = [expected[p] for p in PHASE_ORDER[PHASE_ORDER.index(phase):] if p in expected]
+        phase_end = upcoming[0] if upcoming else total
+        remaining = max(total - phase_end, 0.0) + max(phase_end - elapsed, 0.0)
+        if remaining <= 0:
+            remaining = 1.0
+        progress = min(elapsed / (elapsed + remaining), 0.99)
+        return phase, progress, remaining
@@ -0,0 +1,215 @@
+"""无界面模式命令行
+
+    nekro-agent --headless start        后台启动守护进程与虚拟机
+    nekro-agent --headless run          前台运行 (供服务管理器使用)
+    nekro-agent --headless stop
+    nekro-agent --headless status
+    nekro-agent --headless logs -n 200 -f
+    nekro-agent --headless exec -- df -h    在虚拟机内执行命令 (通过客户机代理)
+
+status/logs/stop 只与守护进程通信，不加载 docker 等重量级依赖。
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from core.config_manager import ConfigManager
+from core import daemon
+
+
+def _format_entry(entry):
+    ts = datetime.fromtimestamp(entry["t"]).strftime("%Y-%m-%d %H:%M:%S")
+    return f"{ts} [{entry['l']}] {entry['m']}"
+
+
+def _connect(config):
+    """返回可用的守护进程状态，未运行时返回 None"""
+    state = daemon.read_state(config)
+    if not state:
+        return None
+    try:
+        # 只用 ping 探测存活: status 需要访问客户机代理，代理卡住时会超时
+        next(daemon.request(state, "ping", timeout=2))
+        return state
+    except (OSError, ValueError, StopIteration):
+        return None
+
+
+def _spawn_command():
+    if getattr(sys, 'frozen', False):
+        return [sys.executable, "--headless", "run"]
+    main_py = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main.py")
+    return [sys.executable, main_py, "--headless", "run"]
+
+
+def cmd_start(config, args):
+    state = _connect(config)
+    if state:
+        print(f"守护进程已在运行 (PID {state['pid']})")
+        return 0
+    kwargs = {"stdin": subprocess.DEVNULL, "stdout": subprocess.DEVNULL, "stderr": subprocess.DEVNULL,
+              "cwd": config.base_path}
+    if os.name == "nt":
+        kwargs["creationflags"] = (subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+                                   | subprocess.CREATE_NO_WINDOW)
+    else:
+        kwargs["start_new_session"] = True
+    process = subprocess.Popen(_spawn_command(), **kwargs)
+
+    deadline = time.time() + args.timeout
+    while time.time() < deadline:
+        state = _connect(config)
+        if state and state["pid"] == process.pid:
+            print(f"守护进程已启动 (PID {process.pid})，使用 logs -f 查看启动进度")
+            return 0
+        if process.poll() is not None:
+            print(f"守护进程启动失败 (退出码 {process.returncode})，使用 logs 查看原因")
+            return 1
+        time.sleep(0.1)
+    print("等待守护进程超时")
+    return 1
+
+
+def cmd_run(config, args):
+    return daemon.Daemon(config).run()
+
+
+def cmd_stop(config, args):
+    state = _connect(config)
+    if not state:
+        print("守护进程未运行")
+        return 0
+    list(daemon.request(state, "stop"))
+    deadline = time.time() + args.timeout
+    while time.time() < deadline:
+        if daemon.read_state(config) is None:
+            print("虚拟机已停止")
+            return 0
+        time.sleep(0.2)
+    print("等待守护进程退出超时")
+    return 1
+
+
+def cmd_status(config, args):
+    state = _connect(config)
+    if not state:
+        info = {"status": "未运行"}
+    else:
+        # status 会经客户机代理读取虚拟机资源，代理较慢时需要更长的超时
+        info = next(daemon.request(state, "status", timeout=15))
+        info.pop("ok", None)
+    if args.json:
+        print(json.dumps(info, ensure_ascii=False))
+        return 0 if state else 3
+    if not state:
+        print("守护进程未运行")
+        return 3
+    uptime = int(time.time() - info["started_at"])
+    print(f"状态:      {info['status']}")
+    print(f"PID:       {info['pid']}")
+    print(f"运行时间:  {uptime // 3600}:{uptime // 60 % 60:02d}:{uptime % 60:02d}")
+    print(f"镜像:      {os.path.basename(info['iso'] or '')}")
+    print(f"Docker:    {'就绪' if info['docker_ready'] else '未就绪'}")
+    if info["guest_cpus"]:
+        print(f"CPU:       {info['guest_cpus']}")
+    if info["share_backend"]:
+        print(f"共享目录:  {info['share_backend']}")
+    print(f"WebUI:     http://127.0.0.1:{info['web_port']}")
+    guest = info.get("guest")
+    if guest:
+        mem = guest["memory"]
+        used_mb = (mem["total_bytes"] - mem["available_bytes"]) // (1024 * 1024)
+        print(f"内存:      {used_mb} / {mem['total_bytes'] // (1024 * 1024)} MB")
+        print(f"负载:      {' '.join(f'{v:.2f}' for v in guest['load'])}")
+        for disk in guest["disks"]:
+            if disk["mountpoint"] == "/var/lib/docker":
+                print(f"数据盘:    {disk['used_bytes'] / 1024 ** 3:.1f} / {disk['total_bytes'] / 1024 ** 3:.1f} GB")
+    requests = info.get("docker_requests") or {}
+    if requests:
+        print("Docker 请求耗时 (p50 / p95 ms, 次数):")
+        for endpoint, r in sorted(requests.items(), key=lambda item: -item[1]["p95_ms"])[:8]:
+            print(f"  {endpoint:<40}{r['p50_ms']:>8}{r['p95_ms']:>8}{r['count']:>8}")
+    return 0
+
+
+def cmd_logs(config, args):
+    state = _connect(config)
+    try:
+        if state:
+            for entry in daemon.request(state, "logs", n=args.lines, follow=args.follow):
+                print(_format_entry(entry), flush=True)
+            return 0
+        if args.follow:
+            print("守护进程未运行，无法跟随日志")
+            return 1
+        # 守护进程未运行时直接读取日志归档
+        log_dir = os.path.join(config.base_path, "logs")
+        if not os.path.isdir(log_dir):
+            return 0
+        from core.log_archive import LogArchive
+        archive = LogArchive(log_dir)
+        try:
+            for entry in archive.query(limit=args.lines):
+                print(_format_entry(entry))
+        finally:
+            archive.close()
+        return 0
+    except KeyboardInterrupt:
+        return 0
+
+
+def cmd_exec(config, args):
+    state = _connect(config)
+    if not state:
+        print("守护进程未运行")
+        return 1
+    argv = args.argv[1:] if args.argv[:1] == ["--"] else args.argv
+    result = next(daemon.request(state, "exec", timeout=args.timeout + 5, argv=argv, exec_timeout=args.timeout))
+    if not result.get("ok"):
+        print(result.get("error"))
+        return 1
+    sys.stdout.write(result["stdout"])
+    sys.stderr.write(result["stderr"])
+    return result["exitcode"]
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="nekro-agent --headless", description="Nekro Agent 无界面模式")
+    parser.add_argument("--config", help="配置文件路径 (默认为程序目录下的 config.json)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("start", help="后台启动虚拟机")
+    p.add_argument("--timeout", type=float, default=30, help="等待守护进程就绪的超时 (秒)")
+    p.set_defaults(func=cmd_start)
+
+    p = sub.add_parser("run", help="前台运行虚拟机，Ctrl+C 停止")
+    p.set_defaults(func=cmd_run)
+
+    p = sub.add_parser("stop", help="停止虚拟机")
+    p.add_argument("--timeout", type=float, default=60, help="等待虚拟机关机的超时 (秒)")
+    p.set_defaults(func=cmd_stop)
+
+    p = sub.add_parser("status", help="查看运行状态")
+    p.add_argument("--json", action="store_true", help="以 JSON 输出")
+    p.set_defaults(func=cmd_status)
+
+    p = sub.add_parser("logs", help="查看日志")
+    p.add_argument("-n", "--lines", type=int, default=100, help="显示最近的行数")
+    p.add_argument("-f", "--follow", action="store_true", help="持续输出新日志")
+    p.set_defaults(func=cmd_logs)
+
+    p = sub.add_parser("exec", help="在虚拟机内执行命令")
+    p.add_argument("--timeout", type=float, default=30, help="命令超时 (秒)")
+    p.add_argument("argv", nargs=argparse.REMAINDER, help="命令及参数 (可用 -- 分隔)")
+    p.set_defaults(func=cmd_exec)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    config = ConfigManager(args.config)
+    return args.func(config, args)
@@ -22,7 +22,18 @@ class ConfigManager:
             "shared_dir": "shared",
             "autostart": False,
             "first_run": True,
-            "last_iso": ""
+            "last_iso": "",
+            "fast_resume": False,
+            "share_backend": "auto",
+            "share_9p_msize": 512000,
+            "share_9p_cache": "mmap",
+            "metrics_interval": 2.0,
+            "balloon_enabled": True,
+            "balloon_floor_mb": 2048,
+            "balloon_ceiling_mb": 0,
+            "cpu_profile": "auto",
+            "tcg_tb_size": 0,
+            "boot_mode": "cdrom"
         }
         self.config = self.load_config()
 
@@ -50,6 +61,17 @@ class ConfigManager:
         self.config[key] = value
         self.save_config()
 
+    def apply_to_vm(self, vm):
+        """把虚拟机相关设置应用到 VMManager (图形界面与无界面模式共用)"""
+        vm.share_9p_msize = self.get("share_9p_msize")
+        vm.share_9p_cache = self.get("share_9p_cache")
+        vm.balloon_enabled = self.get("balloon_enabled")
+        vm.balloon_floor_mb = self.get("balloon_floor_mb")
+        vm.balloon_ceiling_mb = self.get("balloon_ceiling_mb") or None
+        vm.cpu_profile = self.get("cpu_profile")
+        vm.tcg_tb_size = self.get("tcg_tb_size") or None
+        vm.boot_mode = self.get("boot_mode")
+
     def get_absolute_path(self, key):
         """获取配置中路径的绝对路径"""
         value = self.get(key)
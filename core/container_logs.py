@@ -0,0 +1,197 @@
+import threading
+import time
+from datetime import datetime, timezone
+
+from core.log_buffer import LogRingBuffer
+from core.streams import LineDecoder
+
+# 日志页的日志源 -> 需要跟随的来源
+DOCKER_EVENTS = "docker"
+AGENT_CONTAINERS = ("nekro_agent", "nekro_postgres", "nekro_qdrant", "nekro_napcat")
+LOG_SOURCES = {
+    "Docker日志": (DOCKER_EVENTS,),
+    "Agent容器日志": AGENT_CONTAINERS,
+}
+
+
+def parse_timestamp(text):
+    """解析 Docker 的 RFC3339Nano 时间戳，返回 epoch 秒"""
+    text = text.rstrip("Z")
+    if "." in text:
+        base, frac = text.split(".", 1)
+        frac = float("0." + frac[:9])
+    else:
+        base, frac = text, 0.0
+    dt = datetime.strptime(base, "%Y-%m-%dT%H:%M:%S").replace(tzinfo=timezone.utc)
+    return dt.timestamp() + frac
+
+
+def guess_level(msg):
+    lower = msg.lower()
+    if "error" in lower or "fatal" in lower or "traceback" in lower:
+        return "error"
+    if "warn" in lower:
+        return "warn"
+    return "info"
+
+
+class ContainerLogStreamer:
+    """跟随 Docker 事件与容器日志
+
+    每个来源一个后台线程，记录写入各自固定容量的环形缓冲区；断线 (虚拟机重启、读超时等) 后
+    从最后一条记录的时间戳继续，切换日志源时直接回放缓冲区，不会重新拉取完整历史。
+    订阅方只会收到当前订阅来源的记录，通常是 LogView.push (有界队列，界面跟不上时丢弃旧行)。
+
+    背压以丢弃实现: 读取线程不限速，Docker 输出多快就读多快；内存占用由环形缓冲区、LogView
+    的有界队列与 LineDecoder 的单行上限约束，超出部分直接丢弃，不会反过来阻塞容器输出。
+    """
+
+    def __init__(self, get_client, capacity=20000, initial_tail=500, retry_interval=2.0, sink=None):
+        self.get_client = get_client  # 返回当前 DockerClient，虚拟机未就绪时返回 None
+        self.sink = sink  # 每条新记录都会调用 sink(source, msg, level)，用于写入日志归档
+        self.capacity = capacity
+        self.initial_tail = initial_tail
+        self.retry_interval = retry_interval
+
+        self._lock = threading.Lock()  # 保护缓冲区与订阅
+        self._buffers = {}
+        self._last_ts = {}
+        self._streams = {}
+        self._subscriber = None
+        self._subscribed = ()
+        self._threads = {}
+        self._stop = threading.Event()
+
+    def start(self, sources):
+        """开始跟随指定来源 (已在跟随的来源不会重复启动)"""
+        for source in sources:
+            if source in self._threads:
+                continue
+            with self._lock:
+                self._buffers.setdefault(source, LogRingBuffer(self.capacity))
+            target = self._follow_events if source == DOCKER_EVENTS else self._follow_container
+            thread = threading.Thread(target=target, args=(source,), name=f"logs-{source}", daemon=True)
+            self._threads[source] = thread
+            thread.start()
+
+    def stop(self):
+        self._stop.set()
+        with self._lock:
+            streams = list(self._streams.values())
+        for stream in streams:
+            try:
+                stream.close()
+            except Exception:
+                pass
+
+    def subscribe(self, sources, callback):
+        """切换订阅：先把缓冲区中已有的记录按时间顺序回放给 callback，再推送新记录"""
+        self.start(sources)
+        multiplexed = len(sources) > 1
+        with self._lock:
+            history = []
+            for source in sources:
+                buffer = self._buffers[source]
+                history.extend((ts, source, msg, level) for ts, msg, level in
+                               (buffer[i] for i in range(len(buffer))))
+            history.sort(key=lambda item: item[0])
+            for ts, source, msg, level in history:
+                callback(self._format(source, msg, multiplexed), level)
+            self._subscriber = callback
+            self._subscribed = tuple(sources)
+
+    def unsubscribe(self):
+        with self._lock:
+            self._subscriber = None
+            self._subscribed = ()
+
+    @staticmethod
+    def _format(source, msg, multiplexed):
+        return f"[{source}] {msg}" if multiplexed else msg
+
+    def _emit(self, source, ts, msg, level, resume_ts):
+        if ts <= resume_ts:
+            return  # 断线重连时 since 只精确到秒，会重复返回上次已收到的记录
+        with self._lock:
+            self._last_ts[source] = max(ts, self._last_ts.get(source, 0))
+            self._buffers[source].extend([(ts, msg, level)])
+            if self._subscriber and source in self._subscribed:
+                self._subscriber(self._format(source, msg, len(self._subscribed) > 1), level)
+        if self.sink:
+            self.sink(source, msg, level)
+
+    def _wait_client(self):
+        while not self._stop.is_set():
+            client = self.get_client()
+            if client is not None:
+                return client
+            self._stop.wait(self.retry_interval)
+        return None
+
+    def _follow_container(self, name):
+        while not self._stop.is_set():
+            client = self._wait_client()
+            if client is None:
+                return
+            try:
+                container = client.containers.get(name)
+                last_ts = self._last_ts.get(name, 0)
+                if last_ts:
+                    stream = container.logs(stream=True, follow=True, timestamps=True, since=int(last_ts))
+                else:
+                    stream = container.logs(stream=True, follow=True, timestamps=True, tail=self.initial_tail)
+                with self._lock:
+                    self._streams[name] = stream
+                self._read_log_stream(name, stream, last_ts)
+            except Exception:
+                pass
+            finally:
+                with self._lock:
+                    self._streams.pop(name, None)
+            self._stop.wait(self.retry_interval)
+
+    def _read_log_stream(self, name, stream, resume_ts):
+        # 开启 tty 的容器输出不按行分帧，需要自行拼接并增量解码 UTF-8 (超长行按 max_line 强制断行)
+        decoder = LineDecoder()
+        for chunk in stream:
+            if self._stop.is_set():
+                return
+            for line in decoder.feed(chunk):
+                self._emit_log_line(name, line, resume_ts)
+        for line in decoder.flush():
+            self._emit_log_line(name, line, resume_ts)
+
+    def _emit_log_line(self, name, line, resume_ts):
+        stamp, _, msg = line.partition(" ")
+        try:
+            ts = parse_timestamp(stamp)
+        except ValueError:
+            ts, msg = time.time(), line
+        if msg:
+            self._emit(name, ts, msg, guess_level(msg), resume_ts)
+
+    def _follow_events(self, source):
+        while not self._stop.is_set():
+            client = self._wait_client()
+            if client is None:
+                return
+            try:
+                resume_ts = self._last_ts.get(source, 0)
+                stream = client.events(decode=True, since=int(resume_ts or time.time() - 3600))
+                with self._lock:
+                    self._streams[source] = stream
+                for event in stream:
+                    if self._stop.is_set():
+                        return
+                    ts = event.get("timeNano", 0) / 1e9 or float(event.get("time", time.time()))
+                    actor = event.get("Actor", {}).get("Attributes", {})
+                    name = actor.get("name") or event.get("Actor", {}).get("ID", "")[:12]
+                    msg = f"{event.get('Type', '')} {event.get('Action', '')} {name}".strip()
+                    level = "error" if event.get("Action") in ("die", "oom", "kill") else "info"
+                    self._emit(source, ts, msg, level, resume_ts)
+            except Exception:
+                pass
+            finally:
+                with self._lock:
+                    self._streams.pop(source, None)
+            self._stop.wait(self.retry_interval)
@@ -0,0 +1,26 @@
+# CPU 配置: 名称 -> QEMU -cpu 参数
+# cpu 为 None 表示自动 (基准测试优选结果，否则使用加速器探测结果)；
+# accels 限定可用的加速器 (host 直通只能用于 KVM/HVF)
+CPU_PROFILES = {
+    "auto": {"label": "自动 (探测或基准测试结果)", "cpu": None},
+    "host": {"label": "宿主机直通 (host)", "cpu": "host", "accels": ("kvm", "hvf")},
+    "max": {"label": "全部可用特性 (max)", "cpu": "max"},
+    "x86-64-v3": {"label": "x86-64-v3 (AVX2/FMA)",
+                  "cpu": "qemu64,+ssse3,+sse4.1,+sse4.2,+popcnt,+cx16,+xsave,+avx,+avx2,+fma,"
+                         "+bmi1,+bmi2,+movbe,+f16c,+abm"},
+    "x86-64-v2": {"label": "x86-64-v2 (SSE4.2)", "cpu": "qemu64,+ssse3,+sse4.1,+sse4.2,+popcnt,+cx16"},
+    "qemu64": {"label": "兼容模式 (qemu64)", "cpu": "qemu64"},
+}
+
+# TCG 翻译块缓存大小候选 (MB)，0 表示使用 QEMU 默认值
+TCG_TB_SIZES = (0, 256, 512, 1024)
+
+
+def resolve_cpu(profile, accel_name, default_cpu):
+    """返回 (-cpu 参数, 提示信息)；配置不适用于当前加速器时回退到 default_cpu"""
+    spec = CPU_PROFILES.get(profile) or CPU_PROFILES["auto"]
+    if spec["cpu"] is None:
+        return default_cpu, None
+    if accel_name not in spec.get("accels", (accel_name,)):
+        return default_cpu, f"CPU 配置 {profile} 不支持 {accel_name.upper()}，改用 {default_cpu}"
+    return spec["cpu"], None
@@ -0,0 +1,273 @@
+"""无界面守护进程
+
+不加载 Qt，只运行虚拟机生命周期管理。守护进程在 127.0.0.1 的随机端口上提供控制接口
+(每行一个 JSON 请求/响应)，端口、进程号与访问令牌写在 vm-data/daemon.json 中，供 core/cli.py 使用。
+
+请求: {"token": "...", "cmd": "ping" | "status" | "stop" | "logs" | "exec", ...}
+ping 只确认守护进程存活，不访问虚拟机；status 会通过客户机代理读取虚拟机状态，可能较慢。
+"""
+import collections
+import json
+import os
+import secrets
+import signal
+import socket
+import socketserver
+import threading
+import time
+
+from core.config_manager import ConfigManager
+from core.log_archive import LogArchive
+
+STATE_FILE = "daemon.json"
+# 这些状态出现后虚拟机不会再自行恢复，守护进程停止虚拟机并退出
+FAILED_STATUSES = ("启动失败", "虚拟机崩溃", "启动超时")
+FINAL_STATUSES = ("已停止",) + FAILED_STATUSES
+
+
+def data_dir_for(config):
+    return os.path.join(config.base_path, "vm-data")
+
+
+def state_path_for(config):
+    return os.path.join(data_dir_for(config), STATE_FILE)
+
+
+def read_state(config):
+    """读取守护进程状态文件，不存在或已损坏时返回 None"""
+    try:
+        with open(state_path_for(config), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def request(state, cmd, timeout=5, **params):
+    """向守护进程发送请求，逐条返回响应 (logs --follow 时持续返回)"""
+    payload = {"token": state["token"], "cmd": cmd, **params}
+    with socket.create_connection(("127.0.0.1", state["port"]), timeout=timeout) as sock:
+        sock.sendall((json.dumps(payload, ensure_ascii=False) + "\n").encode("utf-8"))
+        if params.get("follow"):
+            sock.settimeout(None)
+        with sock.makefile("r", encoding="utf-8") as f:
+            for line in f:
+                yield json.loads(line)
+
+
+class _ControlHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        daemon = self.server.daemon_ref
+        try:
+            req = json.loads(self.rfile.readline().decode("utf-8"))
+        except (ValueError, UnicodeDecodeError):
+            return
+        if not secrets.compare_digest(str(req.get("token", "")), daemon.token):
+            self._send({"ok": False, "error": "令牌无效"})
+            return
+        cmd = req.get("cmd")
+        try:
+            if cmd == "ping":
+                self._send({"ok": True, "pid": os.getpid()})
+            elif cmd == "status":
+                self._send({"ok": True, **daemon.status()})
+            elif cmd == "stop":
+                self._send({"ok": True})
+                daemon.request_stop()
+            elif cmd == "logs":
+                self._stream_logs(daemon, int(req.get("n", 100)), bool(req.get("follow")))
+            elif cmd == "exec":
+                self._send(daemon.guest_exec(req.get("argv") or [], float(req.get("exec_timeout", 30))))
+            else:
+                self._send({"ok": False, "error": f"未知命令: {cmd}"})
+        except (OSError, ValueError):
+            pass
+
+    def _send(self, obj):
+        self.wfile.write((json.dumps(obj, ensure_ascii=False) + "\n").encode("utf-8"))
+        self.wfile.flush()
+
+    def _stream_logs(self, daemon, n, follow):
+        seq, entries = daemon.logs_since(None, n)
+        for entry in entries:
+            self._send(entry)
+        while follow and not daemon.stopping.is_set():
+            seq, entries = daemon.logs_since(seq, wait=1.0)
+            for entry in entries:
+                self._send(entry)
+
+
+class _ControlServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class Daemon:
+    """以无界面方式运行虚拟机，日志写入归档 (logs 目录) 与内存中的最近日志"""
+
+    def __init__(self, config=None, recent=5000):
+        # 延迟导入: status/logs 等命令不需要加载虚拟机管理模块
+        from core.vm_manager import VMManager
+        from core.container_logs import ContainerLogStreamer, LOG_SOURCES
+
+        self.config = config or ConfigManager()
+        self.vm = VMManager(base_path=self.config.base_path, data_dir=data_dir_for(self.config))
+        self.config.apply_to_vm(self.vm)
+        self.log_archive = LogArchive(os.path.join(self.vm.base_path, "logs"))
+        self.container_logs = ContainerLogStreamer(
+            lambda: self.vm.docker_client,
+            sink=lambda source, msg, level: self.log_archive.write(msg, level, source)
+        )
+        self._container_sources = [s for sources in LOG_SOURCES.values() for s in sources]
+
+        self.token = secrets.token_hex(16)
+        self.state_path = state_path_for(self.config)
+        self.stopping = threading.Event()
+        self.started_at = time.time()
+        self.iso = None
+        self.vm_status = "未启动"
+        # 最近日志 (序号, 记录)，供 logs 命令与 --follow 使用
+        self._recent = collections.deque(maxlen=recent)
+        self._seq = 0
+        self._log_cond = threading.Condition()
+        self._server = None
+
+        self.vm.log_received.connect(self._on_log)
+        self.vm.status_changed.connect(self._on_status)
+
+    # --- 日志与状态 ---
+
+    def _on_log(self, msg, level):
+        source = "serial" if level == "vm" else "manager"
+        self.log_archive.write(msg, level, source)
+        with self._log_cond:
+            self._seq += 1
+            self._recent.append((self._seq, {"t": time.time(), "l": level, "s": source, "m": msg}))
+            self._log_cond.notify_all()
+
+    def _on_status(self, status):
+        self.vm_status = status
+        self._on_log(f"状态: {status}", "info")
+        if status == "运行中":
+            self.container_logs.start(self._container_sources)
+        elif status in FINAL_STATUSES or status.endswith("请重试"):
+            self.request_stop()
+
+    def exit_code(self):
+        """启动失败、超时或虚拟机崩溃时以非零退出码结束"""
+        return 1 if self.vm_status in FAILED_STATUSES or self.vm_status.endswith("请重试") else 0
+
+    def logs_since(self, seq, n=None, wait=0):
+        """返回 (最新序号, 序号大于 seq 的记录)；seq 为 None 时返回最近 n 条"""
+        with self._log_cond:
+            if seq is not None and wait and self._seq <= seq:
+                self._log_cond.wait(wait)
+            if seq is None:
+                entries = [entry for _, entry in list(self._recent)[-n:]] if n else []
+            else:
+                entries = [entry for s, entry in self._recent if s > seq]
+            return self._seq, entries
+
+    def status(self):
+        return {
+            "pid": os.getpid(),
+            "status": self.vm_status,
+            "running": self.vm.is_running,
+            "docker_ready": self.vm.docker_client is not None,
+            "iso": self.iso,
+            "started_at": self.started_at,
+            "guest_cpus": self.vm.guest_cpus,
+            "web_port": self.vm.web_port,
+            "share_backend": self.vm.share_backend,
+            "docker_requests": self.vm.docker.stats.snapshot(),
+            # 通过客户机代理读取，不经过 Docker API；代理不可用时为 None
+            "guest": self.vm.guest_stats(timeout=1),
+        }
+
+    def guest_exec(self, argv, timeout):
+        if not argv:
+            return {"ok": False, "error": "缺少要执行的命令"}
+        result = self.vm.guest_exec(argv, timeout=timeout)
+        if result is None:
+            return {"ok": False, "error": "客户机代理不可用"}
+        return {"ok": True, "exitcode": result["exitcode"],
+                "stdout": result["stdout"].decode("utf-8", "replace"),
+                "stderr": result["stderr"].decode("utf-8", "replace")}
+
+    # --- 生命周期 ---
+
+    def select_iso(self):
+        """与图形界面相同的规则: 优先使用上次选择的镜像，否则使用第一个"""
+        iso_dir = os.path.join(self.vm.base_path, "v-core")
+        isos = sorted(f for f in os.listdir(iso_dir) if f.endswith(".iso")) if os.path.isdir(iso_dir) else []
+        if not isos:
+            return None
+        last_iso = self.config.get("last_iso")
+        return os.path.join(iso_dir, last_iso if last_iso in isos else isos[0])
+
+    def request_stop(self):
+        self.stopping.set()
+
+    def _write_state(self):
+        os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        state = {"pid": os.getpid(), "port": self._server.server_address[1], "token": self.token,
+                 "started_at": self.started_at}
+        with open(self.state_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(self.state_path + ".tmp", self.state_path)
+
+    def _remove_state(self):
+        state = read_state(self.config)
+        if state and state.get("pid") == os.getpid():
+            try:
+                os.remove(self.state_path)
+            except OSError:
+                pass
+
+    def run(self):
+        """前台运行直到收到 stop 命令、信号或虚拟机退出，返回退出码"""
+        existing = read_state(self.config)
+        if existing and existing.get("pid") != os.getpid():
+            try:
+                next(request(existing, "ping", timeout=1))
+                self._on_log(f"守护进程已在运行 (PID {existing['pid']})", "error")
+                return 1
+            except (OSError, ValueError, StopIteration):
+                pass  # 状态文件残留，进程已不存在
+
+        self.iso = self.select_iso()
+        if not self.iso:
+            self._on_log("未在 v-core 目录发现任何 ISO 镜像文件", "error")
+            return 1
+
+        self._server = _ControlServer(("127.0.0.1", 0), _ControlHandler)
+        self._server.daemon_ref = self
+        threading.Thread(target=self._server.serve_forever, name="daemon-control", daemon=True).start()
+        self._write_state()
+
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: self.request_stop())
+
+        code = 0
+        try:
+            self._on_log(f"无界面模式启动虚拟机: {os.path.basename(self.iso)}", "info")
+            if not self.vm.start_vm(iso_path=self.iso,
+                                    custom_shared_dir=self.config.get_absolute_path("shared_dir"),
+                                    fast_resume=self.config.get("fast_resume"),
+                                    share_backend=self.config.get("share_backend")):
+                code = 1
+                self.request_stop()
+            # 定时唤醒以便在 Windows 上也能及时响应 Ctrl+C
+            while not self.stopping.wait(0.5):
+                pass
+            code = code or self.exit_code()
+        finally:
+            if self.vm.is_running:
+                self.vm.stop_vm()
+            self.container_logs.stop()
+            with self._log_cond:
+                self._log_cond.notify_all()
+            self._server.shutdown()
+            self._server.server_close()
+            self._remove_state()
+            self.log_archive.close()
+        return code
@@ -0,0 +1,123 @@
+import collections
+import os
+import re
+import threading
+
+# 路径中紧跟这些资源名的一段是对象 ID/名称，统计时合并为 {id}
+_ID_COLLECTIONS = {"containers", "exec", "images", "networks", "volumes", "plugins"}
+_ID_EXCEPTIONS = {"json", "create", "prune", "load", "search"}
+_VERSION_PREFIX = re.compile(r"^/v\d+\.\d+")
+
+
+def endpoint_of(method, path_url):
+    """'GET', '/v1.41/containers/abc/logs?follow=1' -> 'GET /containers/{id}/logs'"""
+    path = _VERSION_PREFIX.sub("", path_url.split("?", 1)[0])
+    parts = path.split("/")
+    for i in range(1, len(parts)):
+        if parts[i - 1] in _ID_COLLECTIONS and parts[i] not in _ID_EXCEPTIONS:
+            parts[i] = "{id}"
+    return f"{method} {'/'.join(parts)}"
+
+
+class LatencyStats:
+    """按接口记录最近的请求耗时 (到收到响应头为止，流式接口不含后续数据)"""
+
+    def __init__(self, window=256):
+        self.window = window
+        self._lock = threading.Lock()
+        self._samples = {}
+        self._counts = collections.Counter()
+        self._errors = collections.Counter()
+
+    def record(self, endpoint, seconds, error=False):
+        with self._lock:
+            samples = self._samples.get(endpoint)
+            if samples is None:
+                samples = self._samples[endpoint] = collections.deque(maxlen=self.window)
+            samples.append(seconds)
+            self._counts[endpoint] += 1
+            if error:
+                self._errors[endpoint] += 1
+
+    def snapshot(self):
+        """{接口: {'count', 'errors', 'p50_ms', 'p95_ms', 'max_ms'}}"""
+        with self._lock:
+            items = {k: sorted(v) for k, v in self._samples.items()}
+            counts, errors = dict(self._counts), dict(self._errors)
+        result = {}
+        for endpoint, values in items.items():
+            result[endpoint] = {
+                "count": counts[endpoint],
+                "errors": errors.get(endpoint, 0),
+                "p50_ms": round(values[len(values) // 2] * 1000, 1),
+                "p95_ms": round(values[min(len(values) - 1, int(len(values) * 0.95))] * 1000, 1),
+                "max_ms": round(values[-1] * 1000, 1),
+            }
+        return result
+
+
+class DockerConnection:
+    """虚拟机内 Docker 守护进程的长连接客户端
+
+    整个程序共用一个 DockerClient: 连接池大小足以容纳同时进行的日志流、事件流、stats 与 exec，
+    连接保持 keep-alive，TLS 握手只在建立新连接时发生。虚拟机重启后 (新端口或新证书) 调用
+    connect 会关闭旧客户端并建立新的，使用方每次通过 client 取得当前客户端即可自动切换。
+    """
+
+    def __init__(self, pool_size=32, timeout=5, log=None):
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.log = log or (lambda msg, level: None)
+        self.stats = LatencyStats()
+        self._client = None
+        self._key = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        return self._client
+
+    def connect(self, host_port, ca, cert, key):
+        """返回指向 host_port 的客户端；端口与证书未变化时复用现有客户端"""
+        import docker  # 首次连接时才加载 (导入耗时较长)
+
+        identity = (host_port, ca, cert, key, self._cert_stamp(cert))
+        with self._lock:
+            if self._client is not None and self._key == identity:
+                return self._client
+            old, self._client = self._client, None
+            tls_config = docker.tls.TLSConfig(client_cert=(cert, key), ca_cert=ca, verify=True)
+            client = docker.DockerClient(base_url=f"tcp://127.0.0.1:{host_port}", tls=tls_config,
+                                         timeout=self.timeout, max_pool_size=self.pool_size)
+            client.api.hooks["response"].append(self._on_response)
+            self._client, self._key = client, identity
+        if old is not None:
+            self._close_client(old)
+            self.log("Docker 连接已切换到新的虚拟机实例", "debug")
+        return client
+
+    @staticmethod
+    def _cert_stamp(cert):
+        # 虚拟机每次启动都会重新生成证书，路径不变时以修改时间区分
+        try:
+            return os.stat(cert).st_mtime_ns
+        except OSError:
+            return None
+
+    def _on_response(self, response, *args, **kwargs):
+        request = response.request
+        self.stats.record(endpoint_of(request.method, request.path_url), response.elapsed.total_seconds(),
+                          error=response.status_code >= 500)
+
+    def close(self):
+        with self._lock:
+            client, self._client, self._key = self._client, None, None
+        if client is not None:
+            self._close_client(client)
+
+    @staticmethod
+    def _close_client(client):
+        try:
+            client.close()
+        except Exception:
+            pass
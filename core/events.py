@@ -0,0 +1,55 @@
+import threading
+
+
+class BoundSignal:
+    """绑定到实例的信号，回调在 emit 所在的线程中同步执行"""
+
+    def __init__(self):
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    def connect(self, callback, *_):
+        # 兼容 pyqtSignal.connect(slot, type) 的调用方式，连接类型被忽略
+        with self._lock:
+            self._callbacks.append(callback)
+
+    def disconnect(self, callback=None):
+        with self._lock:
+            if callback is None:
+                self._callbacks.clear()
+            else:
+                self._callbacks.remove(callback)
+
+    def emit(self, *args):
+        with self._lock:
+            callbacks = list(self._callbacks)
+        for callback in callbacks:
+            callback(*args)
+
+
+class Signal:
+    """不依赖 Qt 的信号，用法与 pyqtSignal 相同:
+
+        class VMManager:
+            log_received = Signal(str, str)
+
+        vm.log_received.connect(callback)
+        vm.log_received.emit("消息", "info")
+
+    回调直接在发出信号的 (工作) 线程中执行；界面需要通过 ui/vm_bridge.py 转发到主线程。
+    """
+
+    def __init__(self, *types):
+        self.types = types
+        self.name = None
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        bound = instance.__dict__.get(self.name)
+        if bound is None:
+            bound = instance.__dict__.setdefault(self.name, BoundSignal())
+        return bound
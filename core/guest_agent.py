@@ -0,0 +1,247 @@
+import base64
+import json
+import random
+import socket
+import threading
+import time
+
+# virtio-serial 端口名 (qemu-guest-agent 的默认路径 /dev/virtio-ports/org.qemu.guest_agent.0)
+AGENT_CHANNEL = "org.qemu.guest_agent.0"
+
+
+class GuestAgentError(Exception):
+    """客户机代理命令返回的错误"""
+
+
+class GuestAgentClient:
+    """qemu-guest-agent 客户端
+
+    代理通过 virtio-serial 端口连接到 QEMU 的 TCP 字符设备。协议与 QMP 相同 (每行一个 JSON)，
+    但没有握手，也不保证响应与请求一一对应: 连接后及每次超时后先用 guest-sync-delimited 同步，
+    丢弃残留的旧响应。代理单线程处理命令，调用在锁内串行执行。
+    """
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.sock = None
+        self.connected = False
+        self._buffer = bytearray()
+        self._lock = threading.Lock()
+        self._synced = False
+        # 随机起点: 旧连接遗留在虚拟机内的同步请求不会被误认为本次的响应
+        self._sync_id = random.randrange(1, 1 << 30)
+
+    def connect(self, timeout=300, should_continue=None):
+        """连接并与代理同步；代理在虚拟机开机后才启动，在超时内重试"""
+        deadline = time.time() + timeout
+        while True:
+            try:
+                if self.sock is None:
+                    self.sock = socket.create_connection((self.host, self.port), timeout=2)
+                with self._lock:
+                    self._sync(1.0)
+                self.connected = True
+                return True
+            except (OSError, GuestAgentError, ValueError):
+                if self.sock is not None and not self._socket_alive():
+                    self._close_socket()
+            if time.time() >= deadline or (should_continue and not should_continue()):
+                self._close_socket()
+                return False
+            time.sleep(0.5)
+
+    def close(self):
+        self.connected = False
+        self._close_socket()
+
+    def _close_socket(self):
+        sock, self.sock = self.sock, None
+        self._buffer.clear()
+        self._synced = False
+        if sock:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            sock.close()
+
+    def _socket_alive(self):
+        # 同步超时只说明代理尚未启动；连接被 QEMU 关闭时需要重新连接
+        try:
+            self.sock.settimeout(0)
+            return self.sock.recv(1, socket.MSG_PEEK) != b""
+        except BlockingIOError:
+            return True
+        except OSError:
+            return False
+
+    def _send(self, msg):
+        self.sock.sendall(json.dumps(msg).encode("utf-8") + b"\n")
+
+    def _read_line(self, deadline, after_delimiter=False):
+        """读取一行响应；after_delimiter 时先丢弃 0xFF 分隔符之前的所有数据"""
+        while True:
+            if after_delimiter:
+                pos = self._buffer.find(b"\xff")
+                if pos >= 0:
+                    del self._buffer[:pos + 1]
+                    after_delimiter = False
+                    continue
+            else:
+                pos = self._buffer.find(b"\n")
+                if pos >= 0:
+                    line = bytes(self._buffer[:pos])
+                    del self._buffer[:pos + 1]
+                    return line
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                raise TimeoutError("客户机代理响应超时")
+            self.sock.settimeout(remaining)
+            try:
+                data = self.sock.recv(65536)
+            except socket.timeout:
+                raise TimeoutError("客户机代理响应超时") from None
+            if not data:
+                raise ConnectionError("客户机代理连接已断开")
+            self._buffer.extend(data)
+
+    def _sync(self, timeout):
+        self._sync_id += 1
+        self._buffer.clear()
+        self._send({"execute": "guest-sync-delimited", "arguments": {"id": self._sync_id}})
+        deadline = time.time() + timeout
+        while True:
+            try:
+                msg = json.loads(self._read_line(deadline, after_delimiter=True))
+            except TimeoutError:
+                raise GuestAgentError("客户机代理未响应") from None
+            if msg.get("return") == self._sync_id:
+                self._synced = True
+                return
+
+    def execute(self, command, arguments=None, timeout=10):
+        """执行代理命令并返回 return 字段，出错时抛出 GuestAgentError"""
+        if not self.connected:
+            raise ConnectionError("客户机代理未连接")
+        msg = {"execute": command}
+        if arguments:
+            msg["arguments"] = arguments
+        with self._lock:
+            try:
+                if not self._synced:
+                    self._sync(min(timeout, 5))
+                self._send(msg)
+                deadline = time.time() + timeout
+                while True:
+                    response = json.loads(self._read_line(deadline))
+                    if "return" in response or "error" in response:
+                        break
+            except TimeoutError:
+                # 迟到的响应会与下一条命令错位，下次调用前重新同步
+                self._synced = False
+                raise
+            except (OSError, ValueError) as e:
+                self.connected = False
+                raise ConnectionError(f"客户机代理连接已断开: {e}") from None
+        if "error" in response:
+            raise GuestAgentError(response["error"].get("desc", str(response["error"])))
+        return response["return"]
+
+    def ping(self, timeout=2):
+        self.execute("guest-ping", timeout=timeout)
+        return True
+
+    # --- 命令执行 ---
+
+    def exec(self, args, input_data=None, timeout=30):
+        """在虚拟机内执行命令并等待结束，返回 {'exitcode', 'stdout', 'stderr'} (输出为 bytes)"""
+        arguments = {"path": args[0], "arg": list(args[1:]), "capture-output": True}
+        if input_data is not None:
+            arguments["input-data"] = base64.b64encode(input_data).decode("ascii")
+        pid = self.execute("guest-exec", arguments, timeout=timeout)["pid"]
+        deadline = time.time() + timeout
+        interval = 0.005
+        while True:
+            status = self.execute("guest-exec-status", {"pid": pid}, timeout=timeout)
+            if status.get("exited"):
+                break
+            if time.time() >= deadline:
+                raise TimeoutError(f"虚拟机内命令超时: {' '.join(args)}")
+            time.sleep(interval)
+            interval = min(interval * 2, 0.2)
+        return {
+            # 被信号终止时没有 exitcode，以负的信号值表示
+            "exitcode": status["exitcode"] if "exitcode" in status else -status.get("signal", 1),
+            "stdout": base64.b64decode(status.get("out-data", "")),
+            "stderr": base64.b64decode(status.get("err-data", "")),
+        }
+
+    # --- 文件读写 ---
+
+    def read_file(self, path, max_bytes=16 * 1024 * 1024, timeout=10):
+        handle = self.execute("guest-file-open", {"path": path, "mode": "r"}, timeout=timeout)
+        chunks, total = [], 0
+        try:
+            while total < max_bytes:
+                result = self.execute("guest-file-read", {"handle": handle, "count": min(max_bytes - total, 1 << 20)},
+                                      timeout=timeout)
+                data = base64.b64decode(result.get("buf-b64", ""))
+                chunks.append(data)
+                total += len(data)
+                if result.get("eof") or not data:
+                    break
+        finally:
+            self.execute("guest-file-close", {"handle": handle}, timeout=timeout)
+        return b"".join(chunks)
+
+    def write_file(self, path, data, append=False, timeout=10):
+        """写入文件，返回写入的字节数"""
+        handle = self.execute("guest-file-open", {"path": path, "mode": "a" if append else "w"}, timeout=timeout)
+        try:
+            for offset in range(0, len(data), 1 << 20):
+                chunk = data[offset:offset + (1 << 20)]
+                self.execute("guest-file-write", {"handle": handle, "buf-b64": base64.b64encode(chunk).decode("ascii")},
+                             timeout=timeout)
+            self.execute("guest-file-flush", {"handle": handle}, timeout=timeout)
+        finally:
+            self.execute("guest-file-close", {"handle": handle}, timeout=timeout)
+        return len(data)
+
+    # --- 文件系统冻结 ---
+
+    def fsfreeze(self, timeout=60):
+        """冻结虚拟机内的文件系统 (刷盘并阻止写入)，返回冻结的文件系统数量"""
+        return self.execute("guest-fsfreeze-freeze", timeout=timeout)
+
+    def fsthaw(self, timeout=60):
+        return self.execute("guest-fsfreeze-thaw", timeout=timeout)
+
+    def fsfreeze_status(self):
+        return self.execute("guest-fsfreeze-status", timeout=5)
+
+    # --- 资源状态 ---
+
+    def stats(self, timeout=5):
+        """虚拟机内的内存、负载与磁盘使用情况"""
+        meminfo = {}
+        for line in self.read_file("/proc/meminfo", timeout=timeout).decode("utf-8", "replace").splitlines():
+            key, _, value = line.partition(":")
+            if value.strip():
+                meminfo[key] = int(value.split()[0]) * 1024
+        load = self.read_file("/proc/loadavg", timeout=timeout).decode("ascii", "replace").split()
+
+        disks = []
+        for fs in self.execute("guest-get-fsinfo", timeout=timeout):
+            if "total-bytes" not in fs:
+                continue
+            disks.append({"mountpoint": fs["mountpoint"], "type": fs.get("type"),
+                          "used_bytes": fs.get("used-bytes", 0), "total_bytes": fs["total-bytes"]})
+        return {
+            "memory": {
+                "total_bytes": meminfo.get("MemTotal", 0),
+                "available_bytes": meminfo.get("MemAvailable", meminfo.get("MemFree", 0)),
+            },
+            "load": [float(v) for v in load[:3]],
+            "disks": disks,
+        }
@@ -0,0 +1,139 @@
+import asyncio
+import subprocess
+import threading
+
+
+class LoopThread:
+    """在独立线程中运行的 asyncio 事件循环
+
+    虚拟机生命周期的所有协程都在这个循环中执行；其他线程 (界面、守护进程、基准测试脚本)
+    通过 submit / call_soon 与之交互，不直接触碰协程内的状态。
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None:
+                self.loop = asyncio.new_event_loop()
+                ready = threading.Event()
+                self._thread = threading.Thread(target=self._run, args=(ready,), name=self.name, daemon=True)
+                self._thread.start()
+                ready.wait()
+        return self.loop
+
+    def _run(self, ready):
+        asyncio.set_event_loop(self.loop)
+        self.loop.call_soon(ready.set)
+        self.loop.run_forever()
+
+    def in_loop_thread(self):
+        return self._thread is not None and threading.current_thread() is self._thread
+
+    def submit(self, coro):
+        """在循环中运行协程，返回 concurrent.futures.Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_started())
+
+    def call_soon(self, callback, *args):
+        """线程安全地在循环中执行普通回调"""
+        self._ensure_started().call_soon_threadsafe(callback, *args)
+
+
+class TaskScope:
+    """一组同生共死的子任务: 取消时全部取消，并等待它们真正结束后才返回"""
+
+    def __init__(self, on_error=None):
+        self.on_error = on_error
+        self._tasks = set()
+
+    def spawn(self, coro):
+        task = asyncio.get_running_loop().create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._done)
+        return task
+
+    def _done(self, task):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None and self.on_error:
+            self.on_error(task.exception())
+
+    async def cancel(self):
+        # 子任务在清理过程中可能再创建任务，直到集合为空
+        while self._tasks:
+            tasks = list(self._tasks)
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+class _ProcessProtocol(asyncio.subprocess.SubprocessStreamProtocol):
+    """进程退出时立即完成 exited (Process.wait 要等所有管道关闭，子进程的子进程持有管道时会一直等待)"""
+
+    def __init__(self, limit, loop):
+        super().__init__(limit=limit, loop=loop)
+        self.exited = loop.create_future()
+        self.transport = None
+
+    def connection_made(self, transport):
+        # 自行保存传输: 管道全部关闭后基类会把自己持有的引用置空
+        self.transport = transport
+        super().connection_made(transport)
+
+    def process_exited(self):
+        returncode = self.transport.get_returncode()
+        super().process_exited()
+        if not self.exited.done():
+            self.exited.set_result(returncode)
+
+
+async def spawn_process(args, limit=2 ** 16, **kwargs):
+    """在当前事件循环中启动子进程，返回 ProcessHandle"""
+    loop = asyncio.get_running_loop()
+    transport, protocol = await loop.subprocess_exec(lambda: _ProcessProtocol(limit, loop), *args, **kwargs)
+    return ProcessHandle(asyncio.subprocess.Process(transport, protocol, loop), transport, protocol.exited, args)
+
+
+class ProcessHandle:
+    """事件循环中 asyncio 子进程的同步视图，供其他线程使用 (pid / poll / wait)"""
+
+    def __init__(self, process, transport, exited, args):
+        self.process = process
+        self.transport = transport
+        self.exited = exited  # 事件循环中的 Future，结果为退出码
+        self.args = args
+        self.pid = process.pid
+        self.returncode = None
+        self._done = threading.Event()
+        exited.add_done_callback(self._on_exited)
+
+    def _on_exited(self, future):
+        self.returncode = future.result()
+        self._done.set()
+
+    def close(self):
+        """关闭管道 (需在事件循环中调用)"""
+        self.transport.close()
+
+    def poll(self):
+        return self.returncode
+
+    def wait(self, timeout=None):
+        if not self._done.wait(timeout):
+            raise subprocess.TimeoutExpired(self.args, timeout)
+        return self.returncode
+
+    def terminate(self):
+        try:
+            self.process.terminate()
+        except ProcessLookupError:
+            pass
+
+    def kill(self):
+        try:
+            self.process.kill()
+        except ProcessLookupError:
+            pass
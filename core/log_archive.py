@@ -0,0 +1,258 @@
+import collections
+import gzip
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+
+ACTIVE_SEGMENT = "current.jsonl"
+INDEX_FILE = "index.json"
+
+
+class LogArchive:
+    """滚动日志归档
+
+    write() 只把记录放入队列，由后台线程写入 current.jsonl；文件超过 segment_bytes 后压缩为
+    seg-XXXXXX.jsonl.gz 并记入 index.json (时间范围、行数、各级别行数)，查询时先按索引跳过
+    不相关的分段，再逐行匹配关键字。最多保留 max_segments 个压缩分段。
+    """
+
+    def __init__(self, directory, segment_bytes=8 * 1024 * 1024, max_segments=50, flush_interval=1.0,
+                 max_pending=100000):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.max_segments = max_segments
+        self.flush_interval = flush_interval
+        self.dropped = 0
+
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._lock = threading.Lock()  # 保护 _segments 与 _active
+        self._segments = []
+        self._active = None
+        self._file = None
+        self._next_id = 1
+        self._closed = False
+
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+        # 上次异常退出时残留的活动分段，先归档
+        active_path = os.path.join(directory, ACTIVE_SEGMENT)
+        if os.path.exists(active_path):
+            self._active = self._scan_segment(active_path)
+            self._rotate()
+        self._thread = threading.Thread(target=self._writer, name="log-archive", daemon=True)
+        self._thread.start()
+
+    # --- 写入 ---
+
+    def write(self, msg, level="info", source="manager"):
+        """线程安全，不阻塞调用方；队列积压时丢弃新记录"""
+        if self._closed:
+            return
+        try:
+            self._queue.put_nowait((time.time(), level, source, msg))
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self, timeout=5):
+        """等待队列中已有的记录落盘，超时 (包括队列已满、无法排入) 时返回 False"""
+        if self._closed:
+            return True
+        deadline = time.time() + timeout
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(max(0, deadline - time.time()))
+
+    def close(self, timeout=5):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def _writer(self):
+        last_flush = time.time()
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                item = False
+
+            if item is None:
+                self._close_file()
+                return
+            if isinstance(item, threading.Event):
+                self._flush_file()
+                item.set()
+                continue
+            if item:
+                try:
+                    self._append(*item)
+                except OSError:
+                    self.dropped += 1
+
+            if self._file and time.time() - last_flush >= self.flush_interval:
+                self._flush_file()
+                last_flush = time.time()
+
+    def _append(self, ts, level, source, msg):
+        if self._file is None:
+            self._file = open(os.path.join(self.directory, ACTIVE_SEGMENT), "a", encoding="utf-8")
+            with self._lock:
+                if self._active is None:
+                    self._active = {"start": ts, "end": ts, "lines": 0, "levels": {}}
+
+        line = json.dumps({"t": round(ts, 3), "l": level, "s": source, "m": msg}, ensure_ascii=False)
+        self._file.write(line + "\n")
+        with self._lock:
+            active = self._active
+            active["end"] = ts
+            active["lines"] += 1
+            active["levels"][level] = active["levels"].get(level, 0) + 1
+
+        if self._file.tell() >= self.segment_bytes:
+            self._close_file()
+            self._rotate()
+
+    def _flush_file(self):
+        if self._file:
+            try:
+                self._file.flush()
+            except OSError:
+                pass
+
+    def _close_file(self):
+        if self._file:
+            try:
+                self._file.close()
+            except OSError:
+                pass
+            self._file = None
+
+    def _rotate(self):
+        """压缩活动分段并写入索引"""
+        active_path = os.path.join(self.directory, ACTIVE_SEGMENT)
+        with self._lock:
+            active, self._active = self._active, None
+        if not active or not active["lines"]:
+            if os.path.exists(active_path):
+                os.remove(active_path)
+            return
+
+        name = f"seg-{self._next_id:06d}.jsonl.gz"
+        self._next_id += 1
+        try:
+            with open(active_path, "rb") as src, gzip.open(os.path.join(self.directory, name), "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(active_path)
+        except OSError:
+            return
+
+        active["file"] = name
+        with self._lock:
+            self._segments.append(active)
+            expired = self._segments[:-self.max_segments] if self.max_segments else []
+            self._segments = self._segments[len(expired):]
+        for seg in expired:
+            try:
+                os.remove(os.path.join(self.directory, seg["file"]))
+            except OSError:
+                pass
+        self._save_index()
+
+    # --- 索引 ---
+
+    def _load_index(self):
+        try:
+            with open(os.path.join(self.directory, INDEX_FILE), "r", encoding="utf-8") as f:
+                segments = json.load(f).get("segments", [])
+        except (OSError, ValueError):
+            segments = []
+        self._segments = [s for s in segments if os.path.exists(os.path.join(self.directory, s["file"]))]
+        if self._segments:
+            self._next_id = int(self._segments[-1]["file"][4:10]) + 1
+
+    def _save_index(self):
+        path = os.path.join(self.directory, INDEX_FILE)
+        with self._lock:
+            data = {"segments": list(self._segments)}
+        try:
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(path + ".tmp", path)
+        except OSError:
+            pass
+
+    def _scan_segment(self, path):
+        """重建单个分段的索引项"""
+        info = {"start": None, "end": None, "lines": 0, "levels": {}}
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if info["start"] is None:
+                    info["start"] = entry["t"]
+                info["end"] = entry["t"]
+                info["lines"] += 1
+                info["levels"][entry["l"]] = info["levels"].get(entry["l"], 0) + 1
+        return info
+
+    def segments(self):
+        """压缩分段与活动分段的索引项 (按时间顺序)"""
+        with self._lock:
+            result = [dict(s) for s in self._segments]
+            if self._active and self._active["lines"]:
+                result.append(dict(self._active, file=ACTIVE_SEGMENT, levels=dict(self._active["levels"])))
+        return result
+
+    # --- 查询 ---
+
+    def query(self, since=None, until=None, levels=None, keyword=None, source=None, limit=10000):
+        """按时间范围、级别、来源与关键字查询，返回最新的 limit 条记录 (按时间顺序)"""
+        # 写入积压时不排队等待，直接查询已落盘的记录 (最近的记录可能暂时查不到)
+        self.flush(timeout=1)
+        levels = set(levels) if levels else None
+        keyword = keyword.lower() if keyword else None
+        # 关键字中不含 JSON 转义字符时，可先在原始文本上过滤，命中后才解析
+        raw_filter = keyword if keyword and not any(c in keyword for c in '"\\') else None
+        results = collections.deque(maxlen=limit)
+
+        for seg in self.segments():
+            if since is not None and seg["end"] < since:
+                continue
+            if until is not None and seg["start"] > until:
+                continue
+            if levels and not levels.intersection(seg["levels"]):
+                continue
+            path = os.path.join(self.directory, seg["file"])
+            opener = gzip.open if seg["file"].endswith(".gz") else open
+            try:
+                with opener(path, "rt", encoding="utf-8", errors="replace") as f:
+                    for line in f:
+                        if raw_filter and raw_filter not in line.lower():
+                            continue
+                        try:
+                            entry = json.loads(line)
+                        except ValueError:
+                            continue
+                        if since is not None and entry["t"] < since:
+                            continue
+                        if until is not None and entry["t"] > until:
+                            continue
+                        if levels and entry["l"] not in levels:
+                            continue
+                        if source and entry["s"] != source:
+                            continue
+                        if keyword and keyword not in entry["m"].lower():
+                            continue
+                        results.append(entry)
+            except OSError:
+                continue
+        return list(results)
@@ -0,0 +1,84 @@
+import threading
+
+
+class LogRingBuffer:
+    """固定容量的环形日志缓冲区，写满后覆盖最旧的记录，按下标读取为 O(1)"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._items = [None] * capacity
+        self._start = 0
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+        return self._items[(self._start + index) % self.capacity]
+
+    def extend(self, items):
+        """追加多条记录，返回因容量限制被丢弃的最旧记录数"""
+        items = list(items)[-self.capacity:]
+        overflow = max(0, self._count + len(items) - self.capacity)
+        for item in items:
+            self._items[(self._start + self._count) % self.capacity] = item
+            if self._count < self.capacity:
+                self._count += 1
+            else:
+                self._start = (self._start + 1) % self.capacity
+        return overflow
+
+    def drop_oldest(self, count):
+        """丢弃最旧的 count 条记录"""
+        count = min(count, self._count)
+        for i in range(count):
+            self._items[(self._start + i) % self.capacity] = None
+        self._start = (self._start + count) % self.capacity
+        self._count -= count
+
+    def clear(self):
+        self._items = [None] * self.capacity
+        self._start = 0
+        self._count = 0
+
+    def find(self, predicate, start, backwards=False, limit=None):
+        """从 start 开始 (不含) 循环查找第一条满足条件的记录，最多检查 limit 条，找不到返回 -1"""
+        step = -1 if backwards else 1
+        count = self._count if limit is None else min(limit, self._count)
+        for offset in range(1, count + 1):
+            index = (start + step * offset) % self._count
+            if predicate(self[index]):
+                return index
+        return -1
+
+
+class LogBatcher:
+    """多线程写入、界面线程按帧批量取出的日志队列
+
+    写入方只做一次加锁追加；积压超过 max_pending 时丢弃最旧的行，保证内存有上限。
+    """
+
+    def __init__(self, max_pending=100000):
+        self.max_pending = max_pending
+        self._pending = []
+        self._dropped = 0
+        self._lock = threading.Lock()
+
+    def push(self, msg, level="info"):
+        with self._lock:
+            self._pending.append((msg, level))
+            if len(self._pending) > self.max_pending:
+                excess = len(self._pending) - self.max_pending
+                del self._pending[:excess]
+                self._dropped += excess
+
+    def drain(self):
+        """取出全部积压的行，返回 (行列表, 自上次取出以来丢弃的行数)"""
+        with self._lock:
+            lines, self._pending = self._pending, []
+            dropped, self._dropped = self._dropped, 0
+        return lines, dropped
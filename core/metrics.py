@@ -0,0 +1,206 @@
+import collections
+import threading
+import time
+
+# 视图名 -> (时间跨度秒, 聚合粒度秒)；1 分钟视图使用原始采样
+VIEWS = {"1m": (60, None), "1h": (3600, 30), "24h": (86400, 600)}
+METRIC_NAMES = ("cpu", "mem", "net_rx", "net_tx", "io_read", "io_write")
+QEMU_SOURCE = "qemu"
+
+
+class DownsampledSeries:
+    """单个指标的多分辨率环形缓冲区
+
+    原始采样只保留最近 1 分钟；1 小时与 24 小时视图按固定粒度求平均与最大值，
+    每个分辨率都是定长 deque，内存占用与运行时长无关。
+    """
+
+    def __init__(self, interval):
+        self.raw = collections.deque(maxlen=max(2, int(VIEWS["1m"][0] / interval) + 1))
+        self.tiers = {}
+        for view, (span, step) in VIEWS.items():
+            if step:
+                self.tiers[view] = {"step": step, "points": collections.deque(maxlen=span // step),
+                                    "bucket": None, "sum": 0.0, "max": 0.0, "n": 0}
+
+    def add(self, ts, value):
+        self.raw.append((ts, value))
+        for tier in self.tiers.values():
+            bucket = int(ts // tier["step"]) * tier["step"]
+            if tier["bucket"] != bucket:
+                if tier["n"]:
+                    tier["points"].append((tier["bucket"], tier["sum"] / tier["n"], tier["max"]))
+                tier["bucket"], tier["sum"], tier["max"], tier["n"] = bucket, 0.0, value, 0
+            tier["sum"] += value
+            tier["max"] = max(tier["max"], value)
+            tier["n"] += 1
+
+    def points(self, view):
+        """返回 [(时间, 数值)]，聚合视图的数值为该粒度内的平均值 (含尚未结束的当前区间)"""
+        if view not in self.tiers:
+            return list(self.raw)
+        tier = self.tiers[view]
+        points = [(ts, avg) for ts, avg, _ in tier["points"]]
+        if tier["n"]:
+            points.append((tier["bucket"], tier["sum"] / tier["n"]))
+        return points
+
+    def latest(self):
+        return self.raw[-1][1] if self.raw else None
+
+
+class MetricsCollector:
+    """在单个后台线程中采样容器与 QEMU 进程的资源占用
+
+    容器数据来自 Docker API 的一次性 stats (one_shot，不等待第二个采样点)，CPU 使用率由
+    相邻两次采样的累计值自行计算；QEMU 进程数据来自 psutil。采样间隔可配置，虚拟机未运行时
+    只检查一次状态即休眠。
+    """
+
+    def __init__(self, get_client, get_qemu_pid, interval=2.0, container_refresh=30.0):
+        self.get_client = get_client
+        self.get_qemu_pid = get_qemu_pid
+        self.interval = interval
+        self.container_refresh = container_refresh
+
+        self._lock = threading.Lock()  # 保护 _series
+        self._series = {}
+        self._prev = {}  # 来源 -> 上一次的累计计数器 (计算速率)
+        self._containers = []
+        self._containers_at = 0
+        self._process = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="metrics", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def sources(self):
+        with self._lock:
+            return list(self._series)
+
+    def latest(self, source):
+        with self._lock:
+            series = self._series.get(source, {})
+            return {name: s.latest() for name, s in series.items()}
+
+    def points(self, source, metric, view="1m"):
+        with self._lock:
+            series = self._series.get(source, {}).get(metric)
+            return series.points(view) if series else []
+
+    def _record(self, source, ts, values):
+        with self._lock:
+            series = self._series.setdefault(source, {})
+            for name, value in values.items():
+                if value is None:
+                    continue
+                if name not in series:
+                    series[name] = DownsampledSeries(self.interval)
+                series[name].add(ts, value)
+
+    def _rate(self, source, ts, counters):
+        """累计计数器 -> 每秒速率，首次采样返回 None"""
+        prev = self._prev.get(source)
+        self._prev[source] = (ts, counters)
+        if not prev or ts <= prev[0]:
+            return {name: None for name in counters}
+        elapsed = ts - prev[0]
+        return {name: max(0.0, (value - prev[1].get(name, value)) / elapsed) for name, value in counters.items()}
+
+    def _run(self):
+        import psutil  # 在采样线程中加载，不占用界面启动时间
+        while not self._stop.is_set():
+            started = time.time()
+            try:
+                self._sample_qemu(started)
+            except (psutil.Error, OSError):
+                self._process = None
+            try:
+                self._sample_containers(started)
+            except Exception:
+                self._containers = []
+            self._stop.wait(max(0.1, self.interval - (time.time() - started)))
+
+    def _sample_qemu(self, ts):
+        import psutil
+        pid = self.get_qemu_pid()
+        if not pid:
+            self._process = None
+            return
+        if self._process is None or self._process.pid != pid:
+            self._process = psutil.Process(pid)
+            self._process.cpu_percent(None)  # 第一次调用只建立基准
+            self._prev.pop(QEMU_SOURCE, None)
+            return
+        with self._process.oneshot():
+            cpu = self._process.cpu_percent(None)
+            rss = self._process.memory_info().rss
+            try:
+                io = self._process.io_counters()
+                counters = {"io_read": io.read_bytes, "io_write": io.write_bytes}
+            except (AttributeError, psutil.AccessDenied):
+                counters = {}
+        values = {"cpu": cpu, "mem": float(rss)}
+        values.update(self._rate(QEMU_SOURCE, ts, counters))
+        self._record(QEMU_SOURCE, ts, values)
+
+    def _sample_containers(self, ts):
+        client = self.get_client()
+        if client is None:
+            self._containers = []
+            return
+        if not self._containers or ts - self._containers_at > self.container_refresh:
+            self._containers = [(c.id, c.name) for c in client.containers.list()]
+            self._containers_at = ts
+        for container_id, name in self._containers:
+            try:
+                stats = client.api.stats(container_id, stream=False, one_shot=True)
+            except TypeError:
+                # 旧版 docker SDK 不支持 one_shot
+                stats = client.api.stats(container_id, stream=False)
+            except Exception:
+                self._containers_at = 0  # 容器可能已被删除，下次重新获取列表
+                continue
+            self._record(name, ts, self._parse_stats(name, ts, stats))
+
+    def _parse_stats(self, name, ts, stats):
+        cpu_stats = stats.get("cpu_stats", {})
+        mem_stats = stats.get("memory_stats", {})
+        cpu_total = cpu_stats.get("cpu_usage", {}).get("total_usage", 0)
+        system = cpu_stats.get("system_cpu_usage", 0)
+        online = cpu_stats.get("online_cpus") or len(cpu_stats.get("cpu_usage", {}).get("percpu_usage") or [1])
+
+        net_rx = sum(n.get("rx_bytes", 0) for n in (stats.get("networks") or {}).values())
+        net_tx = sum(n.get("tx_bytes", 0) for n in (stats.get("networks") or {}).values())
+        io_read = io_write = 0
+        for entry in (stats.get("blkio_stats", {}).get("io_service_bytes_recursive") or []):
+            op = entry.get("op", "").lower()
+            if op == "read":
+                io_read += entry.get("value", 0)
+            elif op == "write":
+                io_write += entry.get("value", 0)
+
+        prev_cpu = self._prev.get(name, (0, {}))[1]
+        rates = self._rate(name, ts, {"net_rx": net_rx, "net_tx": net_tx, "io_read": io_read,
+                                      "io_write": io_write, "_cpu": cpu_total, "_system": system})
+        cpu = None
+        system_delta = system - prev_cpu.get("_system", system)
+        if system_delta > 0:
+            cpu = (cpu_total - prev_cpu.get("_cpu", cpu_total)) / system_delta * online * 100.0
+
+        # 与 docker stats 一致，内存不计入可回收的页缓存
+        mem_detail = mem_stats.get("stats", {})
+        cache = mem_detail.get("inactive_file", mem_detail.get("total_inactive_file", 0))
+        mem = mem_stats.get("usage", 0) - cache if "usage" in mem_stats else None
+
+        return {"cpu": cpu, "mem": float(mem) if mem is not None else None,
+                "net_rx": rates["net_rx"], "net_tx": rates["net_tx"],
+                "io_read": rates["io_read"], "io_write": rates["io_write"]}
@@ -0,0 +1,134 @@
+import json
+import socket
+import threading
+import time
+
+
+class QMPError(Exception):
+    """QMP 命令返回的错误"""
+
+
+class QMPClient:
+    """QEMU Machine Protocol 客户端
+
+    后台线程持续读取 QMP 套接字：命令响应按 id 分发给等待的调用方，
+    异步事件 (SHUTDOWN / STOP / RESUME / GUEST_PANICKED 等) 交给 on_event 回调。
+    """
+
+    def __init__(self, host, port, on_event=None):
+        self.host = host
+        self.port = port
+        self.on_event = on_event
+        self.sock = None
+        self.connected = False
+        self._send_lock = threading.Lock()
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._next_id = 0
+
+    def connect(self, timeout=10, should_continue=None):
+        """连接并完成能力协商，QEMU 尚未监听时在超时内重试"""
+        deadline = time.time() + timeout
+        while True:
+            try:
+                sock = socket.create_connection((self.host, self.port), timeout=2)
+                break
+            except OSError:
+                if time.time() >= deadline or (should_continue and not should_continue()):
+                    return False
+                time.sleep(0.1)
+
+        try:
+            sock.settimeout(5)
+            reader = sock.makefile("rb")
+            greeting = json.loads(reader.readline())
+            if "QMP" not in greeting:
+                raise QMPError(f"非 QMP 握手: {greeting}")
+            sock.sendall(b'{"execute": "qmp_capabilities"}\n')
+            while True:
+                msg = json.loads(reader.readline())
+                if "return" in msg:
+                    break
+                if "error" in msg:
+                    raise QMPError(msg["error"].get("desc", str(msg["error"])))
+            sock.settimeout(None)
+        except Exception:
+            sock.close()
+            raise
+
+        self.sock = sock
+        self.connected = True
+        threading.Thread(target=self._reader_loop, args=(reader,), daemon=True).start()
+        return True
+
+    def close(self):
+        self.connected = False
+        if self.sock:
+            try:
+                self.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self.sock.close()
+            self.sock = None
+
+    def execute(self, command, arguments=None, timeout=30):
+        """执行 QMP 命令并返回 return 字段，出错时抛出 QMPError"""
+        if not self.connected:
+            raise ConnectionError("QMP 未连接")
+
+        with self._pending_lock:
+            self._next_id += 1
+            cmd_id = self._next_id
+            waiter = [threading.Event(), None]
+            self._pending[cmd_id] = waiter
+
+        msg = {"execute": command, "id": cmd_id}
+        if arguments:
+            msg["arguments"] = arguments
+        try:
+            with self._send_lock:
+                self.sock.sendall(json.dumps(msg).encode("utf-8") + b"\n")
+            if not waiter[0].wait(timeout):
+                raise TimeoutError(f"QMP 命令超时: {command}")
+        finally:
+            with self._pending_lock:
+                self._pending.pop(cmd_id, None)
+
+        response = waiter[1]
+        if response is None:
+            raise ConnectionError("QMP 连接已断开")
+        if "error" in response:
+            raise QMPError(response["error"].get("desc", str(response["error"])))
+        return response.get("return")
+
+    def hmp(self, command_line, timeout=600):
+        """通过 human-monitor-command 执行 HMP 命令 (savevm / drive_add 等)"""
+        return self.execute("human-monitor-command", {"command-line": command_line}, timeout=timeout) or ""
+
+    def _reader_loop(self, reader):
+        try:
+            for raw in reader:
+                try:
+                    msg = json.loads(raw)
+                except ValueError:
+                    continue
+                if "event" in msg:
+                    if self.on_event:
+                        try:
+                            self.on_event(msg["event"], msg.get("data", {}))
+                        except Exception:
+                            pass
+                    continue
+                with self._pending_lock:
+                    waiter = self._pending.get(msg.get("id"))
+                if waiter:
+                    waiter[1] = msg
+                    waiter[0].set()
+        except (OSError, ValueError):
+            pass
+        finally:
+            self.connected = False
+            # 唤醒所有等待中的调用方
+            with self._pending_lock:
+                for waiter in self._pending.values():
+                    waiter[0].set()
@@ -0,0 +1,100 @@
+import os
+import shutil
+import subprocess
+import time
+
+# 共享目录后端，按性能从高到低排列
+SHARE_BACKENDS = ("virtiofs", "9p", "vvfat")
+
+# 请求的后端 -> 依次尝试的后端
+FALLBACK_CHAIN = {
+    "auto": ["virtiofs", "9p", "vvfat"],
+    "virtiofs": ["virtiofs", "9p", "vvfat"],
+    "9p": ["9p", "vvfat"],
+    "vvfat": ["vvfat"],
+}
+
+# 虚拟机内挂载使用的 9p/virtiofs 标签
+MOUNT_TAG = "hostshare"
+
+# QEMU 启动失败时，错误信息中出现这些关键字说明是共享目录后端的问题
+BACKEND_ERROR_HINTS = {
+    "virtiofs": ("vhost-user", "virtiofs", "memory-backend-memfd", "chardev"),
+    "9p": ("fsdev", "9p", "virtfs"),
+}
+
+
+def find_virtiofsd():
+    """查找 virtiofsd (仅 Linux 宿主机可用)"""
+    found = shutil.which("virtiofsd")
+    if found:
+        return found
+    for path in ("/usr/libexec/virtiofsd", "/usr/lib/qemu/virtiofsd", "/usr/lib/virtiofsd"):
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def fw_cfg_args(backend, msize, cache):
+    """通过 fw_cfg 把挂载参数传给虚拟机 (setup.start 读取 opt/nekro/share)"""
+    return ["-fw_cfg", f"name=opt/nekro/share,string=backend={backend};msize={msize};cache={cache}"]
+
+
+def qemu_args(backend, shared_path_qemu, hotplug=False, is_windows=False, mem_mb=None, virtiofs_socket=None):
+    """生成共享目录的 QEMU 参数
+
+    hotplug 为 True 时只创建后端，不创建设备 (快速恢复模式下在快照后由 QMP 热插拔)。
+    """
+    if backend == "virtiofs":
+        return [
+            "-chardev", f"socket,id=vfs,path={virtiofs_socket}",
+            "-device", f"vhost-user-fs-pci,chardev=vfs,tag={MOUNT_TAG}",
+            # vhost-user 要求虚拟机内存可与 virtiofsd 共享
+            "-object", f"memory-backend-memfd,id=mem,size={mem_mb}M,share=on",
+            "-numa", "node,memdev=mem",
+        ]
+    if backend == "9p":
+        # Windows 下 NTFS 不支持 xattr，权限信息保存在隐藏文件中
+        security_model = "mapped-file" if is_windows else "mapped-xattr"
+        args = ["-fsdev", f"local,id=hostshare,path={shared_path_qemu},security_model={security_model}"]
+        if not hotplug:
+            args += ["-device", f"virtio-9p-pci,fsdev=hostshare,mount_tag={MOUNT_TAG}"]
+        return args
+    if hotplug:
+        return []
+    return ["-drive", f"{vvfat_drive_spec(shared_path_qemu)},if=virtio"]
+
+
+def vvfat_drive_spec(shared_path_qemu):
+    return f"file=fat:rw:{shared_path_qemu},format=raw"
+
+
+def hotplug_device(backend):
+    """快速恢复模式下热插拔共享目录所需的 device_add 参数"""
+    if backend == "9p":
+        return {"driver": "virtio-9p-pci", "fsdev": "hostshare", "mount_tag": MOUNT_TAG, "id": "hostshare-dev"}
+    return {"driver": "virtio-blk-pci", "drive": "hostshare", "id": "hostshare-dev"}
+
+
+def start_virtiofsd(virtiofsd_path, shared_dir, socket_path, timeout=5):
+    """启动 virtiofsd 并等待其创建 vhost-user 套接字，失败返回 None"""
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    try:
+        process = subprocess.Popen(
+            [virtiofsd_path, f"--socket-path={socket_path}", f"--shared-dir={shared_dir}",
+             "--cache=auto", "--sandbox=none"],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+    except OSError:
+        return None
+
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if os.path.exists(socket_path):
+            return process
+        if process.poll() is not None:
+            return None
+        time.sleep(0.05)
+    process.kill()
+    return None
@@ -0,0 +1,77 @@
+import codecs
+import collections
+
+
+class LineDecoder:
+    """把字节流增量解码为文本行
+
+    使用增量 UTF-8 解码器，跨数据块的多字节字符 (如中文) 不会被截断丢弃；未完成的行以片段
+    列表保存，组装整行的开销与行长成正比。单行超过 max_line 个字符时强制断行，内存占用有上限。
+    """
+
+    def __init__(self, max_line=65536, encoding="utf-8"):
+        self.max_line = max_line
+        self._decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+        self._parts = []
+        self._pending = 0
+
+    def feed(self, data):
+        """输入一块字节，返回其中已完成的行 (不含换行符)"""
+        return self._split(self._decoder.decode(data))
+
+    def flush(self):
+        """输入结束: 返回剩余的不完整行"""
+        lines = self._split(self._decoder.decode(b"", final=True))
+        if self._parts:
+            lines.append(self._take())
+        return lines
+
+    def _take(self, tail=""):
+        self._parts.append(tail)
+        line = "".join(self._parts).rstrip("\r")
+        self._parts, self._pending = [], 0
+        return line
+
+    def _split(self, text):
+        if not text:
+            return []
+        segments = text.split("\n")
+        lines = []
+        if len(segments) > 1:
+            lines.append(self._take(segments[0]))
+            lines.extend(s.rstrip("\r") for s in segments[1:-1])
+            rest = segments[-1]
+        else:
+            rest = segments[0]
+        if rest:
+            self._parts.append(rest)
+            self._pending += len(rest)
+            if self._pending >= self.max_line:
+                lines.append(self._take())
+        return lines
+
+
+async def pump_lines(reader, on_line, max_line=65536, chunk_size=65536):
+    """持续读取 asyncio.StreamReader 直到 EOF，每行调用一次 on_line"""
+    decoder = LineDecoder(max_line)
+    while True:
+        chunk = await reader.read(chunk_size)
+        if not chunk:
+            break
+        for line in decoder.feed(chunk):
+            on_line(line)
+    for line in decoder.flush():
+        on_line(line)
+
+
+class TailBuffer:
+    """只保留最近 max_lines 行 (如 QEMU 的 stderr，用于退出后诊断)"""
+
+    def __init__(self, max_lines=200):
+        self._lines = collections.deque(maxlen=max_lines)
+
+    def append(self, line):
+        self._lines.append(line)
+
+    def text(self):
+        return "\n".join(self._lines)
@@ -1,23 +1,50 @@
+import asyncio
 import subprocess
 import threading
 import os
 import time
 import socket
-import psutil
-import multiprocessing
 import sys
 import platform
-import docker
-from PyQt6.QtCore import QObject, pyqtSignal
+import json
+import hashlib
+import shutil
+import tempfile
+import urllib.request
+import urllib.error
 
+from core.events import Signal
+from core.qmp import QMPClient, QMPError
+from core.guest_agent import GuestAgentClient, GuestAgentError, AGENT_CHANNEL
+from core.boot_timeline import BootTimeline, BootHistory, PHASE_LABELS
+from core.balloon import BalloonController
+from core.accel import AcceleratorProber
+from core.cpu_profiles import resolve_cpu
+from core import shared_dir as share
+from core.boot_image import KernelCache, to_microvm
+from core.lifecycle import LoopThread, TaskScope, spawn_process
+from core.streams import pump_lines, TailBuffer
+from core.docker_pool import DockerConnection
 
-class VMManager(QObject):
-    log_received = pyqtSignal(str, str)
-    status_changed = pyqtSignal(str)
-    boot_finished = pyqtSignal()
+# 各启动阶段的超时 (秒)
+PHASE_TIMEOUTS = {"serial": 30, "qmp": 30, "agent": 300, "docker": 300, "webui": 300}
 
-    def __init__(self, base_path=None):
-        super().__init__()
+# 虚拟机事件通道 (virtio-serial 端口名，虚拟机内为 /sys/class/virtio-ports/*/name)
+EVENT_CHANNEL = "org.nekro.events"
+
+
+class VMManager:
+    """虚拟机生命周期管理 (不依赖 Qt)
+
+    信号回调在工作线程中执行；图形界面通过 ui/vm_bridge.py 转发到主线程，无界面模式直接使用。
+    """
+    log_received = Signal(str, str)
+    status_changed = Signal(str)
+    boot_finished = Signal()
+    qmp_event = Signal(str, dict)
+    boot_timeline_finished = Signal(dict)
+
+    def __init__(self, base_path=None, data_dir=None):
         if base_path:
             self.base_path = os.path.abspath(base_path)
         else:
@@ -28,18 +55,100 @@ class VMManager(QObject):
                 if self.base_path.endswith('core'):
                     self.base_path = os.path.dirname(self.base_path)
 
+        self.is_windows = platform.system() == "Windows"
         self.qemu_dir = os.path.join(self.base_path, "v-core")
-        self.qemu_path = os.path.join(self.qemu_dir, "qemu-system-x86_64.exe")
+        self.qemu_path = self._find_qemu_binary("qemu-system-x86_64")
+        self.qemu_img_path = self._find_qemu_binary("qemu-img")
         self.shared_dir = os.path.join(self.base_path, "shared")
+        # 持久化 Docker 数据盘 (挂载到虚拟机 /var/lib/docker)
+        self.data_dir = os.path.abspath(data_dir) if data_dir else os.path.join(self.base_path, "vm-data")
+        self.docker_disk_path = os.path.join(self.data_dir, "docker.qcow2")
+        self.docker_disk_size = "64G"
+        # 快速恢复: 在 Docker 就绪后保存整机快照 (存放在数据盘 qcow2 内)，下次直接 loadvm
+        self.snapshot_name = "nekro-warm"
+        self.snapshot_meta_path = os.path.join(self.data_dir, "snapshot.json")
+        self.fast_resume = False
+        self._snapshot_signature = None
+        self._share_drive_spec = None
+
+        # 共享目录后端 (virtiofs / 9p / vvfat)，不可用时自动回退
+        self.share_backend = None  # 本次启动实际使用的后端
+        self.share_9p_msize = 512000
+        self.share_9p_cache = "mmap"
+        self.unavailable_share_backends = set()
+        self.virtiofsd_path = share.find_virtiofsd()
+        self.virtiofsd_process = None
+        self._qemu_help_cache = {}  # 缓存 qemu -device help 等帮助输出，参数 -> 文本
+
+        # 启动方式 (见 core/boot_image.py)；默认光盘引导，kernel/microvm 为可选配置:
+        # 直接启动使用从 ISO 提取并缓存的内核，提取失败时回退到光盘引导
+        self.boot_mode = "cdrom"
+        self.unavailable_boot_modes = set()
+        self.kernel_cache = KernelCache(os.path.join(self.data_dir, "kernel-cache"))
+        self._boot_mode = None  # 本次启动实际使用的方式
+        self._last_start_args = None
+
+        # 启动阶段计时与历史 (用于进度条与剩余时间估算)
+        self.boot_history = BootHistory(os.path.join(self.data_dir, "boot_history.jsonl"))
+        self.boot_timeline = None
 
         self.vm_process = None
         self.host_port = 23760
         self.guest_port = 2376
+        self.web_port = 8021
+        self._web_forwarded = False
         self.serial_port = 12345
+        self.qmp_port = 12400
+        self.event_port = 12450
+        self._use_event_channel = False
+        self.agent_port = 12500
+        self.guest_agent = None  # 虚拟机内 qemu-guest-agent 的客户端，代理启动并同步后才赋值
+        self._agent_ready = threading.Event()
+        self.qmp = None
+        self._qmp_ready = threading.Event()
+        self._boot_signal = None  # 虚拟机推送的就绪信号 (会话内的 asyncio.Event)
+        self.shutdown_timeout = 10
         self.is_running = False
-        self.docker_client = None
-        self.is_windows = platform.system() == "Windows"
-        self.whpx_available = None  # 缓存 WHPX 检测结果
+        self.docker_client = None  # Docker 就绪后才赋值
+        # 所有功能共用的 Docker 长连接 (连接池 + keep-alive)，虚拟机重启后自动切换
+        self.docker = DockerConnection(log=self.log_received.emit)
+        # 生命周期: 每次启动是事件循环中的一个会话，子任务由 TaskScope 统一取消
+        self.phase_timeouts = dict(PHASE_TIMEOUTS)
+        self._loop = LoopThread("vm-lifecycle")
+        self._tasks = TaskScope(on_error=self._on_task_error)
+        self._session = None
+        self._process_exit = None
+        # 加速器与 CPU 型号探测结果按 QEMU 版本与宿主机系统缓存，环境不变时不再重复探测
+        self.accel_prober = AcceleratorProber(
+            self.qemu_path, self.qemu_dir, os.path.join(self.data_dir, "accel_cache.json"),
+            is_windows=self.is_windows, log=self.log_received.emit
+        )
+
+        # 手动指定的虚拟机配置，为 None 时自动选择 (基准测试等场景使用)
+        self.accel = None
+        self.cpu_model = None  # 直接指定 -cpu 参数，优先于 cpu_profile
+        self.cpu_profile = "auto"  # 见 core/cpu_profiles.py
+        self.tcg_tb_size = None  # TCG 翻译块缓存大小 (MB)，None 表示使用基准测试结果，0 为 QEMU 默认值
+        self.vm_cores = None
+        self.vm_mem = None
+        self.guest_cpus = None  # 虚拟机内实际上线的 CPU 数量 (由串口上报)
+        self._vm_cores_requested = None
+
+        # 内存气球: 以 ceiling 启动，Docker 就绪后按宿主机与虚拟机内存压力在 floor~ceiling 间调整
+        self.balloon_enabled = True
+        self.balloon_floor_mb = 2048
+        self.balloon_ceiling_mb = None  # 为 None 时使用自动分配的内存大小
+        self.balloon = None
+        self._use_balloon = False
+        self._vm_mem_mb = None
+
+    def _find_qemu_binary(self, name):
+        """优先使用 v-core 自带的 QEMU，Linux 等平台下回退到系统 PATH"""
+        exe_name = name + ".exe" if self.is_windows else name
+        bundled = os.path.join(self.qemu_dir, exe_name)
+        if os.path.exists(bundled) or self.is_windows:
+            return bundled
+        return shutil.which(name) or bundled
 
     def find_available_port(self, start_port, max_attempts=10):
         """查找可用端口"""
@@ -57,6 +166,7 @@ class VMManager(QObject):
 
     def kill_process_on_port(self, port):
         """尝试终止占用指定端口的进程"""
+        import psutil
         try:
             for conn in psutil.net_connections():
                 if conn.laddr.port == port and conn.status == 'LISTEN':
@@ -72,42 +182,9 @@ class VMManager(QObject):
             pass
         return False
 
-    def check_whpx_available(self):
-        """检测 Windows WHPX 硬件加速是否可用（实际测试启动）"""
-        if self.whpx_available is not None:
-            return self.whpx_available
-
-        if not self.is_windows:
-            self.whpx_available = False
-            return False
-
-        try:
-            # 实际尝试用 WHPX 启动一个最小化的 QEMU 实例来验证
-            result = subprocess.run(
-                [self.qemu_path, "-accel", "whpx", "-machine", "q35", "-m", "64", "-display", "none", "-S"],
-                capture_output=True, text=True, timeout=5,
-                cwd=self.qemu_dir, creationflags=subprocess.CREATE_NO_WINDOW
-            )
-            # 如果没有报错且退出码为0，说明 WHPX 可用
-            # 注意：这个命令会因为 -S（暂停启动）而立即退出
-            if result.returncode == 0 or "whpx" not in result.stderr.lower():
-                self.whpx_available = True
-                self.log_received.emit("WHPX 硬件加速验证通过", "info")
-            else:
-                self.whpx_available = False
-                self.log_received.emit(f"WHPX 不可用: {result.stderr[:100]}", "warn")
-        except subprocess.TimeoutExpired:
-            # 超时说明 QEMU 成功启动了（被 -S 暂停）
-            self.whpx_available = True
-            self.log_received.emit("WHPX 硬件加速可用", "info")
-        except Exception as e:
-            self.log_received.emit(f"WHPX 检测失败: {e}", "debug")
-            self.whpx_available = False
-
-        return self.whpx_available
-
     def get_auto_resources(self):
-        cores = multiprocessing.cpu_count()
+        import psutil
+        cores = os.cpu_count() or 1
         vm_cores = max(2, cores // 2)
         total_mem = psutil.virtual_memory().total // (1024**2)
         # 提高内存分配：最小 4GB，或者系统总内存的 50%
@@ -121,15 +198,128 @@ class VMManager(QObject):
         self.log_received.emit(f"资源分配: CPU={vm_cores}核, RAM={vm_mem}MB", "debug")
         return vm_cores, vm_mem
 
+    def _tcg_accel(self, cores, tb_size=0):
+        """多核时使用多线程 TCG，每个 vCPU 对应一个宿主机线程"""
+        accel = "tcg,thread=multi" if cores > 1 else "tcg"
+        if tb_size:
+            accel += f",tb-size={tb_size}"
+        return accel
+
     def normalize_path_for_qemu(self, path):
         """将路径转换为 QEMU 兼容格式（使用正斜杠）"""
         abs_path = os.path.abspath(path)
         # QEMU 在 Windows 上也使用正斜杠
         return abs_path.replace("\\", "/")
 
-    def start_vm(self, iso_path=None, custom_shared_dir=None):
+    def _netdev_spec(self):
+        spec = f"user,id=n1,hostfwd=tcp:127.0.0.1:{self.host_port}-:{self.guest_port}"
+        if self._web_forwarded:
+            spec += f",hostfwd=tcp:127.0.0.1:{self.web_port}-:8021"
+        return spec
+
+    def ensure_docker_disk(self):
+        """确保持久化 Docker 数据盘存在，失败时返回 None（回退为内存存储）"""
+        if os.path.exists(self.docker_disk_path):
+            return self.docker_disk_path
+
+        if not os.path.exists(self.qemu_img_path):
+            self.log_received.emit(f"未找到 qemu-img，Docker 数据将不会持久化: {self.qemu_img_path}", "warn")
+            return None
+
+        os.makedirs(self.data_dir, exist_ok=True)
+        try:
+            # qcow2 按需增长，实际占用只取决于镜像和容器数据大小
+            run_kwargs = {"capture_output": True, "text": True, "timeout": 30, "cwd": self.qemu_dir}
+            if self.is_windows:
+                run_kwargs["creationflags"] = subprocess.CREATE_NO_WINDOW
+            result = subprocess.run(
+                [self.qemu_img_path, "create", "-f", "qcow2", self.docker_disk_path, self.docker_disk_size],
+                **run_kwargs
+            )
+            if result.returncode != 0:
+                self.log_received.emit(f"创建 Docker 数据盘失败: {result.stderr[:200]}", "warn")
+                return None
+        except Exception as e:
+            self.log_received.emit(f"创建 Docker 数据盘失败: {e}", "warn")
+            return None
+
+        self.log_received.emit(f"已创建 Docker 数据盘: {self.docker_disk_path} (首次启动将自动格式化)", "info")
+        return self.docker_disk_path
+
+    def _qemu_help(self, *args):
+        """运行 qemu 帮助查询 (如 -device help) 并缓存输出，失败时返回空字符串"""
+        if args not in self._qemu_help_cache:
+            try:
+                run_kwargs = {"capture_output": True, "text": True, "timeout": 10, "cwd": self.qemu_dir if os.path.isdir(self.qemu_dir) else None}
+                if self.is_windows:
+                    run_kwargs["creationflags"] = subprocess.CREATE_NO_WINDOW
+                result = subprocess.run([self.qemu_path, *args], **run_kwargs)
+                self._qemu_help_cache[args] = result.stdout + result.stderr
+            except Exception:
+                self._qemu_help_cache[args] = ""
+        return self._qemu_help_cache[args]
+
+    def _qemu_supports_device(self, device):
+        return f'"{device}"' in self._qemu_help("-device", "help")
+
+    def _qemu_supports_machine(self, machine):
+        return any(line.split()[:1] == [machine] for line in self._qemu_help("-machine", "help").splitlines())
+
+    def _select_boot(self, iso_path):
+        """返回 (启动方式, 内核文件)；光盘引导时内核文件为 None"""
+        mode = self.boot_mode
+        if mode == "microvm" and ("microvm" in self.unavailable_boot_modes or not self._qemu_supports_machine("microvm")):
+            self.log_received.emit("microvm 机型不可用，改用标准机型直接启动内核", "warn")
+            mode = "kernel"
+        if mode not in ("kernel", "microvm"):
+            return "cdrom", None
+        start = time.time()
+        try:
+            kernel, extracted = self.kernel_cache.get(iso_path)
+        except (OSError, ValueError) as e:
+            self.log_received.emit(f"无法从 ISO 提取内核，使用光盘引导: {e}", "warn")
+            return "cdrom", None
+        if extracted:
+            self.log_received.emit(f"已从 ISO 提取内核与 initramfs ({time.time() - start:.1f}s)，之后直接使用缓存", "info")
+        return mode, kernel
+
+    def _qemu_device_supports_property(self, device, prop):
+        """检查设备是否支持某个属性 (如旧版 QEMU 的 virtio-balloon 没有 free-page-reporting)"""
+        return f"{prop}=" in self._qemu_help("-device", f"{device},help")
+
+    def select_share_backend(self, requested="auto", fast_resume=False):
+        """按回退顺序选择第一个可用的共享目录后端"""
+        for backend in share.FALLBACK_CHAIN.get(requested, share.FALLBACK_CHAIN["auto"]):
+            if backend in self.unavailable_share_backends:
+                continue
+            if backend == "virtiofs":
+                # vhost-user-fs 不支持迁移，无法与快照共存
+                if fast_resume or self.is_windows or not self.virtiofsd_path:
+                    continue
+                if not self._qemu_supports_device("vhost-user-fs-pci"):
+                    continue
+            elif backend == "9p":
+                if not self._qemu_supports_device("virtio-9p-pci"):
+                    continue
+            return backend
+        return "vvfat"
+
+    def _stop_virtiofsd(self):
+        if self.virtiofsd_process:
+            if self.virtiofsd_process.poll() is None:
+                self.virtiofsd_process.terminate()
+                try:
+                    self.virtiofsd_process.wait(timeout=3)
+                except subprocess.TimeoutExpired:
+                    self.virtiofsd_process.kill()
+            self.virtiofsd_process = None
+
+    def start_vm(self, iso_path=None, custom_shared_dir=None, fast_resume=False, share_backend="auto"):
         if self.is_running:
             return True
+        self._wait_previous_session()
+        self._last_start_args = {"iso_path": iso_path, "custom_shared_dir": custom_shared_dir,
+                                 "fast_resume": fast_resume, "share_backend": share_backend}
 
         # 如果没传路径，尝试自动在 v-core 目录下找一个
         if not iso_path:
@@ -169,6 +359,15 @@ class VMManager(QObject):
                 os.remove(p)
 
         cores, mem = self.get_auto_resources()
+        cores = self.vm_cores or cores
+        mem = self.vm_mem or mem
+        use_balloon = self.balloon_enabled and self._qemu_supports_device("virtio-balloon-pci")
+        if use_balloon:
+            mem = self.balloon_ceiling_mb or mem
+        self._vm_mem_mb = mem
+        self._use_balloon = use_balloon
+        self._vm_cores_requested = cores
+        self.guest_cpus = None
 
         # 检查并获取可用的串口端口
         serial_port = self.find_available_port(self.serial_port)
@@ -202,6 +401,30 @@ class VMManager(QObject):
             self.log_received.emit(f"使用备用 Docker 端口: {docker_port}", "info")
         self.host_port = docker_port
 
+        # 检查 QMP 控制端口
+        qmp_port = self.find_available_port(self.qmp_port)
+        if qmp_port is None:
+            self.log_received.emit(f"无法获取可用的 QMP 端口", "error")
+            return False
+        self.qmp_port = qmp_port
+
+        # 虚拟机事件通道: 日志与启动标记走 virtio-serial，不受串口波特率限制；不可用时退回串口
+        self._use_event_channel = self._qemu_supports_device("virtserialport")
+        if self._use_event_channel:
+            event_port = self.find_available_port(self.event_port)
+            agent_port = self.find_available_port(self.agent_port)
+            if event_port is None or agent_port is None:
+                self.log_received.emit("无法获取可用的事件通道端口，虚拟机日志改走串口", "warn")
+                self._use_event_channel = False
+            else:
+                self.event_port = event_port
+                self.agent_port = agent_port
+
+        # Web 界面端口转发 (界面固定访问 localhost:8021)，被占用时跳过
+        self._web_forwarded = self.find_available_port(self.web_port, max_attempts=1) == self.web_port
+        if not self._web_forwarded:
+            self.log_received.emit(f"端口 {self.web_port} 被占用，Web 界面将无法从本机访问", "warn")
+
         # 转换路径为 QEMU 兼容格式
         iso_path_qemu = self.normalize_path_for_qemu(iso_path)
         shared_path_qemu = self.normalize_path_for_qemu(target_shared)
@@ -210,36 +433,156 @@ class VMManager(QObject):
         # 构建 QEMU 启动命令
         cmd = [self.qemu_path, "-L", qemu_dir_qemu, "-m", str(mem)]
 
-        # 检测并启用硬件加速
-        use_whpx = self.check_whpx_available()
-        if use_whpx:
-            # WHPX 使用 qemu64 CPU 模型更稳定，max 可能导致兼容性问题
-            cmd.extend(["-accel", "whpx,kernel-irqchip=off", "-cpu", "qemu64"])
-            self.log_received.emit("启用 WHPX 硬件加速", "info")
+        # 选择硬件加速 (手动指定时不探测)
+        # 基准测试 (scripts/cpu_bench.py) 为本机保存的最优 CPU 配置，仅在加速器相同时使用
+        preferred = self.accel_prober.preferred_cpu_profile() or {}
+        if self.accel:
+            accel_choice = None
+            accel_name = self.accel.split(",")[0]
+            default_cpu = "qemu64"
         else:
-            cmd.extend(["-accel", "tcg", "-cpu", "qemu64"])
-            self.log_received.emit("使用 TCG 软件模拟", "info")
+            accel_choice = self.accel_prober.select()
+            accel_name = accel_choice["name"]
+            default_cpu = accel_choice["cpu"]
+        if preferred.get("accel") != accel_name:
+            preferred = {}
+
+        tb_size = self.tcg_tb_size if self.tcg_tb_size is not None else preferred.get("tcg_tb_size", 0)
+        if self.accel and self.accel != "tcg":
+            accel = self.accel
+        elif accel_name == "tcg":
+            accel = self._tcg_accel(cores, tb_size)
+        else:
+            accel = accel_choice["accel"]
+
+        profile = self.cpu_profile
+        if profile == "auto" and preferred.get("name"):
+            profile = preferred["name"]
+        cpu_model, note = resolve_cpu(profile, accel_name, default_cpu)
+        if note:
+            self.log_received.emit(note, "warn")
+        cpu_model = self.cpu_model or cpu_model
+
+        if self.accel:
+            self.log_received.emit(f"使用指定的加速器: {accel} (CPU 型号: {cpu_model})", "info")
+        elif accel_name == "tcg":
+            self.log_received.emit(f"使用 TCG 软件模拟 (CPU 型号: {cpu_model})", "info")
+        else:
+            self.log_received.emit(f"启用 {accel_name.upper()} 硬件加速 (CPU 型号: {cpu_model})", "info")
+        cmd.extend(["-accel", accel, "-cpu", cpu_model])
+        if accel_choice:
+            accel_choice = dict(accel_choice, launched_cpu=cpu_model)
+
+        # 启动方式: 直接加载内核可跳过 BIOS 与 isolinux，ISO 仍挂载供虚拟机读取数据
+        boot_mode, kernel = self._select_boot(iso_path)
+        self._boot_mode = boot_mode
+        if boot_mode == "microvm":
+            # microvm 没有 IDE 光驱，ISO 以只读 virtio 磁盘提供，虚拟机内按 serial 识别
+            cmd.extend(["-machine", "microvm",
+                        "-drive", f"file={iso_path_qemu},format=raw,if=none,id=isodisk,readonly=on",
+                        "-device", "virtio-blk-pci,drive=isodisk,serial=nekro-iso"])
+        else:
+            cmd.extend(["-cdrom", iso_path_qemu])
+        if kernel:
+            cmd.extend(["-kernel", self.normalize_path_for_qemu(kernel["kernel"]),
+                        "-initrd", self.normalize_path_for_qemu(kernel["initrd"]),
+                        "-append", kernel["append"]])
+        else:
+            cmd.extend(["-boot", "d"])
+        self.log_received.emit(f"启动方式: {boot_mode}", "info")
 
         # 添加其他参数
         cmd.extend([
             "-smp", f"cores={cores},threads=1",
-            "-cdrom", iso_path_qemu,
-            "-boot", "d",
-            "-netdev", f"user,id=n1,hostfwd=tcp:127.0.0.1:{self.host_port}-:{self.guest_port}",
+            "-netdev", self._netdev_spec(),
             "-device", "virtio-net-pci,netdev=n1",
-            "-drive", f"file=fat:rw:{shared_path_qemu},format=raw,if=virtio",
-            "-serial", f"tcp:127.0.0.1:{self.serial_port},server,nowait",
             "-device", "virtio-rng-pci",
+            "-device", "pvpanic",
             "-vga", "std",
             "-no-reboot"
         ])
+        if use_balloon:
+            balloon_spec = "virtio-balloon-pci,id=balloon0,deflate-on-oom=on"
+            if self._qemu_device_supports_property("virtio-balloon-pci", "free-page-reporting"):
+                balloon_spec += ",free-page-reporting=on"
+            cmd.extend(["-device", balloon_spec])
+        if self._use_event_channel:
+            cmd.extend([
+                "-device", "virtio-serial-pci,id=vser0",
+                "-device", f"virtserialport,bus=vser0.0,chardev=vosevents,name={EVENT_CHANNEL}",
+                "-device", f"virtserialport,bus=vser0.0,chardev=qga0,name={AGENT_CHANNEL}",
+            ])
+
+        # 挂载持久化 Docker 数据盘，虚拟机内通过 serial 识别，避免依赖 vdX 顺序
+        docker_disk = self.ensure_docker_disk()
+        if docker_disk:
+            docker_disk_qemu = self.normalize_path_for_qemu(docker_disk)
+            cmd.extend([
+                "-drive", f"file={docker_disk_qemu},format=qcow2,if=none,id=dockerdisk,cache=writeback,discard=unmap",
+                "-device", "virtio-blk-pci,drive=dockerdisk,serial=nekro-docker",
+            ])
+
+        # 快速恢复模式: 已挂载的共享目录会阻止快照，启动时不连接设备，由宿主机在快照点之后热插拔
+        self.fast_resume = bool(fast_resume and docker_disk and boot_mode != "microvm")
+        if fast_resume and not docker_disk:
+            self.log_received.emit("快速恢复需要 Docker 数据盘，本次使用冷启动", "warn")
+        elif fast_resume and boot_mode == "microvm":
+            self.log_received.emit("microvm 机型不支持设备热插拔，本次不使用快速恢复", "warn")
+
+        # 选择共享目录后端
+        backend = self.select_share_backend(share_backend, self.fast_resume)
+        if backend != share_backend and share_backend != "auto":
+            self.log_received.emit(f"共享目录后端 {share_backend} 不可用，回退到 {backend}", "warn")
+        virtiofs_socket = None
+        if backend == "virtiofs":
+            virtiofs_socket = os.path.join(tempfile.gettempdir(), f"nekro-virtiofs-{os.getpid()}.sock")
+            self._stop_virtiofsd()
+            self.virtiofsd_process = share.start_virtiofsd(self.virtiofsd_path, target_shared, virtiofs_socket)
+            if self.virtiofsd_process is None:
+                self.log_received.emit("virtiofsd 启动失败，回退到 9p", "warn")
+                self.unavailable_share_backends.add("virtiofs")
+                backend = self.select_share_backend(share_backend, self.fast_resume)
+        self.share_backend = backend
+        self.log_received.emit(f"共享目录后端: {backend}", "info")
+        cmd.extend(share.qemu_args(backend, shared_path_qemu, hotplug=self.fast_resume,
+                                   is_windows=self.is_windows, mem_mb=mem, virtiofs_socket=virtiofs_socket))
+        cmd.extend(share.fw_cfg_args(backend, self.share_9p_msize, self.share_9p_cache))
+        if boot_mode == "microvm":
+            cmd = to_microvm(cmd)
+
+        restoring = False
+        self._share_drive_spec = share.vvfat_drive_spec(shared_path_qemu)
+        if self.fast_resume:
+            self._snapshot_signature = self._compute_snapshot_signature(iso_path, cmd)
+            restoring = self._load_snapshot_signature() == self._snapshot_signature
+            if restoring:
+                cmd.extend(["-loadvm", self.snapshot_name])
+                self.log_received.emit("检测到可用快照，快速恢复虚拟机", "info")
+            else:
+                self.log_received.emit("镜像或配置已变化，冷启动并在就绪后重新保存快照", "info")
+
+        cmd.extend([
+            "-serial", f"tcp:127.0.0.1:{self.serial_port},server,nowait",
+            "-qmp", f"tcp:127.0.0.1:{self.qmp_port},server,nowait",
+        ])
+        if self._use_event_channel:
+            cmd.extend([
+                "-chardev", f"socket,id=vosevents,host=127.0.0.1,port={self.event_port},server,nowait",
+                "-chardev", f"socket,id=qga0,host=127.0.0.1,port={self.agent_port},server,nowait",
+            ])
 
         self.log_received.emit(f"ISO 路径: {iso_path}", "debug")
         self.log_received.emit(f"共享目录: {target_shared}", "debug")
+        if docker_disk:
+            self.log_received.emit(f"Docker 数据盘: {docker_disk}", "debug")
         self.log_received.emit(f"启动指令: {' '.join(cmd)}", "debug")
 
+        profile = "|".join([os.path.basename(iso_path), "resume" if restoring else "cold",
+                            accel_name, cpu_model, f"{cores}c", f"{mem}m", backend, boot_mode])
+        self.boot_timeline = BootTimeline(profile)
+
         try:
-            # Windows 平台捕获 stderr 以便诊断错误
+            # 捕获 stdout/stderr 以便诊断错误，由事件循环持续读取
             popen_kwargs = {
                 "cwd": self.base_path,
                 "stderr": subprocess.PIPE,
@@ -248,12 +591,14 @@ class VMManager(QObject):
             if self.is_windows:
                 popen_kwargs["creationflags"] = subprocess.CREATE_NEW_CONSOLE
 
-            self.vm_process = subprocess.Popen(cmd, **popen_kwargs)
+            # 在事件循环中创建子进程，管道以非阻塞方式接入循环 (Windows 下为重叠 I/O)
+            self.vm_process = self._loop.submit(spawn_process(cmd, **popen_kwargs)).result()
             self.is_running = True
+            self._qmp_ready.clear()
+            self._agent_ready.clear()
             self.status_changed.emit("启动中...")
-            threading.Thread(target=self._log_reader, daemon=True).start()
-            threading.Thread(target=self._wait_for_docker, args=(target_shared,), daemon=True).start()
-            threading.Thread(target=self._monitor_process, args=(use_whpx, target_shared), daemon=True).start()
+            self._session = self._loop.submit(
+                self._run_session(self.vm_process, target_shared, accel_choice, restoring))
             return True
         except FileNotFoundError:
             self.log_received.emit(f"错误: 找不到 QEMU 可执行文件", "error")
@@ -265,122 +610,559 @@ class VMManager(QObject):
             self.log_received.emit(f"虚拟机启动失败: {type(e).__name__}: {e}", "error")
             return False
 
-    def _wait_for_docker(self, cert_dir):
-        """轮询证书和 Docker 端口，判定启动成功"""
+    def _wait_previous_session(self, timeout=30):
+        """上一次会话 (含全部子任务) 结束后才开始新的会话"""
+        session = self._session
+        if session is None or session.done() or self._loop.in_loop_thread():
+            return
+        try:
+            session.result(timeout)
+        except Exception as e:
+            self.log_received.emit(f"等待上一次虚拟机会话结束失败: {e}", "debug")
+
+    async def _run_session(self, handle, cert_dir, accel_choice, restoring):
+        """一次虚拟机运行的完整生命周期，以 QEMU 进程退出为终点
+
+        串口、QMP、Docker 就绪检测等子任务都属于本会话，进程退出或 stop_vm 时统一取消并等待结束，
+        下一次 start_vm 在本会话完全结束后才会开始，新旧会话不会并存。
+        """
+        process = handle.process
+        self._boot_signal = asyncio.Event()
+        self._process_exit = handle.exited
+        # stdout、stderr 与串口在同一个循环中并发读取，管道不会写满而阻塞 QEMU；stderr 只保留最近部分用于诊断
+        stderr_tail = TailBuffer()
+        pipes = [
+            asyncio.ensure_future(pump_lines(process.stdout, self._on_qemu_output)),
+            asyncio.ensure_future(pump_lines(process.stderr, lambda line: self._on_qemu_output(line, stderr_tail))),
+        ]
+        self._tasks.spawn(self._serial_reader())
+        if self._use_event_channel:
+            self._tasks.spawn(self._event_reader())
+            self._tasks.spawn(self._agent_connect())
+        self._tasks.spawn(self._qmp_connect())
+        self._tasks.spawn(self._wait_for_docker(cert_dir))
+        if restoring:
+            self._tasks.spawn(self._attach_shared_dir())
+        try:
+            await asyncio.shield(self._process_exit)
+        finally:
+            await self._tasks.cancel()
+            # 进程退出后管道随即到达 EOF，等待剩余输出读完
+            await asyncio.wait(pipes, timeout=2)
+            for pipe in pipes:
+                pipe.cancel()
+            handle.close()
+        self._on_process_exit(handle.returncode, stderr_tail.text(), accel_choice)
+
+    def _on_qemu_output(self, line, tail=None):
+        if tail is not None:
+            tail.append(line)
+        if line.strip():
+            self.log_received.emit(f"QEMU: {line.strip()}", "debug")
+
+    def _on_task_error(self, error):
+        self.log_received.emit(f"后台任务异常: {type(error).__name__}: {error}", "debug")
+
+    def _wake_readiness(self):
+        """唤醒就绪检测 (可在任意线程调用)"""
+        signal = self._boot_signal
+        if signal is not None:
+            self._loop.call_soon(signal.set)
+
+    async def _wait_for_docker(self, cert_dir):
+        """等待虚拟机推送就绪信号后验证 Docker 连接，轮询仅作为兜底"""
         self.log_received.emit("等待系统初始化并生成安全证书...", "info")
         ca = os.path.join(cert_dir, 'ca.pem')
         cert = os.path.join(cert_dir, 'cert.pem')
         key = os.path.join(cert_dir, 'key.pem')
 
-        timeout = 300
-        start = time.time()
-        poll_interval = 0.5  # 初始轮询间隔（秒）
-        max_poll_interval = 2.0  # 最大轮询间隔
+        loop = asyncio.get_running_loop()
+        timeout = self.phase_timeouts["docker"]
+        start = loop.time()
+        fallback_interval = 2.0  # 未收到信号时的兜底轮询间隔
+        burst_interval = 0.1  # 收到信号后的短时重试间隔
+        burst_until = 0
 
-        # 第一阶段：等待证书生成
         certs_found = False
-        while time.time() - start < timeout and self.is_running:
-            if os.path.exists(ca) and os.path.exists(cert) and os.path.exists(key):
+        client = None
+        try:
+            while loop.time() - start < timeout:
+                interval = burst_interval if loop.time() < burst_until else fallback_interval
+                try:
+                    await asyncio.wait_for(self._boot_signal.wait(), interval)
+                    # 收到串口就绪标记 / QMP 事件，接下来几秒内快速重试
+                    self._boot_signal.clear()
+                    burst_until = loop.time() + 3
+                except asyncio.TimeoutError:
+                    pass
+
+                if not (os.path.exists(ca) and os.path.exists(cert) and os.path.exists(key)):
+                    continue
                 if not certs_found:
-                    elapsed = time.time() - start
-                    self.log_received.emit(f"证书文件已检测到 ({elapsed:.1f}s)，等待 Docker 端口开放...", "info")
+                    elapsed = loop.time() - start
+                    self.log_received.emit(f"证书文件已检测到 ({elapsed:.1f}s)，等待 Docker 服务响应...", "info")
                     certs_found = True
-                    poll_interval = 0.3  # 证书找到后加快轮询
 
-                # 第二阶段：检测端口连通性
-                try:
-                    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                    s.settimeout(1)
-                    result = s.connect_ex(('127.0.0.1', self.host_port))
-                    s.close()
-
-                    if result == 0:
-                        # 端口通了，尝试 Docker 握手
-                        try:
-                            tls_config = docker.tls.TLSConfig(client_cert=(cert, key), ca_cert=ca, verify=True)
-                            client = docker.DockerClient(base_url=f"tcp://127.0.0.1:{self.host_port}", tls=tls_config, timeout=5)
-                            if client.ping():
-                                self.docker_client = client
-                                elapsed = time.time() - start
-                                self.log_received.emit(f"虚拟机 Docker 服务已就绪！(总耗时 {elapsed:.1f}s)", "success")
-                                self.boot_finished.emit()
-                                self.status_changed.emit("运行中")
-                                return
-                        except Exception as e:
-                            self.log_received.emit(f"TLS握手重试中: {e}", "debug")
-                except Exception:
-                    pass
+                if self.boot_timeline and "port_open" not in self.boot_timeline.marks:
+                    try:
+                        _, writer = await asyncio.wait_for(asyncio.open_connection('127.0.0.1', self.host_port), 1)
+                        writer.close()
+                        self._mark_boot_phase("port_open")
+                    except (OSError, asyncio.TimeoutError):
+                        pass
 
-            time.sleep(poll_interval)
-            # 逐渐增加轮询间隔，避免过多 CPU 消耗
-            poll_interval = min(poll_interval * 1.2, max_poll_interval)
+                try:
+                    # 同一组证书只建立一次客户端，重试时复用其连接池
+                    if client is None:
+                        client = await asyncio.to_thread(self.docker.connect, self.host_port, ca, cert, key)
+                    if await asyncio.to_thread(client.ping):
+                        self.docker_client, client = client, None
+                        self._mark_boot_phase("tls_ping")
+                        elapsed = loop.time() - start
+                        self.log_received.emit(f"虚拟机 Docker 服务已就绪！(总耗时 {elapsed:.1f}s)", "success")
+                        self.boot_finished.emit()
+                        self.status_changed.emit("运行中")
+                        if self._use_balloon:
+                            self._start_balloon()
+                        if self._web_forwarded:
+                            self._tasks.spawn(self._wait_for_webui())
+                        return
+                except Exception as e:
+                    self.log_received.emit(f"TLS握手重试中: {e}", "debug")
+        finally:
+            if client is not None:
+                self.docker.close()
 
+        self._finish_boot_timeline(False)
         if self.is_running:
             self.log_received.emit("启动超时，请检查控制台日志", "error")
             self.status_changed.emit("启动超时")
 
-    def _log_reader(self):
-        s = None
-        # 重试连接串口，使用递增间隔
-        retry_interval = 0.5
-        max_retries = 20
-        for attempt in range(max_retries):
-            if not self.is_running:
-                return
+    async def _connect_chardev(self, port):
+        """连接 QEMU 的 TCP 字符设备 (递增间隔重试)，超时返回 None"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.phase_timeouts["serial"]
+        retry_interval = 0.1
+        while True:
             try:
-                s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                s.settimeout(2)
-                s.connect(('127.0.0.1', self.serial_port))
-                self.log_received.emit("串口连接成功", "info")
-                break
-            except Exception:
-                if s:
-                    s.close()
-                    s = None
-                if attempt < max_retries - 1:
-                    time.sleep(retry_interval)
-                    retry_interval = min(retry_interval * 1.3, 2.0)
-        else:
+                return await asyncio.open_connection('127.0.0.1', port)
+            except OSError:
+                if loop.time() >= deadline:
+                    return None
+                await asyncio.sleep(retry_interval)
+                retry_interval = min(retry_interval * 1.5, 1.0)
+
+    async def _serial_reader(self):
+        streams = await self._connect_chardev(self.serial_port)
+        if streams is None:
             self.log_received.emit("串口连接失败，日志功能不可用", "warn")
             return
+        reader, writer = streams
+        self.log_received.emit("串口连接成功", "info")
 
         try:
-            s.settimeout(None)  # 切换为阻塞模式
-            buffer = ""
-            while self.is_running:
-                chunk = s.recv(4096).decode('utf-8', errors='ignore')
-                if not chunk:
-                    break
-                buffer += chunk
-                if '\n' in buffer:
-                    lines = buffer.split('\n')
-                    for line in lines[:-1]:
-                        if line.strip():
-                            self.log_received.emit(line.strip(), "vm")
-                    buffer = lines[-1]
-        except Exception as e:
+            await pump_lines(reader, self._on_serial_line)
+        except OSError as e:
             if self.is_running:
                 self.log_received.emit(f"串口读取断开: {e}", "debug")
         finally:
-            if s:
-                s.close()
+            writer.close()
+
+    async def _event_reader(self):
+        """读取虚拟机事件通道，断开后重新连接
+
+        宿主机未连接时虚拟机内的写入会阻塞，启动脚本随之停住，因此连接失败后不能放弃，
+        只要虚拟机在运行就持续重试。
+        """
+        connected = False
+        warned = False
+        while self.is_running:
+            streams = await self._connect_chardev(self.event_port)
+            if streams is None:
+                if not warned:
+                    self.log_received.emit("事件通道连接失败，继续重试", "warn")
+                    warned = True
+                await asyncio.sleep(1.0)
+                continue
+            reader, writer = streams
+            if not connected:
+                self.log_received.emit("事件通道已连接", "debug")
+                connected = True
+            try:
+                await pump_lines(reader, self._on_guest_event)
+            except OSError as e:
+                if self.is_running:
+                    self.log_received.emit(f"事件通道读取断开: {e}", "debug")
+            finally:
+                writer.close()
 
-    def _monitor_process(self, used_whpx=False, shared_dir=None):
-        """监控QEMU进程，检测异常退出并尝试回退"""
-        if not self.vm_process:
+    def _on_guest_event(self, line):
+        """事件通道的一帧: 类型与内容以制表符分隔，log 为显示给用户的日志，mark 为启动标记"""
+        kind, _, text = line.partition("\t")
+        text = text.strip()
+        if not text:
             return
+        if kind == "log":
+            self.log_received.emit(text, "vm")
+        elif kind == "mark":
+            self.log_received.emit(text, "debug")
+            self._on_guest_marker(text)
 
-        # 读取 stderr 输出
-        stderr_output = ""
+    def _on_serial_line(self, line):
+        if line.strip():
+            self.log_received.emit(line.strip(), "vm")
+        # 内核日志始终走串口；旧版 ISO 或没有事件通道时，setup.start 的标记也在串口中
+        self._on_guest_marker(line)
+
+    def _on_guest_marker(self, line):
+        timeline = self.boot_timeline
+        if timeline:
+            phase = timeline.mark_from_serial(line)
+            if phase:
+                self._on_boot_phase(timeline, phase)
+        if "V-OS CERTS READY" in line or "V-OS READY" in line:
+            self._boot_signal.set()
+        if "V-OS CPUS " in line:
+            self._on_guest_cpus(line.split("V-OS CPUS ", 1)[1])
+        if "V-OS SNAPSHOT POINT" in line and self.fast_resume:
+            self._tasks.spawn(self._take_snapshot())
+
+    def _on_guest_cpus(self, value):
         try:
-            if self.vm_process.stderr:
-                stderr_output = self.vm_process.stderr.read().decode('utf-8', errors='ignore')
+            self.guest_cpus = int(value.split()[0])
+        except (IndexError, ValueError):
+            return
+        if self._vm_cores_requested and self.guest_cpus < self._vm_cores_requested:
+            self.log_received.emit(
+                f"虚拟机只识别到 {self.guest_cpus} 个 CPU (配置 {self._vm_cores_requested} 个)，请检查 ISO 的内核启动参数",
+                "warn")
+        else:
+            self.log_received.emit(f"虚拟机已识别 {self.guest_cpus} 个 CPU", "debug")
+
+    async def _qmp_connect(self):
+        """连接 QEMU 的 QMP 控制通道"""
+        client = QMPClient('127.0.0.1', self.qmp_port, on_event=self._on_qmp_event)
+        cancelled = threading.Event()
+
+        def connect():
+            connected = client.connect(timeout=self.phase_timeouts["qmp"], should_continue=lambda: not cancelled.is_set())
+            if connected and cancelled.is_set():
+                client.close()
+                return False
+            return connected
+
+        try:
+            if await asyncio.to_thread(connect):
+                self.qmp = client
+                self._qmp_ready.set()
+                self._mark_boot_phase("qemu_spawn")
+                self.log_received.emit("QMP 控制通道已连接", "debug")
+                return
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+        except Exception as e:
+            self.log_received.emit(f"QMP 连接失败: {e}", "warn")
+        if self.is_running:
+            self.log_received.emit("QMP 控制通道不可用，仅能强制停止虚拟机", "warn")
+
+    async def _agent_connect(self):
+        """连接虚拟机内的 qemu-guest-agent (开机后才启动，旧版 ISO 没有代理)"""
+        client = GuestAgentClient('127.0.0.1', self.agent_port)
+        cancelled = threading.Event()
+
+        def connect():
+            connected = client.connect(timeout=self.phase_timeouts["agent"],
+                                       should_continue=lambda: not cancelled.is_set())
+            if connected and cancelled.is_set():
+                client.close()
+                return False
+            return connected
+
+        try:
+            if await asyncio.to_thread(connect):
+                self.guest_agent = client
+                self._agent_ready.set()
+                self.log_received.emit("客户机代理已连接", "debug")
+                return
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+        if self.is_running:
+            self.log_received.emit("客户机代理不可用 (ISO 未包含 qemu-guest-agent 或代理未启动)", "debug")
+
+    def _on_qmp_event(self, event, data):
+        """处理 QEMU 推送的异步事件 (在 QMP 读取线程中调用)"""
+        self.qmp_event.emit(event, data)
+        if event == "GUEST_PANICKED":
+            self.log_received.emit(f"虚拟机内核崩溃: {data.get('info', data)}", "error")
+            self.status_changed.emit("虚拟机崩溃")
+        elif event == "SHUTDOWN":
+            self.log_received.emit(f"虚拟机关机 (原因: {data.get('reason', 'unknown')})", "info")
+            self._wake_readiness()
+        elif event in ("STOP", "RESUME", "POWERDOWN", "RESET"):
+            self.log_received.emit(f"QMP 事件: {event}", "debug")
+
+    def _mark_boot_phase(self, phase):
+        timeline = self.boot_timeline
+        if timeline and timeline.mark(phase):
+            self._on_boot_phase(timeline, phase)
+
+    def _on_boot_phase(self, timeline, phase):
+        duration = timeline.durations().get(phase, 0.0)
+        self.log_received.emit(f"启动阶段完成: {PHASE_LABELS[phase]} ({duration:.1f}s)", "debug")
+        if phase == "compose_up" and not self._web_forwarded:
+            self._finish_boot_timeline(True)
+
+    def _finish_boot_timeline(self, success):
+        """保存本次启动的阶段耗时到历史记录"""
+        timeline = self.boot_timeline
+        if timeline is None:
+            return
+        self.boot_timeline = None
+        if not timeline.marks:
+            return
+        record = timeline.to_dict(success)
+        self.boot_history.append(record)
+        self.boot_timeline_finished.emit(record)
+        if success:
+            self.log_received.emit(f"启动耗时分布: {timeline.summary()}", "info")
+
+    def boot_progress_estimate(self):
+        """返回 (阶段名称, 进度 0~1 或 None, 预计剩余秒数或 None)，未在启动中时返回 None"""
+        timeline = self.boot_timeline
+        if timeline is None:
+            return None
+        phase, progress, remaining = self.boot_history.estimate(timeline)
+        return PHASE_LABELS.get(phase, "完成"), progress, remaining
+
+    def _start_balloon(self):
+        if self.balloon:
+            self.balloon.stop()
+        self.balloon = BalloonController(self, self.balloon_floor_mb, self._vm_mem_mb)
+        self.balloon.start()
+        self.log_received.emit(
+            f"内存气球已启用: {self.balloon.floor_mb}MB ~ {self.balloon.ceiling_mb}MB", "debug")
+
+    def _stop_balloon(self):
+        if self.balloon:
+            self.balloon.stop()
+            self.balloon = None
+
+    async def _wait_for_webui(self):
+        """Docker 就绪后等待 Web 界面开始响应"""
+        url = f"http://127.0.0.1:{self.web_port}/"
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.phase_timeouts["webui"]
+        while self.boot_timeline is not None and loop.time() < deadline:
+            if await asyncio.to_thread(self._http_responds, url):
+                self._mark_boot_phase("webui")
+                self.log_received.emit("Web 界面已可访问", "info")
+                self._finish_boot_timeline(True)
+                return
+            await asyncio.sleep(1)
+        self._finish_boot_timeline(False)
+
+    @staticmethod
+    def _http_responds(url):
+        try:
+            urllib.request.urlopen(url, timeout=2).close()
+            return True
+        except urllib.error.HTTPError:
+            return True  # 有 HTTP 响应即视为服务已启动
+        except Exception:
+            return False
+
+    def qmp_execute(self, command, arguments=None, timeout=30):
+        """执行 QMP 命令，未连接或出错时返回 None"""
+        if not self._qmp_ready.wait(timeout) or not self.qmp or not self.qmp.connected:
+            return None
+        try:
+            return self.qmp.execute(command, arguments, timeout=timeout)
+        except (QMPError, ConnectionError, TimeoutError) as e:
+            self.log_received.emit(f"QMP 命令 {command} 失败: {e}", "warn")
+            return None
+
+    def _hmp(self, command_line, timeout=600):
+        """通过 QMP 执行 HMP 命令，返回输出文本；QMP 不可用时返回 None"""
+        if not self._qmp_ready.wait(30) or not self.qmp or not self.qmp.connected:
+            self.log_received.emit("QMP 控制通道不可用", "warn")
+            return None
+        try:
+            return self.qmp.hmp(command_line, timeout=timeout).strip()
+        except (QMPError, ConnectionError, TimeoutError) as e:
+            self.log_received.emit(f"监视器命令执行失败 ({command_line.split()[0]}): {e}", "warn")
+            return None
+
+    def _agent_call(self, method, *args, **kwargs):
+        """调用客户机代理，代理未连接或出错时返回 None"""
+        client = self.guest_agent
+        if not self._agent_ready.is_set() or client is None or not client.connected:
+            return None
+        try:
+            return getattr(client, method)(*args, **kwargs)
+        except (GuestAgentError, ConnectionError, TimeoutError) as e:
+            self.log_received.emit(f"客户机代理命令 {method} 失败: {e}", "warn")
+            return None
+
+    def agent_execute(self, command, arguments=None, timeout=10):
+        """执行任意客户机代理命令，返回 return 字段"""
+        return self._agent_call("execute", command, arguments, timeout=timeout)
+
+    def guest_exec(self, args, input_data=None, timeout=30):
+        """在虚拟机内执行命令，返回 {'exitcode', 'stdout', 'stderr'}"""
+        return self._agent_call("exec", args, input_data=input_data, timeout=timeout)
+
+    def guest_read_file(self, path, max_bytes=16 * 1024 * 1024):
+        return self._agent_call("read_file", path, max_bytes=max_bytes)
+
+    def guest_write_file(self, path, data, append=False):
+        return self._agent_call("write_file", path, data, append=append) is not None
+
+    def guest_fsfreeze(self):
+        """冻结虚拟机内的文件系统，返回冻结数量；之后必须调用 guest_fsthaw"""
+        return self._agent_call("fsfreeze")
+
+    def guest_fsthaw(self):
+        return self._agent_call("fsthaw")
+
+    def guest_stats(self, timeout=5):
+        """虚拟机内的内存、负载与磁盘使用情况，代理不可用时返回 None"""
+        return self._agent_call("stats", timeout=timeout)
+
+    def query_status(self):
+        """查询虚拟机运行状态，如 {'status': 'running', 'running': True}"""
+        return self.qmp_execute("query-status", timeout=5)
+
+    def query_cpus(self):
+        """查询各 vCPU 的线程与状态信息"""
+        return self.qmp_execute("query-cpus-fast", timeout=5)
+
+    def powerdown(self):
+        """发送 ACPI 关机请求，由虚拟机自行有序关机"""
+        return self.qmp_execute("system_powerdown", timeout=5) is not None
+
+    def pause_vm(self):
+        return self.qmp_execute("stop", timeout=5) is not None
+
+    def resume_vm(self):
+        return self.qmp_execute("cont", timeout=5) is not None
+
+    def _compute_snapshot_signature(self, iso_path, cmd):
+        """根据 ISO 与虚拟机硬件配置计算快照签名，任一变化都需要冷启动"""
+        volatile = {"-serial", "-qmp", "-netdev", "-loadvm"}
+        machine_args = []
+        skip = False
+        prev = None
+        for arg in cmd[1:]:
+            if skip:
+                skip = False
+                continue
+            if arg in volatile:
+                skip = True
+                continue
+            if prev == "-chardev" and arg.startswith("socket,"):
+                # 宿主机端口可能因占用而改变，不影响虚拟机硬件
+                arg = ",".join(opt for opt in arg.split(",") if not opt.startswith("port="))
+            machine_args.append(arg)
+            prev = arg
+
+        h = hashlib.sha256()
+        iso_stat = os.stat(iso_path)
+        h.update(f"{os.path.abspath(iso_path)}|{iso_stat.st_size}|{iso_stat.st_mtime_ns}".encode())
+        if os.path.exists(self.qemu_path):
+            qemu_stat = os.stat(self.qemu_path)
+            h.update(f"|{qemu_stat.st_size}|{qemu_stat.st_mtime_ns}".encode())
+        h.update("\0".join(machine_args).encode())
+        return h.hexdigest()
+
+    def _load_snapshot_signature(self):
+        try:
+            with open(self.snapshot_meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("name") == self.snapshot_name:
+                return meta.get("signature")
         except Exception:
             pass
+        return None
+
+    def _save_snapshot_signature(self, signature):
+        try:
+            with open(self.snapshot_meta_path, "w", encoding="utf-8") as f:
+                json.dump({"name": self.snapshot_name, "signature": signature,
+                           "created": time.time()}, f, indent=4)
+        except Exception as e:
+            self.log_received.emit(f"保存快照信息失败: {e}", "warn")
+
+    def invalidate_snapshot(self):
+        """删除快照记录，下次启动强制冷启动"""
+        if os.path.exists(self.snapshot_meta_path):
+            os.remove(self.snapshot_meta_path)
+
+    async def _take_snapshot(self):
+        """虚拟机到达快照点后保存整机快照，然后连接共享目录让启动继续"""
+        self.log_received.emit("正在保存快速恢复快照...", "info")
+        start = time.time()
+        # 保存失败时旧记录已失效，先删除避免下次加载不一致的快照
+        self.invalidate_snapshot()
+        output = await asyncio.to_thread(self._hmp, f"savevm {self.snapshot_name}")
+        if output is not None and "error" not in output.lower():
+            self._save_snapshot_signature(self._snapshot_signature)
+            self.log_received.emit(f"快照已保存 ({time.time() - start:.1f}s)，下次启动将直接恢复", "success")
+        else:
+            self.log_received.emit(f"快照保存失败，下次仍将冷启动: {output}", "warn")
+        await self._attach_shared_dir()
+
+    async def _attach_shared_dir(self):
+        """热插拔共享目录 (快速恢复模式下启动时未挂载)"""
+        if self.share_backend == "vvfat":
+            output = await asyncio.to_thread(self._hmp, f"drive_add 0 {self._share_drive_spec},if=none,id=hostshare")
+            if output is None or "error" in output.lower():
+                self.log_received.emit(f"共享目录热插拔失败: {output}", "error")
+                return
+        result = await asyncio.to_thread(self.qmp_execute, "device_add", share.hotplug_device(self.share_backend))
+        if result is None:
+            self.log_received.emit("共享目录热插拔失败", "error")
+            return
+        self.log_received.emit("共享目录已连接到虚拟机", "info")
 
-        exit_code = self.vm_process.wait()
+    def _on_process_exit(self, exit_code, stderr_output, accel_choice=None):
+        """QEMU 进程退出后的清理，检测异常退出并尝试回退"""
         was_running = self.is_running
         self.is_running = False
+        self._boot_signal = None
+        kernel_started = bool(self.boot_timeline and "firmware" in self.boot_timeline.marks)
+        self._finish_boot_timeline(False)
+        if self.qmp:
+            self.qmp.close()
+            self.qmp = None
+        self._qmp_ready.clear()
+        self._agent_ready.clear()
+        if self.guest_agent:
+            self.guest_agent.close()
+            self.guest_agent = None
+        self._stop_virtiofsd()
+        self._stop_balloon()
+        self.docker_client = None
+        self.docker.close()
+
+        # microvm 在内核启动前失败 (加速器或 QEMU 版本不支持) 时改用标准机型重启
+        if was_running and exit_code != 0 and self._boot_mode == "microvm" and not kernel_started:
+            self.log_received.emit(f"microvm 机型启动失败，改用标准机型: {stderr_output[:300]}", "warn")
+            self.unavailable_boot_modes.add("microvm")
+            self.status_changed.emit("启动方式回退中...")
+            threading.Thread(target=self.start_vm, kwargs=self._last_start_args, daemon=True).start()
+            return
+
+        # 共享目录后端导致启动失败时，标记为不可用并自动使用下一个后端重启
+        hints = share.BACKEND_ERROR_HINTS.get(self.share_backend, ())
+        if was_running and exit_code != 0 and any(h in stderr_output.lower() for h in hints):
+            self.log_received.emit(f"共享目录后端 {self.share_backend} 启动失败: {stderr_output[:300]}", "warn")
+            self.unavailable_share_backends.add(self.share_backend)
+            self.status_changed.emit("共享目录回退中...")
+            # start_vm 会等待本会话结束，不能在事件循环中直接调用
+            threading.Thread(target=self.start_vm, kwargs=self._last_start_args, daemon=True).start()
+            return
 
         if was_running and exit_code != 0:
             self.log_received.emit(f"QEMU 异常退出，退出码: {exit_code}", "error")
@@ -388,33 +1170,74 @@ class VMManager(QObject):
                 # 只显示前500字符避免日志过长
                 self.log_received.emit(f"错误信息: {stderr_output[:500]}", "error")
 
-            # 如果使用了 WHPX 且失败，尝试回退到 TCG
-            if used_whpx:
-                self.log_received.emit("WHPX 启动失败，尝试回退到软件模拟...", "warn")
-                self.whpx_available = False  # 禁用 WHPX
+            # 快照恢复失败时丢弃快照记录，下次冷启动
+            if self.fast_resume:
+                self.invalidate_snapshot()
+
+            # 自动选择的加速器组合启动失败时记入黑名单，下次启动使用下一个可用组合
+            if accel_choice and accel_choice["launched_cpu"] != accel_choice["cpu"] and self.cpu_profile == "auto":
+                # 基准测试保存的 CPU 配置无法启动，清除后回到探测结果
+                self.log_received.emit(f"CPU 型号 {accel_choice['launched_cpu']} 启动失败，下次启动改用探测结果", "warn")
+                self.accel_prober.save_cpu_profile(None)
+                self.status_changed.emit("启动失败")
+            elif accel_choice and accel_choice["name"] != "tcg":
+                name = accel_choice["name"].upper()
+                self.log_received.emit(
+                    f"{name} (-cpu {accel_choice['cpu']}) 启动失败，下次启动将改用其他加速器或 CPU 型号", "warn")
+                self.accel_prober.mark_failed(accel_choice["accel"], accel_choice["cpu"])
                 # 注意：这里不自动重启，让用户手动重试
-                self.status_changed.emit("WHPX失败，请重试")
+                self.status_changed.emit(f"{name}失败，请重试")
             else:
                 self.status_changed.emit("启动失败")
         else:
             self.status_changed.emit("已停止")
 
     def stop_vm(self):
-        """停止虚拟机"""
+        """停止虚拟机
+
+        立即取消会话中的启动与就绪检测任务，然后通过 ACPI 有序关机，超时后强制终止。
+        在事件循环之外调用时会等待会话完全结束。
+        """
         self.is_running = False
-        if self.docker_client:
-            try:
-                self.docker_client.close()
-            except Exception:
-                pass
-            self.docker_client = None
+        self._stop_balloon()
+        self.docker_client = None
+        self.docker.close()
 
-        if self.vm_process and self.vm_process.poll() is None:
-            self.log_received.emit("正在停止虚拟机...", "info")
-            self.vm_process.terminate()
-            try:
-                self.vm_process.wait(timeout=10)
-            except subprocess.TimeoutExpired:
-                self.vm_process.kill()
-                self.log_received.emit("强制终止虚拟机", "warn")
+        session = self._session
+        if session is not None and not session.done():
+            shutdown = self._loop.submit(self._shutdown())
+            if not self._loop.in_loop_thread():
+                try:
+                    shutdown.result()
+                    session.result(timeout=10)
+                    return  # 会话结束时已清理并发出状态
+                except Exception as e:
+                    self.log_received.emit(f"等待虚拟机会话结束失败: {e}", "debug")
+            else:
+                return
+        self._stop_virtiofsd()
         self.status_changed.emit("已停止")
+
+    async def _shutdown(self):
+        await self._tasks.cancel()
+        process, exited = self.vm_process, self._process_exit
+        if process is None or exited is None or exited.done():
+            return
+        self.log_received.emit("正在停止虚拟机...", "info")
+        # 优先通过 ACPI 有序关机，保证数据盘文件系统一致
+        if self._qmp_ready.is_set() and await asyncio.to_thread(self.powerdown):
+            if await self._wait_process_exit(self.shutdown_timeout):
+                return
+            self.log_received.emit("虚拟机未响应关机请求，强制停止", "warn")
+        process.terminate()
+        if not await self._wait_process_exit(5):
+            process.kill()
+            self.log_received.emit("强制终止虚拟机", "warn")
+            await self._wait_process_exit(5)
+
+    async def _wait_process_exit(self, timeout):
+        try:
+            await asyncio.wait_for(asyncio.shield(self._process_exit), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
@@ -17,6 +17,13 @@ if errorlevel 1 (
 
 cd /d "%~dp0"
 
+REM Image distribution: tar (docker save, default) or squashfs (pre-extracted overlay2 store)
+if "%IMAGE_STORE%"=="" set IMAGE_STORE=tar
+REM Root filesystem: initramfs (whole system in RAM, default) or squashfs (compressed root on the ISO + tmpfs overlay)
+if "%ROOT_FS%"=="" set ROOT_FS=initramfs
+REM Set ROOT_FS_REPORT=1 to build both root variants and time them under QEMU (slow)
+if "%ROOT_FS_REPORT%"=="" set ROOT_FS_REPORT=0
+
 echo 1/4 Building ISO Builder Image...
 docker build -t nekro-iso-builder .
 
@@ -27,6 +34,9 @@ echo.
 echo 2/4 Building: Lite Edition...
 docker run --rm ^
     -e BUILD_MODE=lite ^
+    -e IMAGE_STORE=%IMAGE_STORE% ^
+    -e ROOT_FS=%ROOT_FS% ^
+    -e ROOT_FS_REPORT=%ROOT_FS_REPORT% ^
     -v //var/run/docker.sock:/var/run/docker.sock ^
     -v "%cd%:/compose:ro" ^
     -v "%cd%\..\v-core:/out" ^
@@ -36,6 +46,9 @@ echo.
 echo 3/4 Building: Napcat Edition...
 docker run --rm ^
     -e BUILD_MODE=napcat ^
+    -e IMAGE_STORE=%IMAGE_STORE% ^
+    -e ROOT_FS=%ROOT_FS% ^
+    -e ROOT_FS_REPORT=%ROOT_FS_REPORT% ^
     -v //var/run/docker.sock:/var/run/docker.sock ^
     -v "%cd%:/compose:ro" ^
     -v "%cd%\..\v-core:/out" ^
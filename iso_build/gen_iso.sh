@@ -17,6 +17,15 @@ DOCKER_IMAGES=(
     "kromiose/nekro-agent-sandbox:latest"
 )
 
+# 镜像分发方式: tar (docker save，默认) 或 squashfs (预解压的 overlay2 镜像库)
+IMAGE_STORE="${IMAGE_STORE:-tar}"
+# 生成镜像库使用的 dind 版本，需与虚拟机内 dockerd 一样使用 overlay2 graphdriver
+DIND_IMAGE="${DIND_IMAGE:-docker:27-dind}"
+# 根文件系统形式: initramfs (整个系统打包为 cpio，默认) 或 squashfs (ISO 上的只读压缩镜像 + tmpfs 可写层)
+ROOT_FS="${ROOT_FS:-initramfs}"
+# 为 1 时同时生成两种根文件系统，并在构建机上用 TCG 启动测量耗时，写入 boot/root-report.txt (较慢，默认关闭)
+ROOT_FS_REPORT="${ROOT_FS_REPORT:-0}"
+
 if [ "$BUILD_MODE" = "napcat" ]; then
     echo "=== 正在构建 [Napcat 版] ==="
     OUT_ISO="/out/alpine-docker-napcat.iso"
@@ -43,7 +52,52 @@ for img in "${DOCKER_IMAGES[@]}"; do
 done
 
 echo "导出镜像到 ISO 数据区..."
-docker save "${DOCKER_IMAGES[@]}" -o "$DATA_DIR/images/nekro-images.tar"
+IMAGES_TAR="$DATA_DIR/images/nekro-images.tar"
+docker save "${DOCKER_IMAGES[@]}" -o "$IMAGES_TAR"
+
+# 记录镜像 ID，虚拟机内比对持久化数据盘上的镜像，一致则跳过 docker load
+# 从 tar 的 manifest.json 取配置摘要 (即 docker load 后的镜像 ID)，不依赖宿主机的镜像存储类型
+tar -xOf "$IMAGES_TAR" manifest.json | jq -r \
+    '.[] | (.Config | split("/") | last | sub("\\.json$"; "")) as $id | .RepoTags[] | "\(.) sha256:\($id)"' \
+    > "$DATA_DIR/images/images.digest"
+
+if [ "$IMAGE_STORE" = "squashfs" ]; then
+    echo "=== 2.5. 生成预解压镜像库 (overlay2 squashfs) ==="
+    # 在临时 dind 中执行一次 docker load，把解压好的 overlay2 存储打包为只读 squashfs
+    # 虚拟机启动时直接挂载使用，无需再解压和复制镜像层
+    STORE_BUILDER="nekro-store-builder-$$"
+    docker run -d --privileged --name "$STORE_BUILDER" "$DIND_IMAGE" --storage-driver=overlay2 >/dev/null
+    trap 'docker rm -f -v "$STORE_BUILDER" >/dev/null 2>&1 || true' EXIT
+    for i in $(seq 1 60); do docker exec "$STORE_BUILDER" docker info >/dev/null 2>&1 && break; sleep 1; done
+
+    docker cp "$IMAGES_TAR" "$STORE_BUILDER:/tmp/nekro-images.tar"
+    docker cp "$DATA_DIR/images/images.digest" "$STORE_BUILDER:/tmp/.nekro-store"
+
+    LOAD_START=$(date +%s)
+    docker exec "$STORE_BUILDER" docker load -q -i /tmp/nekro-images.tar
+    LOAD_SECONDS=$(( $(date +%s) - LOAD_START ))
+
+    STORE_MB=$(docker exec "$STORE_BUILDER" du -sm /var/lib/docker/image /var/lib/docker/overlay2 | awk '{s+=$1} END {print s}')
+    docker exec "$STORE_BUILDER" apk add --no-cache -q squashfs-tools
+    docker exec "$STORE_BUILDER" mksquashfs /var/lib/docker/image /var/lib/docker/overlay2 /tmp/.nekro-store \
+        /tmp/image-store.sqfs -comp zstd -noappend -quiet
+    docker cp "$STORE_BUILDER:/tmp/image-store.sqfs" "$DATA_DIR/images/image-store.sqfs"
+    docker rm -f -v "$STORE_BUILDER" >/dev/null
+    trap - EXIT
+
+    TAR_MB=$(du -sm "$IMAGES_TAR" | cut -f1)
+    SQFS_MB=$(du -sm "$DATA_DIR/images/image-store.sqfs" | cut -f1)
+    rm -f "$IMAGES_TAR"
+
+    cat > "$DATA_DIR/images/store-report.txt" <<REPORT
+镜像分发方式: squashfs 预解压镜像库 (对比 docker save tarball)
+tarball 大小:           ${TAR_MB} MB
+squashfs 大小:          ${SQFS_MB} MB
+解压后镜像库大小:       ${STORE_MB} MB  (tarball 模式下启动时需写入虚拟机的数据量，无数据盘时全部占用内存)
+构建机 docker load 耗时: ${LOAD_SECONDS} s  (tarball 模式下每次冷启动的解压耗时下限，虚拟机内通常更慢)
+REPORT
+    cat "$DATA_DIR/images/store-report.txt"
+fi
 
 echo "=== 3. 复制配置到 ISO 数据区 ==="
 cp /compose/docker-compose.yml "$DATA_DIR/compose/"
@@ -67,6 +121,7 @@ apk --root "$ROOTFS" --initdb --update-cache --no-cache \
     e2fsprogs \
     mkinitfs \
     eudev \
+    qemu-guest-agent \
     bash
 
 echo "=== 5. 配置系统服务 ==="
@@ -77,12 +132,24 @@ ln -s "/etc/init.d/udev-trigger" "$ROOTFS/etc/runlevels/sysinit/udev-trigger" ||
 ln -s "/etc/init.d/cgroups" "$ROOTFS/etc/runlevels/sysinit/cgroups" || true
 ln -s "/etc/init.d/local" "$ROOTFS/etc/runlevels/default/local" || true
 
+# 客户机代理: 管理器通过 virtio-serial 端口执行命令、读写文件、冻结文件系统与读取资源状态
+ln -s "/etc/init.d/qemu-guest-agent" "$ROOTFS/etc/runlevels/default/qemu-guest-agent" || true
+cat > "$ROOTFS/etc/conf.d/qemu-guest-agent" <<'QGA_CONF'
+GA_METHOD="virtio-serial"
+GA_PATH="/dev/virtio-ports/org.qemu.guest_agent.0"
+QGA_CONF
+
+# ACPI 电源按钮: 管理器通过 QMP system_powerdown 请求有序关机
+ln -s "/etc/init.d/acpid" "$ROOTFS/etc/runlevels/default/acpid" || true
+mkdir -p "$ROOTFS/etc/acpi/PWRF"
+printf '#!/bin/sh\npoweroff\n' > "$ROOTFS/etc/acpi/PWRF/00000080"
+chmod +x "$ROOTFS/etc/acpi/PWRF/00000080"
+
 sed -i 's/^root:!:/root::/' "$ROOTFS/etc/shadow"
 # 配置登录终端 (直接追加到 inittab，避免 sed 模式匹配问题)
 cat >> "$ROOTFS/etc/inittab" <<'INITTAB'
 
-# Serial console (用于 QEMU 串口输出)
-ttyS0::respawn:/sbin/getty -L 115200 ttyS0 vt100
+# 串口只输出内核日志 (含崩溃信息)，不再运行登录终端，避免与日志交错
 
 # Virtual consoles
 tty1::respawn:/sbin/getty 38400 tty1
@@ -108,26 +175,167 @@ DATA_DIR="$SHARED_DIR/nekro_data"
 CDROM_DIR="/mnt/cdrom"
 CERT_DIR="/etc/docker/certs"
 
+DOCKER_DISK_SERIAL="nekro-docker"
+# microvm 机型没有光驱，ISO 以只读 virtio 磁盘提供
+ISO_DISK_SERIAL="nekro-iso"
+DOCKER_ROOT="/var/lib/docker"
+
+# 宿主机事件通道 (virtio-serial 端口 org.nekro.events)，不受串口波特率限制
+find_event_port() {
+    modprobe -q virtio_console 2>/dev/null || true
+    for port in /sys/class/virtio-ports/*; do
+        [ "$(cat "$port/name" 2>/dev/null)" = "org.nekro.events" ] || continue
+        echo "/dev/$(basename "$port")"
+        return 0
+    done
+    return 1
+}
+EVENT_PORT=$(find_event_port)
+TAB=$(printf '\t')
+
+# 发送一帧事件: emit <类型> <内容>，每帧一行，类型与内容以制表符分隔；没有事件通道时退回串口
+emit() {
+    if [ -n "$EVENT_PORT" ]; then
+        printf '%s\t%s\n' "$1" "$2" > "$EVENT_PORT"
+    else
+        echo "$2" > /dev/ttyS0
+    fi
+}
+
 log() {
-    echo "V-OS: $1" > /dev/console
-    echo "$1" > /dev/ttyS0
+    emit log "$1"
+}
+
+# 宿主机据此推进启动流程 (V-OS CERTS READY 等)
+mark() {
+    emit mark "$1"
+}
+
+# 启动阶段标记，宿主机据此记录各阶段耗时
+phase() {
+    mark "V-OS PHASE $1"
+}
+
+# 命令输出逐行转发为日志 (镜像加载、启动容器等大量输出)
+stream_log() {
+    if [ -n "$EVENT_PORT" ]; then
+        sed "s/^/log${TAB}/" > "$EVENT_PORT"
+    else
+        cat > /dev/null
+    fi
+}
+
+# 按 virtio serial 查找块设备 (由 VMManager 的 -device serial= 指定)
+find_disk_by_serial() {
+    for dev in /sys/block/vd*; do
+        [ -f "$dev/serial" ] || continue
+        if [ "$(cat "$dev/serial")" = "$1" ]; then
+            echo "/dev/$(basename "$dev")"
+            return 0
+        fi
+    done
+    return 1
+}
+
+# 挂载光盘中的预解压镜像库: 镜像层 diff 目录只读绑定挂载，少量元数据复制到可写的 /var/lib/docker
+mount_image_store() {
+    STORE_SQFS="$CDROM_DIR/nekro_data/images/image-store.sqfs"
+    STORE_DIR="/mnt/image_store"
+    [ -f "$STORE_SQFS" ] || return 1
+    modprobe -q squashfs 2>/dev/null || true
+    modprobe -q loop 2>/dev/null || true
+    mkdir -p "$STORE_DIR" "$DOCKER_ROOT/overlay2"
+    mount -t squashfs -o loop,ro "$STORE_SQFS" "$STORE_DIR" || return 1
+
+    # 元数据只在首次或光盘版本变化时复制 (数据盘上会保留)
+    if ! cmp -s "$STORE_DIR/.nekro-store" "$DOCKER_ROOT/.nekro-store"; then
+        cp -a "$STORE_DIR/image" "$DOCKER_ROOT/"
+        cp -a "$STORE_DIR/overlay2/l" "$DOCKER_ROOT/overlay2/"
+        for layer_dir in "$STORE_DIR"/overlay2/*/; do
+            layer=$(basename "$layer_dir")
+            [ "$layer" = "l" ] && continue
+            mkdir -p "$DOCKER_ROOT/overlay2/$layer"
+            for f in "$layer_dir"*; do
+                [ "$(basename "$f")" = "diff" ] && continue
+                cp -a "$f" "$DOCKER_ROOT/overlay2/$layer/"
+            done
+        done
+        cp "$STORE_DIR/.nekro-store" "$DOCKER_ROOT/.nekro-store"
+    fi
+
+    for diff in "$STORE_DIR"/overlay2/*/diff; do
+        layer=$(basename "$(dirname "$diff")")
+        mkdir -p "$DOCKER_ROOT/overlay2/$layer/diff"
+        mount --bind "$diff" "$DOCKER_ROOT/overlay2/$layer/diff"
+    done
+    return 0
+}
+
+# 持久化数据盘上的镜像与光盘清单一致时返回 0
+images_match() {
+    DIGEST_FILE="$CDROM_DIR/nekro_data/images/images.digest"
+    [ -f "$DIGEST_FILE" ] || return 1
+    while read -r img id; do
+        [ -n "$img" ] || continue
+        [ "$(docker image inspect -f '{{.Id}}' "$img" 2>/dev/null)" = "$id" ] || return 1
+    done < "$DIGEST_FILE"
+    return 0
+}
+
+# 读取宿主机通过 fw_cfg 传入的共享目录参数 (backend=9p;msize=512000;cache=mmap)
+share_opt() {
+    cat /sys/firmware/qemu_fw_cfg/by_name/opt/nekro/share/raw 2>/dev/null | tr ';' '\n' | sed -n "s/^$1=//p"
+}
+
+# 共享目录设备 (virtiofs、9p 标签或非数据盘的 virtio 磁盘) 在开机时是否存在
+share_device_present() {
+    ls -d /sys/bus/virtio/drivers/virtiofs/virtio* >/dev/null 2>&1 && return 0
+    grep -qs hostshare /sys/bus/virtio/drivers/9pnet_virtio/*/mount_tag && return 0
+    for dev in /dev/vd?; do
+        [ -b "$dev" ] || continue
+        [ "$dev" = "$DOCKER_DISK" ] && continue
+        [ "$dev" = "$ISO_DISK" ] && continue
+        return 0
+    done
+    return 1
+}
+
+# 挂载 virtiofs、9pfs 或 vvfat 共享目录 (跳过 Docker 数据盘)
+mount_share() {
+    mount -t virtiofs hostshare "$SHARED_DIR" 2>/dev/null && return 0
+    SHARE_MSIZE=$(share_opt msize)
+    SHARE_CACHE=$(share_opt cache)
+    mount -t 9p -o "trans=virtio,version=9p2000.L,msize=${SHARE_MSIZE:-512000},cache=${SHARE_CACHE:-mmap}" \
+        hostshare "$SHARED_DIR" 2>/dev/null && return 0
+    for dev in /dev/vd?; do
+        [ -b "$dev" ] || continue
+        [ "$dev" = "$DOCKER_DISK" ] && continue
+        [ "$dev" = "$ISO_DISK" ] && continue
+        mount -t vfat "${dev}1" "$SHARED_DIR" 2>/dev/null && return 0
+    done
+    return 1
 }
 
 # Run initialization in background so boot continues
 (
+    phase init
     log "系统启动中 (后台初始化)..."
+    # 报告实际上线的 CPU 数量，宿主机据此确认多核生效
+    mark "V-OS CPUS $(grep -c ^processor /proc/cpuinfo)"
 
-    # 1. 挂载 9pfs 或共享目录
-    mkdir -p "$SHARED_DIR"
-    mount -t 9p -o trans=virtio,version=9p2000.L hostshare "$SHARED_DIR" 2>/dev/null || \
-    mount -t vfat /dev/vda1 "$SHARED_DIR" 2>/dev/null || true
+    DOCKER_DISK=$(find_disk_by_serial "$DOCKER_DISK_SERIAL")
+    ISO_DISK=$(find_disk_by_serial "$ISO_DISK_SERIAL")
 
-    # 2. 挂载光驱以获取预包装数据
+    # 内存气球: 宿主机按需回收内存，空闲页通过 free page reporting 归还
+    modprobe -q virtio_balloon 2>/dev/null || true
+
+    # 1. 挂载光驱以获取预包装数据
     mkdir -p "$CDROM_DIR"
     mount -t iso9660 /dev/cdrom "$CDROM_DIR" 2>/dev/null || \
-    mount -t iso9660 /dev/sr0 "$CDROM_DIR" 2>/dev/null || true
+    mount -t iso9660 /dev/sr0 "$CDROM_DIR" 2>/dev/null || \
+    { [ -n "$ISO_DISK" ] && mount -t iso9660 -o ro "$ISO_DISK" "$CDROM_DIR" 2>/dev/null; } || true
 
-    # 3. 证书与环境准备
+    # 2. 证书与环境准备 (先生成到本地，挂载共享目录后再复制给宿主机)
     mkdir -p "$CERT_DIR"
 
     # [关键修复] 强制覆盖 Docker 配置，确保监听 TCP 2376
@@ -135,7 +343,7 @@ log() {
 DOCKER_OPTS="--tlsverify --tlscacert=/etc/docker/certs/ca.pem --tlscert=/etc/docker/certs/server-cert.pem --tlskey=/etc/docker/certs/server-key.pem -H fd:// -H tcp://0.0.0.0:2376"
 DOCKER_CONF
 
-    if [ ! -f "$SHARED_DIR/ca.pem" ]; then
+    if [ ! -f "$CERT_DIR/ca.pem" ]; then
         cd "$CERT_DIR"
         openssl genrsa -out ca-key.pem 2048 2>/dev/null
         openssl req -new -x509 -days 3650 -key ca-key.pem -sha256 -out ca.pem -subj "/CN=V-OS-CA" 2>/dev/null
@@ -147,7 +355,22 @@ DOCKER_CONF
         openssl req -new -key key.pem -out client.csr -subj "/CN=client" 2>/dev/null
         echo "extendedKeyUsage = clientAuth" > extfile-client.cnf
         openssl x509 -req -days 3650 -sha256 -in client.csr -CA ca.pem -CAkey ca-key.pem -CAcreateserial -out cert.pem -extfile extfile-client.cnf 2>/dev/null
-        cp *.pem "$SHARED_DIR/" 2>/dev/null || true
+    fi
+    phase certs
+
+    # 3. 挂载持久化 Docker 数据盘 (首次启动时格式化)
+    if [ -n "$DOCKER_DISK" ]; then
+        rc-service docker stop >/dev/null 2>&1 || true
+        if ! blkid "$DOCKER_DISK" >/dev/null 2>&1; then
+            log "首次启动，正在格式化 Docker 数据盘..."
+            mkfs.ext4 -q -L NEKRO_DOCKER "$DOCKER_DISK"
+        fi
+        mkdir -p "$DOCKER_ROOT"
+        mount -t ext4 -o noatime "$DOCKER_DISK" "$DOCKER_ROOT" || log "警告: Docker 数据盘挂载失败，将使用内存存储"
+    fi
+
+    if mount_image_store; then
+        log "已挂载光盘预解压镜像库"
     fi
 
     # 4. 启动 Docker (强制重启以加载新配置) 并从 CDROM 加载镜像
@@ -156,17 +379,43 @@ DOCKER_CONF
     if ! docker info >/dev/null 2>&1; then
         log "错误: Docker 服务启动失败，请检查 /etc/conf.d/docker"
     fi
+    phase docker
 
     VERSION_TAG=$(cat /etc/nekro_default_napcat)
-    if [ -z "$(docker images -q kromiose/nekro-agent:latest 2>/dev/null)" ]; then
+    if images_match; then
+        log "镜像与光盘一致，跳过恢复"
+    elif [ -f "$CDROM_DIR/nekro_data/images/images.digest" ] || \
+         [ -z "$(docker images -q kromiose/nekro-agent:latest 2>/dev/null)" ]; then
         log "正在从光盘恢复系统环境 (约 1 分钟)..."
         if [ -f "$CDROM_DIR/nekro_data/images/nekro-images.tar" ]; then
-            docker load -i "$CDROM_DIR/nekro_data/images/nekro-images.tar"
+            docker load -i "$CDROM_DIR/nekro_data/images/nekro-images.tar" 2>&1 | stream_log
+            # 清理被新镜像替换下来的旧层，避免数据盘持续增长
+            docker image prune -f >/dev/null 2>&1 || true
             log "系统环境恢复完成"
         fi
     fi
+    phase images
 
-    # 5. 启动服务
+    # 5. 挂载共享目录
+    modprobe -q qemu_fw_cfg 2>/dev/null || true
+    log "共享目录后端: $(share_opt backend)"
+    # 开机时没有共享设备说明宿主机处于快速恢复模式: 此处 Docker 已就绪且尚未挂载任何
+    # 宿主机目录，宿主机在收到快照点标记后保存快照，再热插拔共享目录让启动继续
+    mkdir -p "$SHARED_DIR"
+    if share_device_present; then
+        mount_share || log "警告: 共享目录挂载失败"
+    else
+        sync
+        mark "V-OS SNAPSHOT POINT"
+        until mount_share; do sleep 0.2; done
+        log "共享目录已连接"
+    fi
+    cp "$CERT_DIR"/*.pem "$SHARED_DIR/" 2>/dev/null || true
+    sync
+    # 通知宿主机: 证书已写入共享目录且 Docker 已在监听，可立即建立 TLS 连接
+    mark "V-OS CERTS READY"
+
+    # 6. 启动服务
     mkdir -p "$DATA_DIR"
     [ ! -f "$DATA_DIR/.env" ] && cp "$CDROM_DIR/nekro_data/compose/env.template" "$DATA_DIR/.env"
 
@@ -174,10 +423,9 @@ DOCKER_CONF
     [ "$VERSION_TAG" = "true" ] && COMPOSE_SRC="$CDROM_DIR/nekro_data/compose/docker-compose-napcat.yml"
 
     log "正在启动 Nekro 服务..."
-    docker compose -f "$COMPOSE_SRC" --env-file "$DATA_DIR/.env" up -d
+    docker compose -f "$COMPOSE_SRC" --env-file "$DATA_DIR/.env" up -d 2>&1 | stream_log
 
-    log "V-OS READY"
-    echo "V-OS READY" > /dev/ttyS0
+    mark "V-OS READY"
 ) &
 
 exit 0
@@ -187,21 +435,102 @@ EOF
 chmod +x "$ROOTFS/etc/local.d/setup.start"
 
 echo "=== 6.5. 配置 Init 引导脚本 ==="
+# squashfs 根的小型 initramfs 在 switch_root 后也执行本脚本，已由其挂载 (move) 的文件系统跳过
 cat > "$ROOTFS/init" <<'EOF'
 #!/bin/sh
 export PATH=/sbin:/usr/sbin:/bin:/usr/bin
-mount -t proc proc /proc
-mount -t sysfs sysfs /sys
-mount -t devtmpfs none /dev
-mkdir -p /dev/pts
-mount -t devpts devpts /dev/pts
-mount -t tmpfs -o nosuid,nodev,noexec shm /dev/shm
+mounted() { grep -q " $1 " /proc/mounts 2>/dev/null; }
+mounted /proc || mount -t proc proc /proc
+mounted /sys || mount -t sysfs sysfs /sys
+mounted /dev || mount -t devtmpfs none /dev
+mkdir -p /dev/pts /dev/shm
+mounted /dev/pts || mount -t devpts devpts /dev/pts
+mounted /dev/shm || mount -t tmpfs -o nosuid,nodev,noexec shm /dev/shm
 if [ -x /sbin/mdev ]; then mdev -s; fi
 exec /sbin/init
 EOF
 chmod +x "$ROOTFS/init"
 
-echo "=== 7. 打包轻量级 Initramfs ==="
+# squashfs 根使用的小型 initramfs: busybox + 挂载 ISO/squashfs/overlay 所需的内核模块
+build_tiny_initramfs() {
+    TINY="/work/tiny-initramfs"
+    rm -rf "$TINY"
+    mkdir -p "$TINY/bin" "$TINY/lib" "$TINY/dev" "$TINY/proc" "$TINY/sys" \
+        "$TINY/media/iso" "$TINY/media/root" "$TINY/media/rw" "$TINY/newroot"
+    cp "$ROOTFS/bin/busybox" "$TINY/bin/"
+    cp -a "$ROOTFS"/lib/ld-musl-*.so.1 "$TINY/lib/"
+    KVER=$(ls "$ROOTFS/lib/modules" | head -n 1)
+    for dir in kernel/fs/squashfs kernel/fs/overlayfs kernel/fs/isofs kernel/drivers/block kernel/drivers/cdrom \
+               kernel/drivers/ata kernel/drivers/scsi kernel/drivers/virtio kernel/lib; do
+        [ -d "$ROOTFS/lib/modules/$KVER/$dir" ] || continue
+        mkdir -p "$TINY/lib/modules/$KVER/$(dirname "$dir")"
+        cp -a "$ROOTFS/lib/modules/$KVER/$dir" "$TINY/lib/modules/$KVER/$dir"
+    done
+    cp "$ROOTFS/lib/modules/$KVER"/modules.* "$TINY/lib/modules/$KVER/"
+
+    cat > "$TINY/init" <<'TINY_INIT'
+#!/bin/busybox sh
+/bin/busybox mkdir -p /sbin /usr/bin /usr/sbin
+/bin/busybox --install -s
+export PATH=/sbin:/usr/sbin:/bin:/usr/bin
+mount -t proc proc /proc
+mount -t sysfs sysfs /sys
+mount -t devtmpfs none /dev
+for mod in virtio_pci virtio_mmio virtio_blk ata_piix sr_mod isofs loop squashfs overlay; do
+    modprobe -q "$mod" 2>/dev/null || true
+done
+
+# 查找带有根文件系统镜像的 ISO (标准机型为光驱，microvm 为只读 virtio 磁盘)
+found=""
+for i in $(seq 1 100); do
+    for dev in /dev/sr0 /dev/vd?; do
+        [ -b "$dev" ] || continue
+        mount -t iso9660 -o ro "$dev" /media/iso 2>/dev/null || continue
+        if [ -f /media/iso/boot/rootfs.sqfs ]; then
+            found="$dev"
+            break 2
+        fi
+        umount /media/iso
+    done
+    sleep 0.1
+done
+if [ -z "$found" ]; then
+    echo "V-OS: 未找到根文件系统镜像 boot/rootfs.sqfs" > /dev/console
+    exec sh
+fi
+
+# 只读 squashfs 作为下层，tmpfs 作为可写上层
+mount -t squashfs -o ro,loop /media/iso/boot/rootfs.sqfs /media/root
+mount -t tmpfs -o mode=755 tmpfs /media/rw
+mkdir -p /media/rw/upper /media/rw/work
+mount -t overlay overlay -o lowerdir=/media/root,upperdir=/media/rw/upper,workdir=/media/rw/work /newroot
+for m in /media/iso /media/root /media/rw; do
+    mkdir -p "/newroot$m"
+    mount --move "$m" "/newroot$m"
+done
+for m in /dev /proc /sys; do
+    mount --move "$m" "/newroot$m"
+done
+# 其余设备初始化 (devpts、shm、mdev -s) 与完整 initramfs 相同，交给根文件系统的 /init
+exec switch_root /newroot /init
+TINY_INIT
+    chmod +x "$TINY/init"
+    (cd "$TINY" && find . -print0 | cpio --null -o -H newc 2>/dev/null | gzip -9 > "$1")
+}
+
+# 测量内核启动到执行 init 的耗时 (秒): 以 busybox 作为 init 立即退出，内核 panic 后 QEMU 随即退出
+measure_unpack() {
+    if ! command -v qemu-system-x86_64 >/dev/null 2>&1; then
+        echo "-"
+        return
+    fi
+    START=$EPOCHREALTIME
+    timeout 600 qemu-system-x86_64 -m 2048 -display none -serial null -no-reboot \
+        -kernel "$ISO_DIR/boot/vmlinuz" -initrd "$1" -append "rdinit=/bin/busybox panic=-1" >/dev/null 2>&1 || true
+    awk -v s="$START" -v e="$EPOCHREALTIME" 'BEGIN { printf "%.1f", e - s }'
+}
+
+echo "=== 7. 打包根文件系统 (${ROOT_FS}) ==="
 cd "$ROOTFS"
 # 确保 init 存在并有执行权限
 if [ ! -f "init" ]; then
@@ -227,10 +556,50 @@ fi
 # 移除冗余文件以减小 initramfs 体积
 rm -rf boot/* 2>/dev/null || true
 
-# 使用最稳健的打包方式：不含 ./ 前缀
-find * -print0 | cpio --null -ov -H newc | gzip -1 > "$ISO_DIR/boot/initramfs"
+# 按 ROOT_FS 生成放入 ISO 的一种；ROOT_FS_REPORT=1 时两种都生成，用于对比体积与启动耗时
+ROOT_WORK="/work/root-variants"
+rm -rf "$ROOT_WORK"
+mkdir -p "$ROOT_WORK"
+
+if [ "$ROOT_FS" != "squashfs" ] || [ "$ROOT_FS_REPORT" = "1" ]; then
+    # 完整 initramfs: 内核启动时全部解压到内存，并在虚拟机运行期间一直占用
+    # 使用最稳健的打包方式：不含 ./ 前缀
+    find * -print0 | cpio --null -ov -H newc | gzip -1 > "$ROOT_WORK/initramfs-full"
+fi
+
+if [ "$ROOT_FS" = "squashfs" ] || [ "$ROOT_FS_REPORT" = "1" ]; then
+    # squashfs 根: 只读压缩镜像放在 ISO 上按需读取，小型 initramfs 只负责挂载
+    mksquashfs "$ROOTFS" "$ROOT_WORK/rootfs.sqfs" -comp zstd -noappend -quiet
+    build_tiny_initramfs "$ROOT_WORK/initramfs-tiny"
+fi
+
+if [ "$ROOT_FS" = "squashfs" ]; then
+    cp "$ROOT_WORK/initramfs-tiny" "$ISO_DIR/boot/initramfs"
+    cp "$ROOT_WORK/rootfs.sqfs" "$ISO_DIR/boot/rootfs.sqfs"
+else
+    cp "$ROOT_WORK/initramfs-full" "$ISO_DIR/boot/initramfs"
+fi
 du -sh "$ISO_DIR/boot/initramfs"
 
+if [ "$ROOT_FS_REPORT" = "1" ]; then
+    ROOT_MB=$(du -sm "$ROOTFS" | cut -f1)
+    FULL_MB=$(du -sm "$ROOT_WORK/initramfs-full" | cut -f1)
+    SQFS_MB=$(du -sm "$ROOT_WORK/rootfs.sqfs" | cut -f1)
+    TINY_KB=$(du -sk "$ROOT_WORK/initramfs-tiny" | cut -f1)
+    FULL_BOOT=$(measure_unpack "$ROOT_WORK/initramfs-full")
+    TINY_BOOT=$(measure_unpack "$ROOT_WORK/initramfs-tiny")
+    cat > "$ISO_DIR/boot/root-report.txt" <<REPORT
+根文件系统形式: ${ROOT_FS}
+完整 initramfs (cpio.gz):  ${FULL_MB} MB，解压后 ${ROOT_MB} MB 全部常驻虚拟机内存
+squashfs 根 (zstd):        ${SQFS_MB} MB (在 ISO 上按需读取) + 小型 initramfs ${TINY_KB} KB，内存只保存改动的文件
+内核启动到执行 init 的耗时 (构建机 TCG，主要为 initramfs 解压):
+    完整 initramfs:        ${FULL_BOOT} s
+    小型 initramfs:        ${TINY_BOOT} s
+完整启动耗时请用 scripts/boot_bench.py 分别测试两种 ISO
+REPORT
+    cat "$ISO_DIR/boot/root-report.txt"
+fi
+
 echo "=== 8. 创建 ISO (包含外部数据区) ==="
 cat > "$ISO_DIR/boot/isolinux/isolinux.cfg" <<EOF
 SERIAL 0 115200
@@ -239,6 +608,11 @@ TIMEOUT 1
 DEFAULT alpine
 
 LABEL alpine
+    LINUX /boot/vmlinuz
+    APPEND initrd=/boot/initramfs console=ttyS0,115200 rdinit=/init
+
+# 兼容模式: 禁用 APIC (只能使用单个 CPU)，仅用于排查个别加速器下的中断问题
+LABEL safe
     LINUX /boot/vmlinuz
     APPEND initrd=/boot/initramfs console=ttyS0,115200 rdinit=/init noapic nolapic
 EOF
@@ -1,12 +1,21 @@
 import sys
-from PyQt6.QtWidgets import QApplication
-from ui.main_window import MainWindow
 
 def main():
+    if "--headless" in sys.argv[1:]:
+        # 无界面模式不加载 Qt，见 core/cli.py
+        from core.cli import main as cli_main
+        sys.exit(cli_main([arg for arg in sys.argv[1:] if arg != "--headless"]))
+
+    from PyQt6.QtCore import Qt, QCoreApplication
+    from PyQt6.QtWidgets import QApplication
+    from ui.main_window import MainWindow
+
     # 尝试禁用无障碍功能以规避某些 Windows 环境下的刷屏报错
     import os
     os.environ["WEBVIEW2_ADDITIONAL_BROWSER_ARGUMENTS"] = "--disable-features=Accessibility"
 
+    # QtWebEngine 在浏览器页首次打开时才加载，需要在创建 QApplication 之前声明共享 OpenGL 上下文
+    QCoreApplication.setAttribute(Qt.ApplicationAttribute.AA_ShareOpenGLContexts)
     app = QApplication(sys.argv)
 
     # 实例化并显示主窗口
@@ -0,0 +1,198 @@
+"""无界面的虚拟机启动基准测试
+
+反复调用 VMManager.start_vm / stop_vm，输出各启动阶段耗时的 p50/p95 (JSON)，
+用于比较加速器、-smp、内存、共享目录后端、ISO 版本等配置，或检查 core/vm_manager.py 与
+gen_iso.sh 的改动是否让启动变慢。Linux 下可使用 TCG 与小体积测试 ISO 运行:
+
+    python scripts/boot_bench.py --iso test.iso --accel tcg --runs 5 -o tcg.json
+    python scripts/boot_bench.py --compare tcg.json kvm.json
+
+比较启动方式 (固件与引导程序阶段的差异):
+
+    python scripts/boot_bench.py --iso test.iso --boot-mode cdrom -o cdrom.json
+    python scripts/boot_bench.py --iso test.iso --boot-mode kernel -o kernel.json
+    python scripts/boot_bench.py --compare cdrom.json kernel.json
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.boot_image import BOOT_MODES
+from core.boot_timeline import PHASE_LABELS, PHASE_ORDER
+from core.vm_manager import VMManager
+
+# 基准测试的结束条件 -> 对应的启动阶段
+TARGETS = {"docker": "tls_ping", "ready": "compose_up", "webui": "webui"}
+
+
+def percentile(values, pct):
+    """最近秩法百分位数"""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(pct / 100.0 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(runs):
+    samples = {}
+    for run in runs:
+        if not run["success"]:
+            continue
+        for phase, duration in run["durations"].items():
+            samples.setdefault(phase, []).append(duration)
+        samples.setdefault("total", []).append(run["total"])
+
+    stats = {}
+    for phase in PHASE_ORDER + ["total"]:
+        values = samples.get(phase)
+        if values:
+            stats[phase] = {
+                "n": len(values),
+                "p50": round(percentile(values, 50), 3),
+                "p95": round(percentile(values, 95), 3),
+                "mean": round(sum(values) / len(values), 3),
+            }
+    return stats
+
+
+def run_once(vm, args, log_file):
+    def on_log(msg, level):
+        if log_file:
+            log_file.write(f"[{level}] {msg}\n")
+        if args.verbose:
+            print(f"  [{level}] {msg}")
+
+    vm.log_received.connect(on_log)
+    target = TARGETS[args.until]
+    try:
+        if not vm.start_vm(iso_path=args.iso, custom_shared_dir=args.shared_dir, fast_resume=args.fast_resume,
+                           share_backend=args.share_backend):
+            return {"success": False, "error": "start_vm 失败", "marks": {}, "durations": {}, "total": 0.0}
+
+        # 保留本次启动的计时对象，VMManager 结束记录后会将其置空
+        timeline = vm.boot_timeline
+        deadline = time.time() + args.timeout
+        while time.time() < deadline and vm.is_running and target not in timeline.marks:
+            time.sleep(0.05)
+
+        success = target in timeline.marks
+        record = timeline.to_dict(success)
+        if not success:
+            record["error"] = "超时" if vm.is_running else "QEMU 已退出"
+        return record
+    finally:
+        vm.stop_vm()
+        if vm.vm_process:
+            vm.vm_process.wait()
+        vm.log_received.disconnect(on_log)
+
+
+def run_benchmark(args):
+    data_dir = args.data_dir or tempfile.mkdtemp(prefix="nekro-bench-")
+    vm = VMManager(base_path=args.base_path, data_dir=data_dir)
+    vm.accel = args.accel
+    vm.vm_cores = args.smp
+    vm.vm_mem = args.mem
+    vm.boot_mode = args.boot_mode
+
+    config = {
+        "iso": os.path.basename(args.iso),
+        "accel": args.accel or "auto",
+        "smp": args.smp or "auto",
+        "mem": args.mem or "auto",
+        "fast_resume": args.fast_resume,
+        "share_backend": args.share_backend,
+        "boot_mode": args.boot_mode,
+        "fresh_disk": args.fresh_disk,
+        "until": args.until,
+        "qemu": vm.qemu_path,
+    }
+    print(f"配置: {json.dumps(config, ensure_ascii=False)}")
+
+    runs = []
+    log_file = open(args.log, "w", encoding="utf-8") if args.log else None
+    try:
+        for i in range(args.runs):
+            if args.fresh_disk and os.path.exists(vm.docker_disk_path):
+                os.remove(vm.docker_disk_path)
+                vm.invalidate_snapshot()
+            record = run_once(vm, args, log_file)
+            runs.append(record)
+            status = "成功" if record["success"] else f"失败 ({record.get('error')})"
+            print(f"第 {i + 1}/{args.runs} 次: {status}, 总耗时 {record['total']:.2f}s")
+    finally:
+        if log_file:
+            log_file.close()
+
+    result = {"config": config, "runs": runs, "stats": summarize(runs)}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=4, ensure_ascii=False)
+    print_stats(result["stats"])
+    return 0 if any(r["success"] for r in runs) else 1
+
+
+def print_stats(stats):
+    print(f"{'阶段':<20}{'p50':>10}{'p95':>10}{'n':>6}")
+    for phase, s in stats.items():
+        label = PHASE_LABELS.get(phase, "总计")
+        print(f"{label:<20}{s['p50']:>10.2f}{s['p95']:>10.2f}{s['n']:>6}")
+
+
+def compare(paths):
+    results = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            results.append(json.load(f))
+
+    names = [os.path.splitext(os.path.basename(p))[0] for p in paths]
+    print(f"{'阶段 (p50/p95)':<20}" + "".join(f"{n:>22}" for n in names))
+    for phase in PHASE_ORDER + ["total"]:
+        cells = []
+        for r in results:
+            s = r["stats"].get(phase)
+            cells.append(f"{s['p50']:.2f}/{s['p95']:.2f}" if s else "-")
+        if any(c != "-" for c in cells):
+            print(f"{PHASE_LABELS.get(phase, '总计'):<20}" + "".join(f"{c:>22}" for c in cells))
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Nekro-Agent 虚拟机启动基准测试 (无界面)")
+    parser.add_argument("--iso", help="测试使用的 ISO 镜像")
+    parser.add_argument("--runs", type=int, default=5, help="启动次数")
+    parser.add_argument("--accel", help="加速器参数，如 tcg、kvm、whpx,kernel-irqchip=off (默认使用探测缓存中的最佳组合)")
+    parser.add_argument("--smp", type=int, help="vCPU 数量 (默认自动)")
+    parser.add_argument("--mem", type=int, help="内存大小 MB (默认自动)")
+    parser.add_argument("--fast-resume", action="store_true", help="启用快照快速恢复")
+    parser.add_argument("--share-backend", choices=["auto", "virtiofs", "9p", "vvfat"], default="auto",
+                        help="共享目录后端")
+    parser.add_argument("--boot-mode", choices=BOOT_MODES, default="cdrom",
+                        help="启动方式: cdrom 经 BIOS/isolinux 引导，kernel 直接加载内核，microvm 使用精简机型")
+    parser.add_argument("--fresh-disk", action="store_true", help="每次启动前删除 Docker 数据盘 (测量完全冷启动)")
+    parser.add_argument("--until", choices=sorted(TARGETS), default="docker", help="计为启动完成的阶段")
+    parser.add_argument("--timeout", type=float, default=600, help="单次启动超时 (秒)")
+    parser.add_argument("--base-path", help="程序目录 (包含 v-core)，默认为仓库根目录")
+    parser.add_argument("--data-dir", help="虚拟机数据目录 (数据盘、快照、启动历史)，默认使用临时目录")
+    parser.add_argument("--shared-dir", help="共享目录，默认使用程序目录下的 shared")
+    parser.add_argument("-o", "--output", help="结果 JSON 输出路径")
+    parser.add_argument("--log", help="保存虚拟机日志的文件")
+    parser.add_argument("-v", "--verbose", action="store_true", help="实时输出虚拟机日志")
+    parser.add_argument("--compare", nargs="+", metavar="RESULT", help="对比多个结果 JSON 的 p50/p95")
+    args = parser.parse_args()
+
+    if args.compare:
+        return compare(args.compare)
+    if not args.iso:
+        parser.error("需要指定 --iso")
+    args.iso = os.path.abspath(args.iso)
+    return run_benchmark(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
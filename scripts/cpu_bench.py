@@ -0,0 +1,221 @@
+"""CPU 型号与 TCG 参数基准测试
+
+依次使用各个 CPU 配置 (core/cpu_profiles.py) 启动虚拟机，在虚拟机内运行同一个计算密集型负载，
+并把得分最高的配置保存到加速器缓存 (vm-data/accel_cache.json)，之后 cpu_profile 为 auto 时
+自动使用。软件模拟 (TCG) 下还会比较不同的翻译块缓存大小。测试启动默认使用临时数据目录，
+不会改动日常使用的数据盘与启动历史，只有最优配置写回 vm-data。
+
+负载:
+  qdrant  在 nekro_qdrant 中写入随机向量并执行精确 (暴力) 向量搜索，得分为每秒查询数
+  hash    在容器中按 CPU 数并行计算 sha256，得分为 MB/s
+
+    python scripts/cpu_bench.py --iso v-core/alpine-docker-lite.iso --profiles max x86-64-v3 qemu64
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.accel import AcceleratorProber
+from core.cpu_profiles import CPU_PROFILES, TCG_TB_SIZES, resolve_cpu
+from core.vm_manager import VMManager
+
+QDRANT_CONTAINER = "nekro_qdrant"
+AGENT_IMAGE = "kromiose/nekro-agent:latest"
+
+# 在 nekro-agent 镜像中执行 (仅使用标准库)，通过 compose 网络访问 qdrant
+QDRANT_WORKLOAD = r"""
+import json, os, random, time, urllib.request
+URL = os.environ["QDRANT_URL"]
+DIM, N, Q = int(os.environ["DIM"]), int(os.environ["VECTORS"]), int(os.environ["QUERIES"])
+NAME = "nekro_cpu_bench"
+
+def call(method, path, body=None):
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(URL + path, data=data, method=method, headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(req, timeout=600) as r:
+        return json.load(r)
+
+try:
+    call("DELETE", f"/collections/{NAME}")
+except Exception:
+    pass
+call("PUT", f"/collections/{NAME}", {"vectors": {"size": DIM, "distance": "Cosine"}})
+rnd = random.Random(42)
+for start in range(0, N, 500):
+    points = [{"id": i, "vector": [rnd.random() for _ in range(DIM)]} for i in range(start, min(N, start + 500))]
+    call("PUT", f"/collections/{NAME}/points?wait=true", {"points": points})
+queries = [[rnd.random() for _ in range(DIM)] for _ in range(Q)]
+t0 = time.time()
+for i in range(0, Q, 20):
+    call("POST", f"/collections/{NAME}/points/search/batch",
+         {"searches": [{"vector": v, "limit": 10, "params": {"exact": True}} for v in queries[i:i + 20]]})
+t1 = time.time()
+call("DELETE", f"/collections/{NAME}")
+print("RESULT", Q / (t1 - t0))
+"""
+
+HASH_WORKLOAD = r"""
+jobs=$(grep -c ^processor /proc/cpuinfo)
+t0=$(date +%s%N)
+i=0
+while [ $i -lt $jobs ]; do
+    head -c {mb}M /dev/zero | sha256sum > /dev/null &
+    i=$((i+1))
+done
+wait
+t1=$(date +%s%N)
+echo "RESULT $(( jobs * {mb} * 1000000000 / (t1 - t0) ))"
+"""
+
+
+def wait_for_qdrant(vm, deadline):
+    while time.time() < deadline and vm.is_running:
+        try:
+            container = vm.docker_client.containers.get(QDRANT_CONTAINER)
+            if container.status == "running":
+                return container
+        except Exception:
+            pass
+        time.sleep(2)
+    return None
+
+
+def run_workload(vm, args, deadline):
+    client = vm.docker_client
+    if args.workload == "hash":
+        script = HASH_WORKLOAD.replace("{mb}", str(args.mb))
+        output = client.containers.run(args.hash_image, entrypoint=["sh", "-c", script], remove=True)
+    else:
+        qdrant = wait_for_qdrant(vm, deadline)
+        if qdrant is None:
+            raise RuntimeError("等待 nekro_qdrant 超时")
+        network = next(iter(qdrant.attrs["NetworkSettings"]["Networks"]))
+        output = client.containers.run(
+            AGENT_IMAGE, entrypoint=["sh", "-c", 'exec python3 -c "$BENCH"'], remove=True, network=network,
+            environment={"BENCH": QDRANT_WORKLOAD, "QDRANT_URL": f"http://{QDRANT_CONTAINER}:6333",
+                         "DIM": str(args.dim), "VECTORS": str(args.vectors), "QUERIES": str(args.queries)}
+        )
+    for line in output.decode().splitlines()[::-1]:
+        if line.startswith("RESULT "):
+            return float(line.split()[1])
+    raise RuntimeError(f"负载输出无法解析: {output[-200:]!r}")
+
+
+def run_config(vm, args, profile, tb_size):
+    result = {"profile": profile, "tcg_tb_size": tb_size}
+    vm.cpu_profile = profile
+    vm.tcg_tb_size = tb_size
+    try:
+        if not vm.start_vm(iso_path=args.iso, custom_shared_dir=args.shared_dir):
+            result["error"] = "start_vm 失败"
+            return result
+        deadline = time.time() + args.timeout
+        while time.time() < deadline and vm.is_running and vm.docker_client is None:
+            time.sleep(0.5)
+        if vm.docker_client is None:
+            result["error"] = "等待 Docker 超时" if vm.is_running else "QEMU 已退出"
+            return result
+        scores = [run_workload(vm, args, deadline) for _ in range(args.repeat)]
+        result["score"] = round(max(scores), 2)
+        result["scores"] = [round(s, 2) for s in scores]
+        return result
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+        return result
+    finally:
+        vm.stop_vm()
+        if vm.vm_process:
+            vm.vm_process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CPU 型号与 TCG 参数基准测试")
+    parser.add_argument("--iso", required=True, help="虚拟机 ISO 镜像")
+    parser.add_argument("--profiles", nargs="+", choices=[p for p in CPU_PROFILES if p != "auto"],
+                        default=[p for p in CPU_PROFILES if p != "auto"], help="要比较的 CPU 配置")
+    parser.add_argument("--tb-sizes", type=int, nargs="+", default=list(TCG_TB_SIZES),
+                        help="TCG 下比较的翻译块缓存大小 (MB，0 为默认值)")
+    parser.add_argument("--workload", choices=["qdrant", "hash"], default="qdrant", help="测试负载")
+    parser.add_argument("--dim", type=int, default=256, help="qdrant 向量维度")
+    parser.add_argument("--vectors", type=int, default=10000, help="qdrant 写入的向量数量")
+    parser.add_argument("--queries", type=int, default=500, help="qdrant 搜索次数")
+    parser.add_argument("--mb", type=int, default=256, help="hash 负载每个任务的数据量 (MB)")
+    parser.add_argument("--hash-image", default="postgres:14", help="hash 负载使用的镜像")
+    parser.add_argument("--repeat", type=int, default=3, help="每种配置的重复次数 (取最好成绩)")
+    parser.add_argument("--accel", help="加速器参数 (默认使用探测结果)")
+    parser.add_argument("--timeout", type=float, default=900, help="单次启动与负载的超时 (秒)")
+    parser.add_argument("--base-path", help="程序目录 (包含 v-core)")
+    parser.add_argument("--data-dir", help="测试启动使用的虚拟机数据目录 (默认为临时目录)")
+    parser.add_argument("--save-dir", help="保存最优配置的数据目录 (默认为程序目录下的 vm-data)")
+    parser.add_argument("--shared-dir", help="共享目录")
+    parser.add_argument("--no-save", action="store_true", help="不保存最优配置")
+    parser.add_argument("-o", "--output", help="结果 JSON 输出路径")
+    parser.add_argument("-v", "--verbose", action="store_true", help="实时输出虚拟机日志")
+    args = parser.parse_args()
+    args.iso = os.path.abspath(args.iso)
+
+    data_dir = args.data_dir or tempfile.mkdtemp(prefix="nekro-cpu-bench-")
+    vm = VMManager(base_path=args.base_path, data_dir=data_dir)
+    save_dir = os.path.abspath(args.save_dir) if args.save_dir else os.path.join(vm.base_path, "vm-data")
+    save_cache = os.path.join(save_dir, "accel_cache.json")
+    if not args.data_dir and os.path.exists(save_cache):
+        # 沿用已有的加速器探测结果，避免临时目录重新探测
+        shutil.copyfile(save_cache, vm.accel_prober.cache_path)
+    vm.accel = args.accel
+    vm.balloon_enabled = False
+    if args.verbose:
+        vm.log_received.connect(lambda m, l: print(f"  [{l}] {m}"))
+
+    accel_name = args.accel.split(",")[0] if args.accel else vm.accel_prober.select()["name"]
+    tb_sizes = args.tb_sizes if accel_name == "tcg" else [0]
+    configs = []
+    for profile in args.profiles:
+        _, note = resolve_cpu(profile, accel_name, None)
+        if note:
+            print(f"跳过 {profile}: {note}")
+            continue
+        configs.extend((profile, tb) for tb in tb_sizes)
+    print(f"加速器: {accel_name}，负载: {args.workload}，共 {len(configs)} 种配置")
+
+    results = []
+    for profile, tb_size in configs:
+        label = profile + (f" tb-size={tb_size or '默认'}" if accel_name == "tcg" else "")
+        print(f"测试 {label}")
+        result = run_config(vm, args, profile, tb_size)
+        results.append(result)
+        print(f"  {json.dumps(result, ensure_ascii=False)}")
+
+    ok = [r for r in results if "error" not in r]
+    winner = max(ok, key=lambda r: r["score"]) if ok else None
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"accel": accel_name, "workload": args.workload, "results": results, "winner": winner},
+                      f, indent=4, ensure_ascii=False)
+
+    unit = "QPS" if args.workload == "qdrant" else "MB/s"
+    print(f"{'CPU 配置':<14}{'tb-size':>10}{unit:>12}")
+    for r in results:
+        tb = r["tcg_tb_size"] or "-"
+        print(f"{r['profile']:<14}{tb:>10}" + (f"{r['score']:>12}" if "score" in r else f"  失败: {r['error']}"))
+    if winner is None:
+        return 1
+
+    print(f"最优配置: {winner['profile']} (tb-size={winner['tcg_tb_size'] or '默认'})")
+    if not args.no_save:
+        prober = AcceleratorProber(vm.qemu_path, vm.qemu_dir, save_cache, is_windows=vm.is_windows)
+        prober.save_cpu_profile({
+            "name": winner["profile"], "accel": accel_name, "tcg_tb_size": winner["tcg_tb_size"],
+            "score": winner["score"], "workload": args.workload, "measured_at": time.time(),
+        })
+        print(f"已保存到 {prober.cache_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
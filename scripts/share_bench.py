@@ -0,0 +1,127 @@
+"""共享目录后端 I/O 基准测试
+
+依次使用各个共享目录后端 (virtiofs / 9p / vvfat) 启动虚拟机，待 Docker 就绪后在容器中
+对 /mnt/host_share 执行顺序写、顺序读、小文件创建、列目录与删除，并输出对比结果:
+
+    python scripts/share_bench.py --iso v-core/alpine-docker-lite.iso --backends 9p vvfat -o share.json
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.vm_manager import VMManager
+
+# 在容器内执行，输出各步骤结束时的纳秒时间戳
+WORKLOAD = r"""
+set -e
+D=/share/.nekro-io-bench
+rm -rf "$D"; mkdir -p "$D"; cd "$D"
+now() { date +%s%N; }
+t0=$(now)
+dd if=/dev/zero of=seq.bin bs=1M count={mb} conv=fsync 2>/dev/null
+t1=$(now)
+# 丢弃虚拟机页缓存，顺序读才会经过共享目录后端 (需要特权容器)
+sync; echo 3 > /proc/sys/vm/drop_caches
+t1r=$(now)
+dd if=seq.bin of=/dev/null bs=1M 2>/dev/null
+t2=$(now)
+i=0; while [ $i -lt {files} ]; do echo data > f$i; i=$((i+1)); done; sync
+t3=$(now)
+ls -l > /dev/null
+t4=$(now)
+cd /; rm -rf "$D"
+t5=$(now)
+echo "$t0 $t1 $t1r $t2 $t3 $t4 $t5"
+"""
+
+
+def run_backend(args, backend):
+    vm = VMManager(base_path=args.base_path, data_dir=tempfile.mkdtemp(prefix="nekro-share-bench-"))
+    vm.accel = args.accel
+    if args.verbose:
+        vm.log_received.connect(lambda m, l: print(f"  [{l}] {m}"))
+
+    result = {"requested": backend}
+    try:
+        if not vm.start_vm(iso_path=args.iso, custom_shared_dir=args.shared_dir, share_backend=backend):
+            result["error"] = "start_vm 失败"
+            return result
+        result["backend"] = vm.share_backend
+
+        deadline = time.time() + args.timeout
+        while time.time() < deadline and vm.is_running and vm.docker_client is None:
+            time.sleep(0.1)
+        if vm.docker_client is None:
+            result["error"] = "等待 Docker 超时"
+            return result
+
+        script = WORKLOAD.replace("{mb}", str(args.mb)).replace("{files}", str(args.files))
+        output = vm.docker_client.containers.run(
+            args.image, entrypoint=["sh", "-c", script], remove=True, privileged=True,
+            volumes={"/mnt/host_share": {"bind": "/share", "mode": "rw"}}
+        )
+        t = [int(x) / 1e9 for x in output.decode().split()[-7:]]
+        result.update({
+            "seq_write_mbps": round(args.mb / (t[1] - t[0]), 2),
+            "seq_read_mbps": round(args.mb / (t[3] - t[2]), 2),
+            "small_file_create_ops": round(args.files / (t[4] - t[3]), 1),
+            "list_dir_s": round(t[5] - t[4], 3),
+            "delete_s": round(t[6] - t[5], 3),
+        })
+        return result
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+        return result
+    finally:
+        vm.stop_vm()
+        if vm.vm_process:
+            vm.vm_process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="共享目录后端 I/O 基准测试")
+    parser.add_argument("--iso", required=True, help="虚拟机 ISO 镜像")
+    parser.add_argument("--backends", nargs="+", default=["virtiofs", "9p", "vvfat"],
+                        choices=["virtiofs", "9p", "vvfat"], help="要测试的后端")
+    parser.add_argument("--mb", type=int, default=256, help="顺序读写的数据量 (MB)")
+    parser.add_argument("--files", type=int, default=1000, help="小文件数量")
+    parser.add_argument("--image", default="postgres:14", help="执行测试的容器镜像 (需包含 sh 与 dd)")
+    parser.add_argument("--accel", help="加速器参数 (默认自动检测)")
+    parser.add_argument("--timeout", type=float, default=600, help="等待 Docker 就绪的超时 (秒)")
+    parser.add_argument("--base-path", help="程序目录 (包含 v-core)")
+    parser.add_argument("--shared-dir", help="共享目录")
+    parser.add_argument("-o", "--output", help="结果 JSON 输出路径")
+    parser.add_argument("-v", "--verbose", action="store_true", help="实时输出虚拟机日志")
+    args = parser.parse_args()
+    args.iso = os.path.abspath(args.iso)
+
+    results = []
+    for backend in args.backends:
+        print(f"测试后端: {backend}")
+        result = run_backend(args, backend)
+        results.append(result)
+        if result.get("backend") and result["backend"] != backend:
+            print(f"  注意: {backend} 不可用，实际使用 {result['backend']}")
+        print(f"  {json.dumps(result, ensure_ascii=False)}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"mb": args.mb, "files": args.files, "results": results}, f, indent=4, ensure_ascii=False)
+
+    print(f"{'后端':<10}{'顺序写MB/s':>12}{'顺序读MB/s':>12}{'小文件ops':>12}{'列目录s':>10}{'删除s':>10}")
+    for r in results:
+        if "error" in r:
+            print(f"{r['requested']:<10}  失败: {r['error']}")
+            continue
+        print(f"{r['backend']:<10}{r['seq_write_mbps']:>12}{r['seq_read_mbps']:>12}"
+              f"{r['small_file_create_ops']:>12}{r['list_dir_s']:>10}{r['delete_s']:>10}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
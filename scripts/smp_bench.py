@@ -0,0 +1,144 @@
+"""虚拟机多核扩展性基准测试
+
+依次以 1/2/4/8 个 vCPU 启动虚拟机，待 Docker 就绪后在容器中并行运行固定总量的计算任务
+(每个任务对一段数据计算 sha256)，记录虚拟机识别到的 CPU 数量与吞吐量，并检查吞吐量是否
+随 vCPU 数量增加:
+
+    python scripts/smp_bench.py --iso v-core/alpine-docker-lite.iso --accel tcg --cpus 1 2 4 -o smp.json
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.vm_manager import VMManager
+
+# 在容器内执行: 同时启动 {jobs} 个任务，共处理 {jobs} * {mb} MB 数据，输出 CPU 数与起止纳秒时间戳
+WORKLOAD = r"""
+nproc_guest=$(grep -c ^processor /proc/cpuinfo)
+t0=$(date +%s%N)
+i=0
+while [ $i -lt {jobs} ]; do
+    head -c {mb}M /dev/zero | sha256sum > /dev/null &
+    i=$((i+1))
+done
+wait
+t1=$(date +%s%N)
+echo "$nproc_guest $t0 $t1"
+"""
+
+
+def run_cpus(args, cpus):
+    vm = VMManager(base_path=args.base_path, data_dir=tempfile.mkdtemp(prefix="nekro-smp-bench-"))
+    vm.accel = args.accel
+    vm.vm_cores = cpus
+    vm.vm_mem = args.mem
+    vm.balloon_enabled = False
+    if args.verbose:
+        vm.log_received.connect(lambda m, l: print(f"  [{l}] {m}"))
+
+    result = {"vcpus": cpus}
+    try:
+        if not vm.start_vm(iso_path=args.iso, custom_shared_dir=args.shared_dir):
+            result["error"] = "start_vm 失败"
+            return result
+
+        deadline = time.time() + args.timeout
+        while time.time() < deadline and vm.is_running and vm.docker_client is None:
+            time.sleep(0.1)
+        if vm.docker_client is None:
+            result["error"] = "等待 Docker 超时"
+            return result
+
+        script = WORKLOAD.replace("{jobs}", str(args.jobs)).replace("{mb}", str(args.mb))
+        samples = []
+        for _ in range(args.repeat):
+            output = vm.docker_client.containers.run(args.image, entrypoint=["sh", "-c", script], remove=True)
+            guest_cpus, t0, t1 = output.decode().split()[-3:]
+            samples.append((int(t1) - int(t0)) / 1e9)
+        best = min(samples)
+        result.update({
+            "guest_cpus": int(guest_cpus),
+            "seconds": round(best, 3),
+            "throughput_mbps": round(args.jobs * args.mb / best, 2),
+        })
+        return result
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+        return result
+    finally:
+        vm.stop_vm()
+        if vm.vm_process:
+            vm.vm_process.wait()
+
+
+def check_scaling(results, min_gain):
+    """每增加 vCPU，吞吐量至少提高 min_gain (比例)，且虚拟机识别到全部 CPU"""
+    problems = []
+    ok = [r for r in results if "error" not in r]
+    for r in ok:
+        if r["guest_cpus"] < r["vcpus"]:
+            problems.append(f"{r['vcpus']} vCPU: 虚拟机只识别到 {r['guest_cpus']} 个 CPU")
+    for prev, cur in zip(ok, ok[1:]):
+        gain = cur["throughput_mbps"] / prev["throughput_mbps"] - 1
+        if gain < min_gain:
+            problems.append(f"{prev['vcpus']} -> {cur['vcpus']} vCPU: 吞吐量仅提高 {gain:.0%}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="虚拟机多核扩展性基准测试")
+    parser.add_argument("--iso", required=True, help="虚拟机 ISO 镜像")
+    parser.add_argument("--cpus", type=int, nargs="+", default=[1, 2, 4, 8], help="要测试的 vCPU 数量")
+    parser.add_argument("--jobs", type=int, help="并行任务数 (默认等于最大 vCPU 数)")
+    parser.add_argument("--mb", type=int, default=256, help="每个任务处理的数据量 (MB)")
+    parser.add_argument("--repeat", type=int, default=3, help="每种配置重复次数 (取最快一次)")
+    parser.add_argument("--mem", type=int, default=4096, help="虚拟机内存 (MB)")
+    parser.add_argument("--image", default="postgres:14", help="执行测试的容器镜像 (需包含 sh 与 sha256sum)")
+    parser.add_argument("--accel", help="加速器参数 (默认自动检测，tcg 会自动启用多线程)")
+    parser.add_argument("--min-gain", type=float, default=0.2, help="每级 vCPU 至少应提高的吞吐量比例")
+    parser.add_argument("--timeout", type=float, default=600, help="等待 Docker 就绪的超时 (秒)")
+    parser.add_argument("--base-path", help="程序目录 (包含 v-core)")
+    parser.add_argument("--shared-dir", help="共享目录")
+    parser.add_argument("-o", "--output", help="结果 JSON 输出路径")
+    parser.add_argument("-v", "--verbose", action="store_true", help="实时输出虚拟机日志")
+    args = parser.parse_args()
+    args.iso = os.path.abspath(args.iso)
+    args.cpus = sorted(set(args.cpus))
+    args.jobs = args.jobs or max(args.cpus)
+
+    results = []
+    for cpus in args.cpus:
+        print(f"测试 {cpus} vCPU")
+        result = run_cpus(args, cpus)
+        results.append(result)
+        print(f"  {json.dumps(result, ensure_ascii=False)}")
+
+    problems = check_scaling(results, args.min_gain)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"jobs": args.jobs, "mb": args.mb, "results": results, "problems": problems},
+                      f, indent=4, ensure_ascii=False)
+
+    base = next((r for r in results if "error" not in r), None)
+    print(f"{'vCPU':>6}{'识别CPU':>10}{'耗时s':>10}{'MB/s':>12}{'加速比':>10}")
+    for r in results:
+        if "error" in r:
+            print(f"{r['vcpus']:>6}  失败: {r['error']}")
+            continue
+        speedup = r["throughput_mbps"] / base["throughput_mbps"]
+        print(f"{r['vcpus']:>6}{r['guest_cpus']:>10}{r['seconds']:>10}{r['throughput_mbps']:>12}{speedup:>10.2f}")
+
+    for problem in problems:
+        print(f"警告: {problem}")
+    if base is None:
+        return 1
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
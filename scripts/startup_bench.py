@@ -0,0 +1,160 @@
+"""管理程序启动速度基准测试
+
+在独立的子进程中测量:
+  - 各核心模块的导入耗时，并检查导入后没有提前加载重量级依赖 (docker、psutil、QtWebEngine 等)
+  - 从进程启动到主窗口完成首帧绘制的时间 (不启动虚拟机)
+
+每项重复多次取中位数。可与之前保存的结果比较，超出容差时返回非零退出码，用于防止启动变慢:
+
+    python scripts/startup_bench.py --offscreen -o startup.json
+    python scripts/startup_bench.py --offscreen --baseline startup.json --tolerance 0.2
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 模块 -> 导入后不应已加载的模块
+IMPORT_CHECKS = {
+    "core.vm_manager": ("docker", "psutil", "PyQt6"),
+    "core.cli": ("docker", "psutil", "PyQt6", "core.vm_manager"),
+    "ui.main_window": ("docker", "psutil", "PyQt6.QtWebEngineWidgets"),
+}
+
+IMPORT_PROBE = r"""
+import json, sys, time
+t0 = time.perf_counter()
+import {module}
+ms = (time.perf_counter() - t0) * 1000
+print(json.dumps({{"ms": ms, "loaded": [m for m in {forbidden!r} if m in sys.modules]}}))
+"""
+
+# 首帧绘制完成后 (排在显示与绘制事件之后的第一个定时器) 记录时间并退出
+WINDOW_PROBE = r"""
+import time
+t0 = time.perf_counter()
+import json, sys
+from PyQt6.QtCore import Qt, QCoreApplication, QTimer
+from PyQt6.QtWidgets import QApplication
+QCoreApplication.setAttribute(Qt.ApplicationAttribute.AA_ShareOpenGLContexts)
+app = QApplication(sys.argv)
+from ui.main_window import MainWindow
+MainWindow.start_deploy = lambda self: None  # 只测量界面，不启动虚拟机
+t_import = time.perf_counter()
+window = MainWindow()
+window.show()
+
+def done():
+    t_paint = time.perf_counter()
+    print(json.dumps({"import_ms": (t_import - t0) * 1000, "window_ms": (t_paint - t0) * 1000,
+                      "webengine_loaded": "PyQt6.QtWebEngineWidgets" in sys.modules}))
+    window.metrics.stop()
+    window.container_logs.stop()
+    window.log_archive.close()
+    app.quit()
+
+QTimer.singleShot(0, done)
+app.exec()
+"""
+
+
+def run_probe(code, env):
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True,
+                            timeout=120)
+    lines = result.stdout.strip().splitlines()
+    if result.returncode != 0 or not lines:
+        raise RuntimeError((result.stderr or result.stdout).strip()[-500:])
+    return json.loads(lines[-1])
+
+
+def measure(args, env):
+    report = {"imports": {}, "window": None, "problems": []}
+    for module, forbidden in IMPORT_CHECKS.items():
+        samples, loaded = [], set()
+        try:
+            for _ in range(args.runs):
+                probe = run_probe(IMPORT_PROBE.format(module=module, forbidden=forbidden), env)
+                samples.append(probe["ms"])
+                loaded.update(probe["loaded"])
+        except RuntimeError as e:
+            report["imports"][module] = {"error": str(e)}
+            continue
+        report["imports"][module] = {"ms": round(statistics.median(samples), 1)}
+        for name in sorted(loaded):
+            report["problems"].append(f"导入 {module} 时提前加载了 {name}")
+
+    if not args.skip_window:
+        try:
+            samples = [run_probe(WINDOW_PROBE, env) for _ in range(args.runs)]
+            report["window"] = {
+                "import_ms": round(statistics.median(s["import_ms"] for s in samples), 1),
+                "window_ms": round(statistics.median(s["window_ms"] for s in samples), 1),
+            }
+            if any(s["webengine_loaded"] for s in samples):
+                report["problems"].append("首帧之前加载了 QtWebEngine")
+        except RuntimeError as e:
+            report["window"] = {"error": str(e)}
+    return report
+
+
+def compare(report, baseline, tolerance):
+    problems = []
+    pairs = [(f"import {m}", report["imports"].get(m, {}).get("ms"), r.get("ms"))
+             for m, r in baseline.get("imports", {}).items()]
+    if report.get("window") and baseline.get("window"):
+        pairs.append(("首帧", report["window"].get("window_ms"), baseline["window"].get("window_ms")))
+    for name, current, base in pairs:
+        if current is None or not base:
+            continue
+        if current > base * (1 + tolerance):
+            problems.append(f"{name}: {current:.0f}ms，基准 {base:.0f}ms (+{current / base - 1:.0%})")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="管理程序启动速度基准测试")
+    parser.add_argument("--runs", type=int, default=5, help="每项重复次数 (取中位数)")
+    parser.add_argument("--offscreen", action="store_true", help="使用 Qt offscreen 平台 (无显示器的环境)")
+    parser.add_argument("--skip-window", action="store_true", help="只测量模块导入")
+    parser.add_argument("--max-window-ms", type=float, help="首帧时间上限 (毫秒)")
+    parser.add_argument("--baseline", help="与之前保存的结果比较")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="相对基准允许变慢的比例")
+    parser.add_argument("-o", "--output", help="结果 JSON 输出路径")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    if args.offscreen:
+        env["QT_QPA_PLATFORM"] = "offscreen"
+
+    report = measure(args, env)
+    window = report["window"] or {}
+    if args.max_window_ms and window.get("window_ms", 0) > args.max_window_ms:
+        report["problems"].append(f"首帧 {window['window_ms']:.0f}ms 超过上限 {args.max_window_ms:.0f}ms")
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            report["problems"].extend(compare(report, json.load(f), args.tolerance))
+
+    for module, r in report["imports"].items():
+        print(f"import {module:<20}" + (f"{r['ms']:>10.1f} ms" if "ms" in r else f"  失败: {r['error']}"))
+    if window:
+        if "error" in window:
+            print(f"主窗口首帧  失败: {window['error']}")
+        else:
+            print(f"主窗口首帧 (导入 {window['import_ms']:.1f} ms){window['window_ms']:>14.1f} ms")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4, ensure_ascii=False)
+
+    for problem in report["problems"]:
+        print(f"警告: {problem}")
+    failed = any("error" in r for r in report["imports"].values()) or "error" in window
+    return 1 if report["problems"] or failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,37 @@
+from core.balloon import plan_target
+
+CEILING = 8192
+FLOOR = 2048
+HOST_TOTAL = 32768
+
+
+def deflate_on_oom_stats(actual_mb, used_mb, ceiling_mb=CEILING):
+    """deflate-on-oom 下的统计: MemTotal 固定为上限，气球占用的页从 available 中扣除"""
+    balloon_mb = ceiling_mb - actual_mb
+    return ceiling_mb, ceiling_mb - used_mb - balloon_mb
+
+
+def test_shrinks_past_balloon_size_when_idle():
+    actual = CEILING
+    for _ in range(10):
+        total, available = deflate_on_oom_stats(actual, used_mb=2000)
+        target, _ = plan_target(actual, total, available, HOST_TOTAL, HOST_TOTAL * 0.8, FLOOR, CEILING)
+        if target is None:
+            break
+        assert target < actual
+        actual = target
+    # 实际使用 2000MB，需求约 3000MB；不应停在 6144MB
+    assert actual <= 2000 + 1024 + 2048
+
+
+def test_relaxed_host_does_not_reinflate_shrunk_guest():
+    total, available = deflate_on_oom_stats(4096, used_mb=2000)
+    target, reason = plan_target(4096, total, available, HOST_TOTAL, HOST_TOTAL * 0.8, FLOOR, CEILING)
+    assert target is None or target <= 4096, reason
+
+
+def test_guest_pressure_counts_only_usable_memory():
+    total, available = deflate_on_oom_stats(4096, used_mb=3800)
+    target, reason = plan_target(4096, total, available, HOST_TOTAL, HOST_TOTAL * 0.8, FLOOR, CEILING)
+    assert target is not None and target > 4096
+    assert reason == "虚拟机内存不足"
@@ -0,0 +1,41 @@
+import collections
+import threading
+
+from core.daemon import Daemon
+
+
+class _Archive:
+    def write(self, msg, level, source):
+        pass
+
+
+def _daemon():
+    # 不创建 VMManager，只测试状态处理
+    daemon = Daemon.__new__(Daemon)
+    daemon.stopping = threading.Event()
+    daemon.log_archive = _Archive()
+    daemon._recent = collections.deque(maxlen=10)
+    daemon._seq = 0
+    daemon._log_cond = threading.Condition()
+    daemon.vm_status = "未启动"
+    return daemon
+
+
+def test_boot_timeout_stops_daemon_with_failure():
+    daemon = _daemon()
+    daemon._on_status("启动超时")
+    assert daemon.stopping.is_set()
+    assert daemon.exit_code() == 1
+
+
+def test_normal_stop_exits_cleanly():
+    daemon = _daemon()
+    daemon._on_status("已停止")
+    assert daemon.stopping.is_set()
+    assert daemon.exit_code() == 0
+
+
+def test_booting_status_keeps_running():
+    daemon = _daemon()
+    daemon._on_status("启动中...")
+    assert not daemon.stopping.is_set()
@@ -0,0 +1,241 @@
+import threading
+import time
+
+from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QListView, QLineEdit,
+                             QPushButton, QCheckBox, QLabel, QComboBox, QAbstractItemView)
+from PyQt6.QtCore import Qt, QAbstractListModel, QModelIndex, QTimer
+from PyQt6.QtGui import QColor
+
+from core.log_buffer import LogRingBuffer, LogBatcher
+
+LEVEL_COLORS = {"error": "#f85149", "warn": "#d29922", "vm": "#8b949e", "debug": "#8b949e"}
+DEFAULT_COLOR = "#7ee787"
+SEARCH_CHUNK = 50000  # 每次定时器回调检查的行数，避免大量日志中查找时界面卡住
+
+
+class LogModel(QAbstractListModel):
+    """基于环形缓冲区的日志模型，只为可见行提供数据"""
+
+    def __init__(self, capacity, parent=None):
+        super().__init__(parent)
+        self.buffer = LogRingBuffer(capacity)
+        self.removed = 0  # 累计从头部移除的行数，用于把行号换算为不随移除变化的位置
+        self._colors = {level: QColor(c) for level, c in LEVEL_COLORS.items()}
+        self._default_color = QColor(DEFAULT_COLOR)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.buffer)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        msg, level = self.buffer[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return f"[{level.upper()}] {msg}"
+        if role == Qt.ItemDataRole.ForegroundRole:
+            return self._colors.get(level, self._default_color)
+        return None
+
+    def append_batch(self, lines):
+        """批量追加，超出容量时先移除最旧的行"""
+        if not lines:
+            return
+        lines = lines[-self.buffer.capacity:]
+        overflow = max(0, len(self.buffer) + len(lines) - self.buffer.capacity)
+        if overflow:
+            self.beginRemoveRows(QModelIndex(), 0, overflow - 1)
+            self.buffer.drop_oldest(overflow)
+            self.removed += overflow
+            self.endRemoveRows()
+        first = len(self.buffer)
+        self.beginInsertRows(QModelIndex(), first, first + len(lines) - 1)
+        self.buffer.extend(lines)
+        self.endInsertRows()
+
+    def clear(self):
+        self.beginResetModel()
+        self.buffer.clear()
+        self.removed = 0
+        self.endResetModel()
+
+
+class LogView(QWidget):
+    """虚拟化日志查看器
+
+    任意线程调用 push() 写入，界面线程以固定帧率批量刷新；
+    QListView 使用统一行高，只布局可见行，百万行级别也能保持流畅。
+    """
+
+    def __init__(self, capacity=1_000_000, fps=30, parent=None):
+        super().__init__(parent)
+        self.batcher = LogBatcher()
+        self.model = LogModel(capacity, self)
+        self.dropped = 0
+
+        layout = QVBoxLayout(self); layout.setContentsMargins(0, 0, 0, 0); layout.setSpacing(8)
+
+        bar = QHBoxLayout()
+        self.search_edit = QLineEdit(); self.search_edit.setPlaceholderText("搜索日志 (回车查找下一个)")
+        self.search_edit.returnPressed.connect(lambda: self.find(backwards=False))
+        btn_prev = QPushButton("上一个"); btn_prev.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        btn_prev.clicked.connect(lambda: self.find(backwards=True))
+        btn_next = QPushButton("下一个"); btn_next.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        btn_next.clicked.connect(lambda: self.find(backwards=False))
+        self.check_follow = QCheckBox("跟随最新"); self.check_follow.setChecked(True)
+        self.check_follow.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        self.lbl_count = QLabel("0 行"); self.lbl_count.setStyleSheet("color: #57606a;")
+        bar.addWidget(self.search_edit); bar.addWidget(btn_prev); bar.addWidget(btn_next)
+        bar.addWidget(self.check_follow); bar.addStretch(); bar.addWidget(self.lbl_count)
+        layout.addLayout(bar)
+
+        self.list_view = QListView(); self.list_view.setObjectName("LogViewer")
+        self.list_view.setModel(self.model)
+        self.list_view.setUniformItemSizes(True)
+        self.list_view.setLayoutMode(QListView.LayoutMode.Batched)
+        self.list_view.setBatchSize(500)
+        self.list_view.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        self.list_view.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.list_view.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAsNeeded)
+        # 离开底部时 (拖动、滚轮或键盘) 暂停跟随，回到底部时恢复；追加行只改变范围，不触发 valueChanged
+        self.list_view.verticalScrollBar().valueChanged.connect(self._on_scroll)
+        layout.addWidget(self.list_view)
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(max(1, 1000 // fps))
+        self.timer.timeout.connect(self.flush)
+        self.timer.start()
+
+        # 查找分块进行，每块之间回到事件循环
+        self._search = None
+        self.search_timer = QTimer(self)
+        self.search_timer.setInterval(0)
+        self.search_timer.timeout.connect(self._search_step)
+
+    def push(self, msg, level="info"):
+        """线程安全，可直接连接到工作线程发出的信号"""
+        self.batcher.push(msg, level)
+
+    def flush(self):
+        lines, dropped = self.batcher.drain()
+        self.dropped += dropped
+        if dropped:
+            lines.insert(0, (f"日志产生过快，已丢弃 {dropped} 行", "warn"))
+        if not lines:
+            return
+        self.model.append_batch(lines)
+        self.lbl_count.setText(f"{len(self.model.buffer)} 行")
+        if self.check_follow.isChecked():
+            self.list_view.scrollToBottom()
+
+    def clear(self):
+        self._stop_search()
+        self.batcher.drain()
+        self.model.clear()
+        self.lbl_count.setText("0 行")
+
+    def _on_scroll(self, value):
+        bar = self.list_view.verticalScrollBar()
+        at_bottom = value >= bar.maximum()
+        if self.check_follow.isChecked() != at_bottom:
+            self.check_follow.setChecked(at_bottom)
+
+    def find(self, backwards=False):
+        text = self.search_edit.text().strip().lower()
+        if not text or not len(self.model.buffer):
+            return
+        current = self.list_view.currentIndex()
+        start = current.row() if current.isValid() else (len(self.model.buffer) if backwards else -1)
+        # 位置按累计移除行数换算，查找期间旧行被移除也不会错位
+        self._search = {"text": text, "backwards": backwards, "pos": start + self.model.removed,
+                        "remaining": len(self.model.buffer)}
+        self.search_edit.setStyleSheet("")
+        self.search_timer.start()
+
+    def _stop_search(self):
+        self._search = None
+        self.search_timer.stop()
+
+    def _search_step(self):
+        search, buffer = self._search, self.model.buffer
+        if search is None or not len(buffer):
+            self._stop_search()
+            return
+        backwards, text = search["backwards"], search["text"]
+        start = search["pos"] - self.model.removed
+        if start < 0:
+            # 起点已被移除: 向后查找从头开始，向前查找回绕到末尾
+            start = 0 if backwards else -1
+        chunk = min(SEARCH_CHUNK, search["remaining"])
+        row = buffer.find(lambda item: text in item[0].lower(), start, backwards, limit=chunk)
+        if row >= 0:
+            self._stop_search()
+            self._show_match(row)
+            return
+        search["remaining"] -= chunk
+        if search["remaining"] <= 0:
+            self._stop_search()
+            self.search_edit.setStyleSheet("border: 1px solid #cf222e;")
+            return
+        search["pos"] = (start + (-chunk if backwards else chunk)) % len(buffer) + self.model.removed
+
+    def _show_match(self, row):
+        self.check_follow.setChecked(False)
+        index = self.model.index(row)
+        self.list_view.setCurrentIndex(index)
+        self.list_view.scrollTo(index, QAbstractItemView.ScrollHint.PositionAtCenter)
+
+
+class LogArchiveView(QWidget):
+    """历史日志查询 (读取 LogArchive 的压缩分段)"""
+
+    RANGES = [("最近 1 小时", 3600), ("最近 24 小时", 86400), ("最近 7 天", 7 * 86400), ("全部", None)]
+    LEVELS = [("全部级别", None), ("错误", ["error"]), ("警告及以上", ["warn", "error"]),
+              ("信息", ["info"]), ("虚拟机串口", ["vm"])]
+
+    def __init__(self, archive, parent=None):
+        super().__init__(parent)
+        self.archive = archive
+        self._query_thread = None
+
+        layout = QVBoxLayout(self); layout.setContentsMargins(0, 0, 0, 0); layout.setSpacing(8)
+        bar = QHBoxLayout()
+        self.combo_range = QComboBox(); self.combo_range.addItems([name for name, _ in self.RANGES])
+        self.combo_range.setCurrentIndex(1)
+        self.combo_level = QComboBox(); self.combo_level.addItems([name for name, _ in self.LEVELS])
+        self.keyword_edit = QLineEdit(); self.keyword_edit.setPlaceholderText("关键字 (可留空)")
+        self.keyword_edit.returnPressed.connect(self.run_query)
+        self.btn_query = QPushButton("查询"); self.btn_query.clicked.connect(self.run_query)
+        bar.addWidget(self.combo_range); bar.addWidget(self.combo_level)
+        bar.addWidget(self.keyword_edit); bar.addWidget(self.btn_query)
+        layout.addLayout(bar)
+
+        self.result_view = LogView()
+        self.result_view.check_follow.setChecked(False)
+        layout.addWidget(self.result_view)
+
+    def run_query(self):
+        if self._query_thread and self._query_thread.is_alive():
+            return
+        seconds = self.RANGES[self.combo_range.currentIndex()][1]
+        levels = self.LEVELS[self.combo_level.currentIndex()][1]
+        keyword = self.keyword_edit.text().strip() or None
+        since = time.time() - seconds if seconds else None
+
+        self.result_view.clear()
+        self.result_view.push("查询中...", "debug")
+        self._query_thread = threading.Thread(
+            target=self._query, args=(since, levels, keyword), daemon=True
+        )
+        self._query_thread.start()
+
+    def _query(self, since, levels, keyword):
+        # 在后台线程中解压查询，结果通过线程安全的 push() 交给界面
+        try:
+            entries = self.archive.query(since=since, levels=levels, keyword=keyword)
+        except Exception as e:
+            self.result_view.push(f"查询失败: {e}", "error")
+            return
+        for entry in entries:
+            stamp = time.strftime("%m-%d %H:%M:%S", time.localtime(entry["t"]))
+            self.result_view.push(f"{stamp} [{entry['s']}] {entry['m']}", entry["l"])
+        self.result_view.push(f"共 {len(entries)} 条记录", "debug")
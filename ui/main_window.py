@@ -1,16 +1,23 @@
 import os
+import threading
 from PyQt6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
                              QPushButton, QLabel, QStackedWidget, QLineEdit,
-                             QFrame, QGridLayout, QComboBox, QTextEdit,
-                             QCheckBox, QFileDialog, QMessageBox)
-from PyQt6.QtWebEngineWidgets import QWebEngineView
-from PyQt6.QtCore import QUrl, Qt
+                             QFrame, QGridLayout, QComboBox,
+                             QCheckBox, QFileDialog, QMessageBox, QProgressBar)
+from PyQt6.QtCore import QUrl, Qt, QTimer
 from PyQt6.QtGui import QIcon, QPixmap, QCloseEvent
 
 from ui.styles import STYLESHEET
 from ui.widgets import ActionButton
+from ui.log_view import LogView, LogArchiveView
+from ui.metrics_view import MetricsView
+from ui.vm_bridge import VMSignalBridge
 from core.config_manager import ConfigManager
 from core.vm_manager import VMManager
+from core.log_archive import LogArchive
+from core.container_logs import ContainerLogStreamer, LOG_SOURCES
+from core.metrics import MetricsCollector
+from core.cpu_profiles import CPU_PROFILES
 
 class MainWindow(QMainWindow):
     def __init__(self):
@@ -22,6 +29,25 @@ class MainWindow(QMainWindow):
         # 初始化后端
         self.config = ConfigManager()
         self.vm = VMManager()
+        self.vm_signals = VMSignalBridge(self.vm, self)
+        # 所有日志同时写入磁盘归档，重启后仍可查询
+        self.log_archive = LogArchive(os.path.join(self.vm.base_path, "logs"))
+        # 通过虚拟机内的 Docker API 跟随 Docker 事件与各容器日志
+        self.container_logs = ContainerLogStreamer(
+            lambda: self.vm.docker_client,
+            sink=lambda source, msg, level: self.log_archive.write(msg, level, source)
+        )
+        # 容器与 QEMU 进程资源采样 (单个后台线程)
+        self.metrics = MetricsCollector(
+            lambda: self.vm.docker_client,
+            lambda: self.vm.vm_process.pid if self.vm.is_running and self.vm.vm_process else None,
+            interval=self.config.get("metrics_interval")
+        )
+        self.metrics.start()
+        self.webview = None  # 应用浏览器首次打开时才创建 (QtWebEngine 启动代价高)
+        self._browser_url = None
+        self._start_thread = None
+        self._deploy_scheduled = False
 
         central_widget = QWidget()
         self.setCentralWidget(central_widget)
@@ -59,10 +85,12 @@ class MainWindow(QMainWindow):
         self.btn_browser = self.create_sidebar_btn("🌐", "应用浏览器", 1)
         self.btn_logs = self.create_sidebar_btn("📝", "运行日志", 2)
         self.btn_files = self.create_sidebar_btn("📁", "文件管理", 3)
+        self.btn_metrics = self.create_sidebar_btn("📊", "资源监控", 5)
         sidebar_layout.addWidget(self.btn_home)
         sidebar_layout.addWidget(self.btn_browser)
         sidebar_layout.addWidget(self.btn_logs)
         sidebar_layout.addWidget(self.btn_files)
+        sidebar_layout.addWidget(self.btn_metrics)
         sidebar_layout.addStretch()
         self.btn_settings = self.create_sidebar_btn("⚙️", "系统设置", 4)
         sidebar_layout.addWidget(self.btn_settings)
@@ -73,21 +101,35 @@ class MainWindow(QMainWindow):
         self.stack = QStackedWidget()
         main_layout.addWidget(self.stack)
 
-        self.init_home_page()
-        self.init_browser_page()
-        self.init_logs_page()
-        self.init_empty_page("文件管理")
-        self.init_settings_page()
+        # 首页与日志页 (启动日志需要立即写入) 直接创建，其余页面先放占位，首次切换时再构建
+        self._page_builders = {
+            1: self.init_browser_page,
+            3: lambda: self.init_empty_page("文件管理"),
+            4: self.init_settings_page,
+            5: self.init_metrics_page,
+        }
+        for index in range(6):
+            if index == 0:
+                self.stack.addWidget(self.init_home_page())
+            elif index == 2:
+                self.stack.addWidget(self.init_logs_page())
+            else:
+                self.stack.addWidget(QWidget())
 
         self.switch_tab(0)
 
         # 绑定后端信号
+        # 日志直接在工作线程写入批处理队列，由日志视图按帧刷新，避免每行都经过事件循环
         self.vm.log_received.connect(self.append_log)
-        self.vm.status_changed.connect(self.update_status_ui)
+        self.vm_signals.status_changed.connect(self.update_status_ui)
         self.setFocus()
 
-        # 程序启动时自动启动虚拟机
-        self.start_deploy()
+    def showEvent(self, event):
+        super().showEvent(event)
+        if not self._deploy_scheduled:
+            # 程序启动时自动启动虚拟机；排在首帧绘制之后执行，窗口不会因此延迟出现
+            self._deploy_scheduled = True
+            QTimer.singleShot(0, self.start_deploy)
 
     def create_sidebar_btn(self, icon, text, index):
         btn = QPushButton(f"  {icon}   {text}")
@@ -99,15 +141,26 @@ class MainWindow(QMainWindow):
         btn.clicked.connect(lambda: self.switch_tab(index))
         return btn
 
+    def ensure_page(self, index):
+        """用真实页面替换占位页面"""
+        builder = self._page_builders.pop(index, None)
+        if builder is None:
+            return
+        placeholder = self.stack.widget(index)
+        self.stack.insertWidget(index, builder())
+        self.stack.removeWidget(placeholder)
+        placeholder.deleteLater()
+
     def switch_tab(self, index):
+        self.ensure_page(index)
         self.stack.setCurrentIndex(index)
-        btns = [self.btn_home, self.btn_browser, self.btn_logs, self.btn_files, self.btn_settings]
+        btns = [self.btn_home, self.btn_browser, self.btn_logs, self.btn_files, self.btn_settings, self.btn_metrics]
         for i, btn in enumerate(btns):
             btn.setChecked(i == index)
 
     def append_log(self, msg, level="info"):
-        color = {"error": "#f85149", "warn": "#d29922", "vm": "#8b949e"}.get(level, "#7ee787")
-        self.log_viewer.append(f"<span style='color:{color};'>[{level.upper()}]</span> {msg}")
+        self.log_view.push(msg, level)
+        self.log_archive.write(msg, level, "serial" if level == "vm" else "manager")
 
     # --- 各页面具体实现 ---
 
@@ -121,6 +174,16 @@ class MainWindow(QMainWindow):
         self.lbl_status = QLabel("● 当前状态: 未就绪")
         self.lbl_status.setStyleSheet("font-size: 14px; color: #cf222e; margin-top: 5px;")
         title_box.addWidget(lbl_title); title_box.addWidget(self.lbl_status)
+
+        # 启动进度 (根据历史启动耗时估算)
+        self.boot_progress = QProgressBar(); self.boot_progress.setRange(0, 100); self.boot_progress.setTextVisible(False)
+        self.boot_progress.setFixedHeight(8); self.boot_progress.hide()
+        self.lbl_boot_phase = QLabel(); self.lbl_boot_phase.setStyleSheet("font-size: 12px; color: #57606a;"); self.lbl_boot_phase.hide()
+        title_box.addWidget(self.boot_progress); title_box.addWidget(self.lbl_boot_phase)
+        self.boot_progress_timer = QTimer(self)
+        self.boot_progress_timer.setInterval(500)
+        self.boot_progress_timer.timeout.connect(self.update_boot_progress)
+
         layout.addLayout(title_box); layout.addSpacing(10)
 
         grid = QGridLayout(); grid.setSpacing(20)
@@ -141,11 +204,11 @@ class MainWindow(QMainWindow):
         self.btn_deploy_action.clicked.connect(self.start_deploy)
 
         layout.addLayout(grid); layout.addStretch()
-        self.stack.addWidget(page)
+        return page
 
     def start_deploy(self):
         """启动部署流程"""
-        if self.vm.is_running:
+        if self.vm.is_running or (self._start_thread and self._start_thread.is_alive()):
             QMessageBox.information(self, "提示", "虚拟机已在运行中")
             return
 
@@ -193,22 +256,54 @@ class MainWindow(QMainWindow):
 
         # 切换到日志页查看进度
         self.switch_tab(2)
-        self.log_viewer.clear()
-        self.log_viewer.append(f"<span style='color:#7ee787;'>[INFO]</span> 开始启动虚拟机...")
+        self.log_view.clear()
+        self.log_view.push("开始启动虚拟机...", "info")
+
+        # 启动虚拟机 (加速器探测、创建数据盘等可能耗时数秒，放在后台线程中执行)
+        self.config.apply_to_vm(self.vm)
+        self._start_thread = threading.Thread(
+            target=self.vm.start_vm, name="vm-start", daemon=True,
+            kwargs={"iso_path": full_iso_path, "custom_shared_dir": shared_dir,
+                    "fast_resume": self.config.get("fast_resume"),
+                    "share_backend": self.config.get("share_backend")}
+        )
+        self._start_thread.start()
+
+    def update_boot_progress(self):
+        estimate = self.vm.boot_progress_estimate()
+        if estimate is None:
+            self.boot_progress_timer.stop()
+            self.boot_progress.hide(); self.lbl_boot_phase.hide()
+            return
 
-        # 启动虚拟机
-        self.vm.start_vm(iso_path=full_iso_path, custom_shared_dir=shared_dir)
+        phase, progress, remaining = estimate
+        self.boot_progress.show(); self.lbl_boot_phase.show()
+        if progress is None:
+            # 没有历史数据时显示忙碌状态
+            self.boot_progress.setRange(0, 0)
+            self.lbl_boot_phase.setText(f"{phase}... (首次启动，正在记录耗时)")
+        else:
+            self.boot_progress.setRange(0, 100)
+            self.boot_progress.setValue(int(progress * 100))
+            self.lbl_boot_phase.setText(f"{phase}... 预计剩余 {remaining:.0f} 秒")
 
     def update_status_ui(self, status):
         self.lbl_status.setText(f"● 当前状态: {status}")
+        if status == "启动中..." and not self.boot_progress_timer.isActive():
+            self.boot_progress_timer.start()
         if status == "运行中":
             self.lbl_status.setStyleSheet("font-size: 14px; color: #2da44e; margin-top: 5px;")
-            # 自动跳转浏览器
-            self.webview.setUrl(QUrl("http://localhost:8021"))
+            self.container_logs.start([s for sources in LOG_SOURCES.values() for s in sources])
+            # 自动跳转浏览器 (浏览器页尚未打开时，创建后再加载)
+            self._browser_url = "http://localhost:8021"
+            if self.webview is not None:
+                self.webview.setUrl(QUrl(self._browser_url))
         else:
             self.lbl_status.setStyleSheet("font-size: 14px; color: #cf222e; margin-top: 5px;")
 
     def init_browser_page(self):
+        from PyQt6.QtWebEngineWidgets import QWebEngineView
+
         page = QWidget(); layout = QVBoxLayout(page); layout.setContentsMargins(0, 0, 0, 0); layout.setSpacing(0)
         toolbar = QFrame(); toolbar.setObjectName("TopBar"); toolbar.setFixedHeight(55)
         tb_layout = QHBoxLayout(toolbar); tb_layout.setContentsMargins(15, 0, 15, 0)
@@ -225,18 +320,43 @@ class MainWindow(QMainWindow):
         layout.addWidget(toolbar)
 
         self.webview = QWebEngineView()
-        self.webview.setHtml("<html><body style='background-color:#f6f8fa; display:flex; justify-content:center; align-items:center; height:100vh; font-family:sans-serif; color:#8b949e;'><h2>启动后将自动连接服务界面</h2></body></html>")
-        layout.addWidget(self.webview); self.stack.addWidget(page)
+        if self._browser_url:
+            self.webview.setUrl(QUrl(self._browser_url))
+        else:
+            self.webview.setHtml("<html><body style='background-color:#f6f8fa; display:flex; justify-content:center; align-items:center; height:100vh; font-family:sans-serif; color:#8b949e;'><h2>启动后将自动连接服务界面</h2></body></html>")
+        layout.addWidget(self.webview)
+        return page
 
     def init_logs_page(self):
         page = QWidget(); layout = QVBoxLayout(page); layout.setContentsMargins(25, 25, 25, 25); layout.setSpacing(15)
         top = QHBoxLayout()
         self.log_source = QComboBox()
-        self.log_source.addItems(["虚拟机日志", "Docker日志", "Agent容器日志"])
+        self.log_source.addItems(["虚拟机日志", "Docker日志", "Agent容器日志", "历史日志"])
+        self.log_source.currentIndexChanged.connect(self.on_log_source_changed)
         top.addWidget(QLabel("选择日志源:")); top.addWidget(self.log_source); top.addStretch()
         layout.addLayout(top)
-        self.log_viewer = QTextEdit(); self.log_viewer.setObjectName("LogViewer"); self.log_viewer.setReadOnly(True)
-        layout.addWidget(self.log_viewer); self.stack.addWidget(page)
+        self.log_stack = QStackedWidget()
+        self.log_view = LogView()
+        self.container_log_view = LogView()
+        self.log_archive_view = LogArchiveView(self.log_archive)
+        self.log_stack.addWidget(self.log_view); self.log_stack.addWidget(self.container_log_view)
+        self.log_stack.addWidget(self.log_archive_view)
+        layout.addWidget(self.log_stack)
+        return page
+
+    def on_log_source_changed(self, index):
+        text = self.log_source.itemText(index)
+        self.container_logs.unsubscribe()
+        if text in LOG_SOURCES:
+            # 回放已缓存的记录后继续推送新记录，不会重新拉取历史
+            self.container_log_view.clear()
+            self.container_logs.subscribe(LOG_SOURCES[text], self.container_log_view.push)
+            self.log_stack.setCurrentWidget(self.container_log_view)
+        elif text == "历史日志":
+            self.log_stack.setCurrentWidget(self.log_archive_view)
+            self.log_archive_view.run_query()
+        else:
+            self.log_stack.setCurrentWidget(self.log_view)
 
     def init_settings_page(self):
         page = QWidget(); layout = QVBoxLayout(page); layout.setContentsMargins(40, 40, 40, 40); layout.setSpacing(30)
@@ -248,6 +368,16 @@ class MainWindow(QMainWindow):
         self.check_auto.stateChanged.connect(lambda s: self.config.set("autostart", s == 2))
         layout.addWidget(self.check_auto)
 
+        self.check_fast_resume = QCheckBox("快速恢复 (保存就绪后的虚拟机快照，下次启动直接恢复)")
+        self.check_fast_resume.setChecked(self.config.get("fast_resume"))
+        self.check_fast_resume.stateChanged.connect(lambda s: self.config.set("fast_resume", s == 2))
+        layout.addWidget(self.check_fast_resume)
+
+        self.check_balloon = QCheckBox("动态内存 (根据宿主机与虚拟机内存压力自动回收或扩充虚拟机内存)")
+        self.check_balloon.setChecked(self.config.get("balloon_enabled"))
+        self.check_balloon.stateChanged.connect(lambda s: self.config.set("balloon_enabled", s == 2))
+        layout.addWidget(self.check_balloon)
+
         lbl_dir = QLabel("共享目录:"); layout.addWidget(lbl_dir)
         path_box = QHBoxLayout()
         self.path_edit = QLineEdit(self.config.get("shared_dir"))
@@ -259,12 +389,48 @@ class MainWindow(QMainWindow):
         path_box.addWidget(self.path_edit); path_box.addWidget(btn_sel)
         layout.addLayout(path_box)
 
+        backend_box = QHBoxLayout()
+        backend_box.addWidget(QLabel("共享目录后端:"))
+        self.share_backend_combo = QComboBox()
+        backends = [("自动选择", "auto"), ("virtiofs (仅 Linux)", "virtiofs"), ("virtio-9p", "9p"), ("vvfat (兼容模式)", "vvfat")]
+        for label, value in backends:
+            self.share_backend_combo.addItem(label, value)
+        self.share_backend_combo.setCurrentIndex(max(0, self.share_backend_combo.findData(self.config.get("share_backend"))))
+        self.share_backend_combo.currentIndexChanged.connect(
+            lambda i: self.config.set("share_backend", self.share_backend_combo.itemData(i)))
+        backend_box.addWidget(self.share_backend_combo); backend_box.addStretch()
+        layout.addLayout(backend_box)
+
+        cpu_box = QHBoxLayout()
+        cpu_box.addWidget(QLabel("CPU 型号:"))
+        self.cpu_profile_combo = QComboBox()
+        for name, spec in CPU_PROFILES.items():
+            self.cpu_profile_combo.addItem(spec["label"], name)
+        self.cpu_profile_combo.setCurrentIndex(max(0, self.cpu_profile_combo.findData(self.config.get("cpu_profile"))))
+        self.cpu_profile_combo.currentIndexChanged.connect(
+            lambda i: self.config.set("cpu_profile", self.cpu_profile_combo.itemData(i)))
+        cpu_box.addWidget(self.cpu_profile_combo); cpu_box.addStretch()
+        layout.addLayout(cpu_box)
+
+        boot_box = QHBoxLayout()
+        boot_box.addWidget(QLabel("启动方式:"))
+        self.boot_mode_combo = QComboBox()
+        modes = [("光盘引导 (默认)", "cdrom"), ("直接启动内核 (更快)", "kernel"), ("microvm 精简机型 (实验性)", "microvm")]
+        for label, value in modes:
+            self.boot_mode_combo.addItem(label, value)
+        self.boot_mode_combo.setCurrentIndex(max(0, self.boot_mode_combo.findData(self.config.get("boot_mode"))))
+        self.boot_mode_combo.currentIndexChanged.connect(
+            lambda i: self.config.set("boot_mode", self.boot_mode_combo.itemData(i)))
+        boot_box.addWidget(self.boot_mode_combo); boot_box.addStretch()
+        layout.addLayout(boot_box)
+
         lbl_iso = QLabel("当前环境镜像:"); layout.addWidget(lbl_iso)
         self.iso_edit = QLineEdit(self.config.get("last_iso") or "启动时自动检测")
         self.iso_edit.setReadOnly(True)
         layout.addWidget(self.iso_edit)
 
-        layout.addStretch(); self.stack.addWidget(page)
+        layout.addStretch()
+        return page
 
     def select_dir(self):
         d = QFileDialog.getExistingDirectory(self, "选择共享目录", os.getcwd())
@@ -275,7 +441,11 @@ class MainWindow(QMainWindow):
     def init_empty_page(self, title):
         page = QWidget(); layout = QVBoxLayout(page); layout.setAlignment(Qt.AlignmentFlag.AlignCenter)
         layout.addWidget(QLabel(f"<h3>{title}</h3> 模块开发中..."))
-        self.stack.addWidget(page)
+        return page
+
+    def init_metrics_page(self):
+        self.metrics_view = MetricsView(self.metrics, lambda: self.vm.balloon.status() if self.vm.balloon else None)
+        return self.metrics_view
 
     def closeEvent(self, event: QCloseEvent):
         """窗口关闭时停止虚拟机"""
@@ -288,8 +458,14 @@ class MainWindow(QMainWindow):
             )
             if reply == QMessageBox.StandardButton.Yes:
                 self.vm.stop_vm()
+                self.container_logs.stop()
+                self.metrics.stop()
+                self.log_archive.close()
                 event.accept()
             else:
                 event.ignore()
         else:
+            self.container_logs.stop()
+            self.metrics.stop()
+            self.log_archive.close()
             event.accept()
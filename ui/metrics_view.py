@@ -0,0 +1,180 @@
+import time
+
+from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QComboBox, QTableWidget,
+                             QTableWidgetItem, QHeaderView, QAbstractItemView)
+from PyQt6.QtCore import Qt, QTimer, QPointF
+from PyQt6.QtGui import QPainter, QColor, QPen, QPolygonF
+
+from core.metrics import VIEWS, QEMU_SOURCE
+
+SERIES_COLORS = ["#0969da", "#cf222e", "#2da44e", "#bf8700", "#8250df", "#1b7c83", "#57606a"]
+CHART_METRICS = [("cpu", "CPU (%)"), ("mem", "内存"), ("net_rx", "网络接收"), ("io_write", "磁盘写入")]
+VIEW_LABELS = {"1m": "最近 1 分钟", "1h": "最近 1 小时", "24h": "最近 24 小时"}
+
+
+def format_bytes(value, suffix=""):
+    if value is None:
+        return "-"
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(value) < 1024:
+            return f"{value:.1f} {unit}{suffix}"
+        value /= 1024
+    return f"{value:.1f} TB{suffix}"
+
+
+class MetricsChart(QWidget):
+    """多条折线的简单趋势图，只在数据更新时重绘"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setMinimumHeight(220)
+        self.series = {}  # 名称 -> [(时间, 数值)]
+        self.colors = {}
+        self.span = 60
+        self.value_format = lambda v: f"{v:.0f}"
+
+    def set_data(self, series, colors, span, value_format):
+        self.series, self.colors, self.span, self.value_format = series, colors, span, value_format
+        self.update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        rect = self.rect().adjusted(60, 10, -10, -25)
+        painter.fillRect(self.rect(), QColor("#ffffff"))
+        painter.setPen(QPen(QColor("#d0d7de")))
+        painter.drawRect(rect)
+
+        points = [p for pts in self.series.values() for p in pts]
+        if not points:
+            painter.setPen(QColor("#57606a"))
+            painter.drawText(rect, Qt.AlignmentFlag.AlignCenter, "暂无数据")
+            return
+
+        end = max(ts for ts, _ in points)
+        start = end - self.span
+        top = max(max(v for _, v in points) * 1.1, 1e-9)
+        painter.setPen(QColor("#57606a"))
+        painter.drawText(0, rect.top(), 55, 20, Qt.AlignmentFlag.AlignRight, self.value_format(top))
+        painter.drawText(0, rect.bottom() - 20, 55, 20, Qt.AlignmentFlag.AlignRight, self.value_format(0))
+
+        for name, pts in self.series.items():
+            polygon = QPolygonF([
+                QPointF(rect.left() + (ts - start) / self.span * rect.width(),
+                        rect.bottom() - v / top * rect.height())
+                for ts, v in pts if ts >= start
+            ])
+            painter.setPen(QPen(QColor(self.colors[name]), 1.5))
+            painter.drawPolyline(polygon)
+
+        x = rect.left()
+        for name in self.series:
+            painter.setPen(QColor(self.colors[name]))
+            painter.drawText(x, rect.bottom() + 5, 150, 20, Qt.AlignmentFlag.AlignLeft, f"■ {name}")
+            x += 150
+
+
+class MetricsView(QWidget):
+    """资源监控页：容器与 QEMU 进程的 CPU、内存、网络与磁盘 I/O
+
+    采样由 MetricsCollector 在后台完成，本页面只在可见时按秒读取缓冲区刷新。
+    """
+
+    COLUMNS = ["来源", "CPU", "内存", "网络接收", "网络发送", "磁盘读取", "磁盘写入"]
+
+    def __init__(self, collector, balloon_status=None, parent=None):
+        super().__init__(parent)
+        self.collector = collector
+        self.balloon_status = balloon_status  # 返回 BalloonController.status() 或 None
+        self._colors = {}
+
+        layout = QVBoxLayout(self); layout.setContentsMargins(25, 25, 25, 25); layout.setSpacing(15)
+        top = QHBoxLayout()
+        lbl_title = QLabel("资源监控"); lbl_title.setStyleSheet("font-size: 20px; font-weight: bold; color: #24292f;")
+        self.combo_view = QComboBox(); self.combo_view.addItems([VIEW_LABELS[v] for v in VIEWS])
+        self.combo_metric = QComboBox(); self.combo_metric.addItems([label for _, label in CHART_METRICS])
+        self.combo_view.currentIndexChanged.connect(self.refresh)
+        self.combo_metric.currentIndexChanged.connect(self.refresh)
+        top.addWidget(lbl_title); top.addStretch()
+        top.addWidget(QLabel("指标:")); top.addWidget(self.combo_metric)
+        top.addWidget(QLabel("时间范围:")); top.addWidget(self.combo_view)
+        layout.addLayout(top)
+
+        self.lbl_balloon = QLabel("内存气球: 未启用"); self.lbl_balloon.setStyleSheet("color: #57606a;")
+        self.lbl_balloon.setWordWrap(True)
+        layout.addWidget(self.lbl_balloon)
+
+        self.chart = MetricsChart()
+        layout.addWidget(self.chart, 1)
+
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.setSelectionMode(QAbstractItemView.SelectionMode.NoSelection)
+        layout.addWidget(self.table, 1)
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(1000)
+        self.timer.timeout.connect(self.refresh)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()
+        self.timer.start()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.timer.stop()
+
+    def _color(self, source):
+        if source not in self._colors:
+            self._colors[source] = SERIES_COLORS[len(self._colors) % len(SERIES_COLORS)]
+        return self._colors[source]
+
+    def refresh(self):
+        view = list(VIEWS)[self.combo_view.currentIndex()]
+        metric = CHART_METRICS[self.combo_metric.currentIndex()][0]
+        sources = sorted(self.collector.sources(), key=lambda s: (s != QEMU_SOURCE, s))
+
+        series = {s: self.collector.points(s, metric, view) for s in sources}
+        series = {s: pts for s, pts in series.items() if pts}
+        value_format = (lambda v: f"{v:.0f}%") if metric == "cpu" else \
+            (lambda v: format_bytes(v, "" if metric == "mem" else "/s"))
+        self.chart.set_data(series, {s: self._color(s) for s in series}, VIEWS[view][0], value_format)
+
+        self._refresh_balloon()
+        self.table.setRowCount(len(sources))
+        for row, source in enumerate(sources):
+            latest = self.collector.latest(source)
+            cpu = latest.get("cpu")
+            cells = [
+                "QEMU 进程" if source == QEMU_SOURCE else source,
+                f"{cpu:.1f}%" if cpu is not None else "-",
+                format_bytes(latest.get("mem")),
+                format_bytes(latest.get("net_rx"), "/s"),
+                format_bytes(latest.get("net_tx"), "/s"),
+                format_bytes(latest.get("io_read"), "/s"),
+                format_bytes(latest.get("io_write"), "/s"),
+            ]
+            for col, text in enumerate(cells):
+                item = self.table.item(row, col)
+                if item is None:
+                    item = QTableWidgetItem()
+                    self.table.setItem(row, col, item)
+                item.setText(text)
+
+    def _refresh_balloon(self):
+        status = self.balloon_status() if self.balloon_status else None
+        if not status:
+            self.lbl_balloon.setText("内存气球: 未启用")
+            return
+        if "actual_mb" not in status:
+            self.lbl_balloon.setText(f"内存气球: 等待虚拟机内存统计 (范围 {status['floor_mb']}~{status['ceiling_mb']} MB)")
+            return
+        text = (f"内存气球: 当前 {status['actual_mb']} MB (范围 {status['floor_mb']}~{status['ceiling_mb']} MB)，"
+                f"虚拟机可用 {status['guest_available_mb']} MB，宿主机可用 {status['host_available_mb']} MB")
+        for ts, before, target, reason in status["decisions"][-3:][::-1]:
+            text += f"\n  {time.strftime('%H:%M:%S', time.localtime(ts))} {before} -> {target} MB ({reason})"
+        self.lbl_balloon.setText(text)
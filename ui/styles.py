@@ -50,8 +50,8 @@ QComboBox:hover {
     border-color: #0969da;
 }
 
-/* 日志文本框 */
-QTextEdit#LogViewer {
+/* 日志列表 */
+QListView#LogViewer {
     background-color: #0d1117;
     color: #e6edf3;
     border-radius: 8px;
@@ -59,6 +59,10 @@ QTextEdit#LogViewer {
     font-family: 'Consolas', 'Monaco', 'Courier New', monospace;
     font-size: 13px;
 }
+QListView#LogViewer::item:selected {
+    background-color: #1f6feb;
+    color: #ffffff;
+}
 
 /* 卡片按钮基础样式 */
 QPushButton#ActionBtn, QPushButton#DeployBtn, QPushButton#UninstallBtn {
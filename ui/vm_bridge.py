@@ -0,0 +1,21 @@
+from PyQt6.QtCore import QObject, pyqtSignal
+
+
+class VMSignalBridge(QObject):
+    """把 VMManager 在工作线程中发出的回调转为 Qt 信号
+
+    Qt 信号跨线程发出时会排队到接收对象所在的线程，界面槽函数因此总在主线程执行。
+    """
+    log_received = pyqtSignal(str, str)
+    status_changed = pyqtSignal(str)
+    boot_finished = pyqtSignal()
+    qmp_event = pyqtSignal(str, dict)
+    boot_timeline_finished = pyqtSignal(dict)
+
+    def __init__(self, vm, parent=None):
+        super().__init__(parent)
+        vm.log_received.connect(self.log_received.emit)
+        vm.status_changed.connect(self.status_changed.emit)
+        vm.boot_finished.connect(self.boot_finished.emit)
+        vm.qmp_event.connect(self.qmp_event.emit)
+        vm.boot_timeline_finished.connect(self.boot_timeline_finished.emit)